@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+from __future__ import unicode_literals, print_function
+
+import optparse
+import os
+import random
+import sys
+import timeit
+
+# Import picta_dl
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, ROOT_DIR)
+from picta_dl.extractor import gen_extractor_classes
+from picta_dl.extractor.common import InfoExtractor
+from picta_dl.extractor.dispatch import ExtractorIndex
+
+
+URL_TEMPLATES = [
+    'https://www.picta.cu/medias/video-{0}',
+    'https://www.picta.cu/embed/?v={0}',
+    'https://www.picta.cu/medias/canal-{0}?playlist={0}',
+    'https://www.youtube.com/watch?v=BaW_jen{0:04d}',
+    'https://www.youtube.com/channel/UCMDQxm7cUx3yXkfeHa5{0:04d}',
+    'https://www.youtube.com/playlist?list=PLwP_SiAcdui0KVebT0mU9Apz359a4u{0:04d}',
+    'https://m.youtube.com/user/user{0}',
+    'https://example.com/video{0}.mp4',
+]
+
+
+def fake_extractors(count):
+    """Extractors for made up sites, standing for the ones still to come"""
+    return [
+        type(str('Fake%dIE' % i), (InfoExtractor, ), {
+            '_VALID_URL': r'https?://(?:www\.)?site%d\.example\.org/videos?/(?P<id>\d+)' % i,
+        })
+        for i in range(count)]
+
+
+def first_suitable(ies, url):
+    for ie in ies:
+        if ie.suitable(url):
+            return ie
+    return None
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [OPTIONS]')
+    parser.add_option(
+        '--urls', type=int, default=20000,
+        help='Number of URLs to dispatch (default %default)')
+    parser.add_option(
+        '--extra-extractors', type=int, default=0,
+        help='Number of made up extractors to add (default %default)')
+    options, args = parser.parse_args()
+
+    ies = list(gen_extractor_classes()) + fake_extractors(options.extra_extractors)
+    rng = random.Random(0)
+    urls = [
+        rng.choice(URL_TEMPLATES).format(rng.randint(0, 9999))
+        for _ in range(options.urls)]
+    urls.extend('https://site%d.example.org/video/1' % i for i in range(options.extra_extractors))
+
+    # Compile all the regexes before timing
+    for url in urls:
+        first_suitable(ies, url)
+
+    index = ExtractorIndex(ies)
+    for url in urls:
+        assert first_suitable(ies, url) is first_suitable(index.candidates(url), url), url
+
+    linear = min(timeit.repeat(
+        lambda: [first_suitable(ies, url) for url in urls], number=1, repeat=3))
+    indexed = min(timeit.repeat(
+        lambda: [first_suitable(index.candidates(url), url) for url in urls], number=1, repeat=3))
+    build = min(timeit.repeat(lambda: ExtractorIndex(ies), number=1, repeat=3))
+
+    print('%d extractors, %d URLs' % (len(ies), len(urls)))
+    print('linear scan: %.3fs' % linear)
+    print('index:       %.3fs (%.1fx), built in %.3fs' % (indexed, linear / indexed, build))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+from __future__ import unicode_literals, print_function
+
+import optparse
+import os
+import sys
+import timeit
+
+# Import picta_dl
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, ROOT_DIR)
+from picta_dl import YoutubeDL
+
+
+SPECS = [
+    'best',
+    'bestvideo+bestaudio/best',
+    'bestvideo[height<=720][tbr<2000]+bestaudio/best',
+    '(bestvideo[ext=mp4][height<=?1080],bestvideo[vcodec^=avc1])+bestaudio[abr>=64]/best[filesize<500M]',
+]
+
+
+def video_formats(i):
+    """Formats like the ones of a DASH manifest of a Picta video"""
+    formats = []
+    for height, tbr in ((240, 300), (360, 600), (480, 1000), (720, 1800), (1080, 3500)):
+        formats.append({
+            'format_id': 'dash-video=%d' % (tbr * 1000),
+            'url': 'https://www.picta.cu/videos/%d/video-%d.mp4' % (i, height),
+            'ext': 'mp4',
+            'width': height * 16 // 9,
+            'height': height,
+            'tbr': tbr,
+            'vcodec': 'avc1.4d401f',
+            'acodec': 'none',
+            'filesize': tbr * 1000 * 1800 // 8,
+        })
+    for abr in (48, 64, 128):
+        formats.append({
+            'format_id': 'dash-audio=%d' % (abr * 1000),
+            'url': 'https://www.picta.cu/videos/%d/audio-%d.m4a' % (i, abr),
+            'ext': 'm4a',
+            'abr': abr,
+            'tbr': abr,
+            'vcodec': 'none',
+            'acodec': 'mp4a.40.2',
+        })
+    return formats
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [OPTIONS]')
+    parser.add_option(
+        '--videos', type=int, default=5000,
+        help='Number of videos (default %default)')
+    options, args = parser.parse_args()
+
+    videos = [video_formats(i) for i in range(options.videos)]
+    print('%d videos' % len(videos))
+    ydl = YoutubeDL({'quiet': True})
+
+    def select(build, spec):
+        for formats in videos:
+            list(build(spec)({'formats': formats, 'incomplete_formats': False}))
+
+    def uncached(spec):
+        # What every video went through before the selectors and the
+        # filters were cached
+        ydl._format_filters.clear()
+        return ydl._compile_format_selector(spec)
+
+    for spec in SPECS:
+        times = []
+        for build in (uncached, ydl.build_format_selector):
+            times.append(min(timeit.repeat(
+                lambda: select(build, spec), number=1, repeat=3)))
+        print('%s\n    uncached %.3fs, cached %.3fs (%.1fus per video)' % (
+            spec, times[0], times[1], times[1] * 1e6 / len(videos)))
+
+
+if __name__ == '__main__':
+    main()
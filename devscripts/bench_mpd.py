@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+from __future__ import unicode_literals, print_function
+
+import optparse
+import os
+import sys
+import threading
+import timeit
+
+# Import picta_dl
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, ROOT_DIR)
+from picta_dl import YoutubeDL
+from picta_dl.compat import compat_etree_fromstring, compat_http_server
+from picta_dl.extractor.common import InfoExtractor
+
+
+def timeline_manifest(segments, representations):
+    """A manifest with a SegmentTimeline of segments entries of varying
+    durations for each video representation, like the ones of long streams"""
+    timeline = '<SegmentTimeline>%s</SegmentTimeline>' % ''.join(
+        '<S t="%d" d="%d"/>' % (i * 2000 + i % 3, 2000 - i % 3) for i in range(segments))
+    return '''<?xml version="1.0" encoding="utf-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" mediaPresentationDuration="PT%dS">
+<Period><AdaptationSet mimeType="video/mp4">%s</AdaptationSet>
+<AdaptationSet mimeType="audio/mp4"><Representation id="audio" bandwidth="128000" codecs="mp4a.40.2">
+<SegmentTemplate timescale="1000" initialization="$RepresentationID$/init.mp4" media="$RepresentationID$/$Time$.m4s">%s</SegmentTemplate>
+</Representation></AdaptationSet></Period></MPD>''' % (segments * 2, ''.join(
+        '<Representation id="video%d" bandwidth="%d" width="%d" height="%d" codecs="avc1.64001f">'
+        '<SegmentTemplate timescale="1000" initialization="$RepresentationID$/init.mp4" media="$RepresentationID$/$Time$.m4s">'
+        '%s</SegmentTemplate></Representation>' % (
+            i, 300000 * (i + 1), 256 * (i + 1), 144 * (i + 1), timeline)
+        for i in range(representations)), timeline)
+
+
+def segment_list_manifest(segments, representations):
+    """A manifest listing the URL of each segment"""
+    return '''<?xml version="1.0" encoding="utf-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" mediaPresentationDuration="PT%dS">
+<Period><AdaptationSet mimeType="video/mp4">%s</AdaptationSet></Period></MPD>''' % (segments * 2, ''.join(
+        '<Representation id="video%d" bandwidth="%d"><SegmentList timescale="1000" duration="2000">'
+        '<Initialization sourceURL="video%d/init.mp4"/>%s</SegmentList></Representation>' % (
+            i, 300000 * (i + 1), i, ''.join(
+                '<SegmentURL media="video%d/segment-%d.m4s"/>' % (i, n) for n in range(segments)))
+        for i in range(representations)))
+
+
+class ManifestHandler(compat_http_server.BaseHTTPRequestHandler):
+    manifest = b''
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == '"manifest"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/dash+xml')
+        self.send_header('ETag', '"manifest"')
+        self.send_header('Content-Length', str(len(self.manifest)))
+        self.end_headers()
+        self.wfile.write(self.manifest)
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [OPTIONS]')
+    parser.add_option(
+        '--segments', type=int, default=10000,
+        help='Number of segments of each representation (default %default)')
+    parser.add_option(
+        '--representations', type=int, default=6,
+        help='Number of video representations (default %default)')
+    parser.add_option(
+        '--extractions', type=int, default=5,
+        help='Number of extractions of the same manifest (default %default)')
+    options, args = parser.parse_args()
+
+    ie = InfoExtractor(YoutubeDL({'quiet': True}))
+    httpd = compat_http_server.HTTPServer(('127.0.0.1', 0), ManifestHandler)
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    mpd_url = 'http://127.0.0.1:%d/manifest.mpd' % httpd.socket.getsockname()[1]
+
+    for name, build in (('timeline', timeline_manifest), ('segment list', segment_list_manifest)):
+        manifest = build(options.segments, options.representations)
+        print('%s manifest: %d representations of %d segments, %d KiB' % (
+            name, options.representations, options.segments, len(manifest) // 1024))
+
+        data = manifest.encode('utf-8')
+        parse = min(timeit.repeat(lambda: ie._parse_mpd_formats(
+            compat_etree_fromstring(data), mpd_url=mpd_url), number=1, repeat=3))
+        print('    parse: %.3fs' % parse)
+
+        ManifestHandler.manifest = data
+        # With an empty manifest cache
+        ie.set_downloader(YoutubeDL({'quiet': True}))
+        extract = min(timeit.repeat(lambda: ie._extract_mpd_formats(
+            mpd_url, None), number=options.extractions, repeat=1))
+        print('    %d extractions: %.3fs' % (options.extractions, extract))
+
+    httpd.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+from __future__ import unicode_literals, print_function
+
+import optparse
+import os
+import sys
+import timeit
+
+# Import picta_dl
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, ROOT_DIR)
+from picta_dl import YoutubeDL
+
+
+TEMPLATES = [
+    '%(title)s-%(id)s.%(ext)s',
+    '%(playlist)s/%(playlist_index)s - %(title)s [%(resolution)s].%(ext)s',
+    '%(uploader)s/%(upload_date)s - %(title)s (%(height)dp, %(filesize)d bytes).%(ext)s',
+]
+
+
+def playlist_entries(count):
+    """Info dicts like the ones of the entries of a large Picta playlist"""
+    return [{
+        'id': '%d' % i,
+        'title': 'Capítulo %d: "Una historia" | Temporada 2 <final>?' % i,
+        'description': 'Descripción del capítulo %d. ' % i * 40,
+        'uploader': 'Canal de prueba',
+        'upload_date': '20200101',
+        'timestamp': 1577836800 + i,
+        'duration': 1800.0,
+        'view_count': i * 10,
+        'ext': 'mp4',
+        'format_id': 'dash-video=1500000',
+        'width': 1280,
+        'height': 720,
+        'tbr': 1500,
+        'playlist': 'Serie de prueba',
+        'playlist_id': '42',
+        'playlist_index': i + 1,
+        'n_entries': count,
+        'thumbnail': 'https://www.picta.cu/thumbnail/%d.jpg' % i,
+        'formats': [{'format_id': 'f%d' % f, 'url': 'https://example.com/%d' % f} for f in range(8)],
+        'subtitles': {'es': [{'url': 'https://example.com/es.vtt', 'ext': 'vtt'}]},
+        'tags': ['serie', 'drama', 'cuba'],
+    } for i in range(count)]
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [OPTIONS]')
+    parser.add_option(
+        '--entries', type=int, default=10000,
+        help='Number of playlist entries (default %default)')
+    parser.add_option(
+        '--restrict-filenames', action='store_true', default=False,
+        help='Use restricted filenames')
+    options, args = parser.parse_args()
+
+    entries = playlist_entries(options.entries)
+    print('%d entries' % len(entries))
+    for outtmpl in TEMPLATES:
+        ydl = YoutubeDL({
+            'outtmpl': outtmpl,
+            'restrictfilenames': options.restrict_filenames,
+            'quiet': True,
+        })
+        elapsed = min(timeit.repeat(
+            lambda: [ydl.prepare_filename(entry) for entry in entries], number=1, repeat=3))
+        print('%-80s %.3fs (%.1fus per call)' % (
+            outtmpl, elapsed, elapsed * 1e6 / len(entries)))
+
+
+if __name__ == '__main__':
+    main()
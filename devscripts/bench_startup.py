@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+from __future__ import unicode_literals, print_function
+
+import io
+import json
+import optparse
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Import picta_dl
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+from picta_dl.compat import compat_http_server
+
+
+# Runs picta_dl against the local stand-in of the Picta API given as first argument
+SIMULATE_BOOTSTRAP = (
+    'import sys; import picta_dl.extractor.picta as picta; '
+    'picta.API_BASE_URL = sys.argv.pop(1); '
+    'import picta_dl; picta_dl.main()')
+
+MPD_FILE = os.path.join(ROOT_DIR, 'test', 'testdata', 'mpd', 'urls_only.mpd')
+
+
+class PictaAPIHandler(compat_http_server.BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, content_type, data):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        base_url = 'http://127.0.0.1:%d' % self.server.server_port
+        if self.path.startswith('/api/v2/publicacion/'):
+            self._send('application/json', json.dumps({'results': [{
+                'id': 1,
+                'nombre': 'Startup benchmark',
+                'descripcion': 'Served by devscripts/bench_startup.py',
+                'slug_url': 'startup-benchmark',
+                'usuario': {'username': 'picta-dl'},
+                'fecha_creacion': '2020-09-23T12:00:00Z',
+                'url_imagen': None,
+                'url_manifiesto': base_url + '/manifest.mpd',
+                'categoria': {'tipologia': {'nombre': 'Video'}},
+                'lista_reproduccion_canal': [],
+                'url_subtitulo': None,
+            }]}).encode('utf-8'))
+        elif self.path == '/manifest.mpd':
+            with open(MPD_FILE, 'rb') as f:
+                self._send('application/dash+xml', f.read())
+        else:
+            self.send_error(404)
+
+
+def start_api_server():
+    httpd = compat_http_server.HTTPServer(('127.0.0.1', 0), PictaAPIHandler)
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return httpd
+
+
+def scenarios(api_url):
+    return [
+        ('import', ['-c', 'import picta_dl']),
+        ('version', ['-m', 'picta_dl', '--version']),
+        ('simulate', [
+            '-c', SIMULATE_BOOTSTRAP, api_url, '--ignore-config', '--no-cache-dir',
+            '--simulate', '--quiet', 'https://www.picta.cu/medias/startup-benchmark']),
+    ]
+
+
+def run_python(args, pycache_dir):
+    # Bytecode goes to pycache_dir (Python 3.8+), so that cold starts
+    # really compile everything
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    env['PYTHONPYCACHEPREFIX'] = pycache_dir
+    start = time.time()
+    proc = subprocess.Popen(
+        [sys.executable] + args, cwd=ROOT_DIR, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    _, stderr = proc.communicate()
+    elapsed = time.time() - start
+    if proc.returncode != 0:
+        raise Exception('%s failed:\n%s' % (' '.join(args), stderr.decode('utf-8', 'replace')))
+    return elapsed, stderr
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def measure(args, runs):
+    """Return the cold (no bytecode cache) and warm start times of a run"""
+    cold = []
+    for _ in range(max(1, runs // 3)):
+        pycache_dir = tempfile.mkdtemp(prefix='picta-dl-pycache-')
+        try:
+            cold.append(run_python(args, pycache_dir)[0])
+        finally:
+            shutil.rmtree(pycache_dir, ignore_errors=True)
+    pycache_dir = tempfile.mkdtemp(prefix='picta-dl-pycache-')
+    try:
+        run_python(args, pycache_dir)
+        warm = [run_python(args, pycache_dir)[0] for _ in range(runs)]
+    finally:
+        shutil.rmtree(pycache_dir, ignore_errors=True)
+    return {'cold': median(cold), 'warm': median(warm)}
+
+
+def import_breakdown(top):
+    """Per-module import times of a warm "import picta_dl", as reported by
+    -X importtime: all the picta_dl modules and the slowest other ones"""
+    pycache_dir = tempfile.mkdtemp(prefix='picta-dl-pycache-')
+    try:
+        args = ['-X', 'importtime', '-c', 'import picta_dl']
+        run_python(args, pycache_dir)
+        _, stderr = run_python(args, pycache_dir)
+    finally:
+        shutil.rmtree(pycache_dir, ignore_errors=True)
+    modules = {}
+    for line in stderr.decode('utf-8').splitlines():
+        mobj = re.match(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)', line)
+        # Modules listed more than once (e.g. failed imports) are kept once
+        if mobj and int(mobj.group(2)) > modules.get(mobj.group(4), {}).get('cumulative_us', -1):
+            modules[mobj.group(4)] = {
+                'module': mobj.group(4),
+                'self_us': int(mobj.group(1)),
+                'cumulative_us': int(mobj.group(2)),
+                'depth': (len(mobj.group(3)) - 1) // 2,
+            }
+    modules = list(modules.values())
+    own = [m for m in modules if m['module'].split('.')[0] == 'picta_dl']
+    others = [m for m in modules if m['module'].split('.')[0] != 'picta_dl']
+    others.sort(key=lambda m: m['self_us'], reverse=True)
+    return {
+        'total_us': sum(m['self_us'] for m in modules),
+        'modules': len(modules),
+        'picta_dl': sorted(own, key=lambda m: m['self_us'], reverse=True),
+        'others': others[:top],
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print the changes against baseline, return the regressions"""
+    regressions = []
+    print('\n%-10s %-5s %10s %10s %8s' % ('scenario', 'kind', 'baseline', 'current', 'change'))
+    for name, current in sorted(results['scenarios'].items()):
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        for kind in ('cold', 'warm'):
+            change = current[kind] / previous[kind] - 1
+            flag = ''
+            if change > tolerance:
+                flag = ' REGRESSION'
+                regressions.append('%s (%s)' % (name, kind))
+            print('%-10s %-5s %9.1fms %9.1fms %+7.1f%%%s' % (
+                name, kind, previous[kind] * 1000, current[kind] * 1000, change * 100, flag))
+    return regressions
+
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [OPTIONS]')
+    parser.add_option(
+        '--runs', type=int, default=10,
+        help='Number of warm runs per scenario, the median is kept (default %default)')
+    parser.add_option(
+        '--top', type=int, default=15,
+        help='Number of non picta_dl modules in the import breakdown (default %default)')
+    parser.add_option(
+        '-o', '--output', metavar='FILE',
+        help='Save the results as JSON to FILE')
+    parser.add_option(
+        '--baseline', metavar='FILE',
+        help='Compare the results against the JSON results in FILE')
+    parser.add_option(
+        '--tolerance', type=float, default=0.1,
+        help='Slowdown over the baseline reported as a regression, as a fraction (default %default)')
+    options, args = parser.parse_args()
+
+    httpd = start_api_server()
+    api_url = 'http://127.0.0.1:%d/api/v2/' % httpd.server_port
+
+    results = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'runs': options.runs,
+        'scenarios': {},
+    }
+    for name, scenario_args in scenarios(api_url):
+        results['scenarios'][name] = measure(scenario_args, options.runs)
+        print('%-10s cold %7.1fms  warm %7.1fms' % (
+            name, results['scenarios'][name]['cold'] * 1000,
+            results['scenarios'][name]['warm'] * 1000))
+    httpd.shutdown()
+
+    results['imports'] = import_breakdown(options.top)
+    print('\nimport picta_dl: %d modules, %.1fms' % (
+        results['imports']['modules'], results['imports']['total_us'] / 1000.0))
+    print('%10s %10s  %s' % ('self', 'cumulative', 'module'))
+    for m in results['imports']['picta_dl'] + results['imports']['others']:
+        print('%8.1fms %8.1fms  %s' % (m['self_us'] / 1000.0, m['cumulative_us'] / 1000.0, m['module']))
+
+    if options.output:
+        with io.open(options.output, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(results, indent=2, sort_keys=True))
+
+    if options.baseline:
+        with io.open(options.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, options.tolerance)
+        if regressions:
+            print('\nRegressions over %d%%: %s' % (options.tolerance * 100, ', '.join(regressions)))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
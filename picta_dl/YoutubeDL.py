@@ -8,7 +8,8 @@ import contextlib
 import copy
 import datetime
 import errno
-import fileinput
+import hashlib
+import inspect
 import io
 import itertools
 import json
@@ -21,24 +22,24 @@ import shutil
 import subprocess
 import socket
 import sys
+import threading
 import time
 import tokenize
 import traceback
 import random
 
-from string import ascii_letters
-
 from .compat import (
     compat_basestring,
-    compat_cookiejar,
     compat_get_terminal_size,
     compat_http_client,
+    compat_HTTPError,
     compat_kwargs,
     compat_numeric_types,
     compat_os_name,
     compat_str,
     compat_tokenize_tokenize,
     compat_urllib_error,
+    compat_urllib_parse_urlparse,
     compat_urllib_request,
     compat_urllib_request_DataHandler,
 )
@@ -51,6 +52,7 @@ from .utils import (
     DEFAULT_OUTTMPL,
     determine_ext,
     determine_protocol,
+    DownloadCancelled,
     DownloadError,
     encode_compat_str,
     encodeFilename,
@@ -62,7 +64,8 @@ from .utils import (
     GeoRestrictedError,
     int_or_none,
     ISO3166Utils,
-    locked_file,
+    json_default,
+    LoginRequiredError,
     make_HTTPS_handler,
     MaxDownloadsReached,
     orderedSet,
@@ -85,8 +88,10 @@ from .utils import (
     str_or_none,
     subtitles_filename,
     UnavailableVideoError,
+    unsmuggle_url,
     url_basename,
     version_tuple,
+    VideoNotFoundError,
     write_json_file,
     write_string,
     YoutubeDLCookieJar,
@@ -94,11 +99,22 @@ from .utils import (
     YoutubeDLHandler,
     YoutubeDLRedirectHandler,
 )
+from .archive import get_download_archive
 from .cache import Cache
+from .hostlimiter import (
+    HostRateLimiter,
+    parse_retry_after,
+)
+from .jsonstream import (
+    compact_info,
+    JSONStreamWriter,
+    read_info_json,
+)
+from .outtmpl import OutputTemplate
+from .retry import RetryPolicy
 from .extractor import get_info_extractor, gen_extractor_classes, _LAZY_LOADER
-from .extractor.openload import PhantomJSwrapper
+from .extractor.dispatch import ExtractorIndex
 from .downloader import get_suitable_downloader
-from .downloader.rtmp import rtmpdump_version
 from .postprocessor import (
     FFmpegFixupM3u8PP,
     FFmpegFixupM4aPP,
@@ -113,6 +129,26 @@ if compat_os_name == 'nt':
     import ctypes
 
 
+def _accepts_keyword(func, name):
+    """Whether the callable func can be called with the keyword argument name"""
+    if hasattr(inspect, 'signature'):
+        try:
+            parameters = inspect.signature(func).parameters.values()
+        except (TypeError, ValueError):
+            return False
+        return any(
+            p.kind == p.VAR_KEYWORD
+            or (p.name == name and p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY))
+            for p in parameters)
+    if not inspect.isfunction(func) and not inspect.ismethod(func):
+        func = getattr(func, '__call__', None)
+    try:
+        spec = inspect.getargspec(func)
+    except TypeError:
+        return False
+    return spec.keywords is not None or name in spec.args
+
+
 class YoutubeDL(object):
     """YoutubeDL class.
 
@@ -159,7 +195,15 @@ class YoutubeDL(object):
     forceduration:     Force printing duration.
     forcejson:         Force printing info_dict as JSON.
     dump_single_json:  Force printing the info_dict of the whole playlist
-                       (or video) as a single JSON line.
+                       (or video) as a single JSON line. It is written while
+                       the playlist is processed.
+    json_lines:        With dump_single_json, print the playlists (without
+                       their entries) and their entries on lines of their
+                       own.
+    compact_json:      Leave the fragments and the HTTP headers out of the
+                       printed JSON.
+    buffer_json:       With dump_single_json, print each JSON document at
+                       once when it is complete.
     simulate:          Do not download the video files.
     format:            Video format code. See options.py for more information.
     outtmpl:           Template for output names.
@@ -172,6 +216,9 @@ class YoutubeDL(object):
     playlist_items:    Specific indices of playlist to download.
     playlistreverse:   Download playlist items in reverse order.
     playlistrandom:    Download playlist items in random order.
+    stream_playlists:  Process the entries of playlists as they are extracted
+                       and don't keep their results: the playlist results
+                       have no entries. Use playlist_hooks to get them.
     matchtitle:        Download only matching titles.
     rejecttitle:       Reject downloads for matching titles.
     logger:            Log messages to a logging.Logger instance.
@@ -193,6 +240,15 @@ class YoutubeDL(object):
     skip_download:     Skip the actual download of the video file
     cachedir:          Location of the cache files in the filesystem.
                        False to disable filesystem cache.
+    extraction_cache_ttl: Seconds during which the extracted information of
+                       a video is reused from the cache, instead of
+                       extracting it again. It must be shorter than the
+                       validity of the media URLs. None to disable it.
+    failure_cache_ttl: Seconds during which the URLs whose extraction failed
+                       permanently (the video doesn't exist, it requires
+                       logging in or it is geo restricted) are skipped
+                       without extracting them again. None to disable it.
+    recheck_failed:    Extract again the URLs skipped by failure_cache_ttl.
     noplaylist:        Download single video instead of a playlist if in doubt.
     age_limit:         An integer representing the user's age in years.
                        Unsuitable videos for the given age are skipped.
@@ -208,6 +264,13 @@ class YoutubeDL(object):
     download_archive:  File name of a file where all downloads are recorded.
                        Videos already present in the file are not downloaded
                        again.
+    download_archive_backend: Storage of the download archive, either 'text'
+                       (one ID per line) or 'sqlite'. Guessed from the
+                       download_archive file extension if unset.
+    download_claims:   A picta_dl.workers.DownloadClaims shared with other
+                       processes downloading the same batch. Videos claimed
+                       by another process are skipped, and output files are
+                       locked while they are downloaded.
     cookiefile:        File name where cookies should be read from and dumped to.
     nocheckcertificate:Do not verify SSL certificates
     prefer_insecure:   Use HTTP instead of HTTPS to retrieve information.
@@ -216,6 +279,30 @@ class YoutubeDL(object):
     geo_verification_proxy:  URL of the proxy to use for IP address verification
                        on geo-restricted sites.
     socket_timeout:    Time to wait for unresponsive hosts, in seconds
+    max_request_rate:  Maximum number of HTTP requests per second to each host
+                       (see picta_dl.hostlimiter.HostRateLimiter).
+    request_burst:     Number of requests to a host that may be made at once
+                       before max_request_rate applies.
+    throttle_retries:  Number of times a request throttled by the host (HTTP
+                       error 429, or 503 with Retry-After) is retried after the
+                       delay asked for (default is retries, or else 3).
+    max_retry_after:   Maximum number of seconds to wait for a throttling host,
+                       whatever it asks for in Retry-After (default is 300).
+    retry_backoff:     Base of the exponential back-off between the retries of
+                       a failed request, in seconds (default is 1, see
+                       picta_dl.retry.RetryPolicy).
+    circuit_breaker_threshold: Number of consecutive timeouts, resets or
+                       server errors of a host after which its requests
+                       fail at once for circuit_breaker_cooldown seconds
+                       (default is None: disabled, only the retries of each
+                       request limit them).
+    circuit_breaker_cooldown: Number of seconds during which the requests to
+                       a host fail at once when its circuit is open (default
+                       is 30).
+    extractor_retries: Number of times the extractors retry a webpage or API
+                       request after a timeout, a reset connection or a server
+                       error (default is 3, and 0 for the requests whose
+                       failure is not fatal).
     bidi_workaround:   Work around buggy terminals without bidirectional text
                        support, using fridibi
     debug_printtraffic:Print out sent and received HTTP traffic
@@ -255,6 +342,17 @@ class YoutubeDL(object):
 
                        Progress hooks are guaranteed to be called at least once
                        (with status "finished") if the download is successful.
+    playlist_hooks:    A list of functions that get called while a playlist
+                       is processed, with a dictionary with the entries
+                       * status: One of "started", "entry" or "finished".
+                                 Check this first and ignore unknown values.
+                       * playlist: The playlist result. Its entries are
+                                   only resolved once it is finished.
+                       If status is "entry", the following are also present:
+                       * info_dict: The result of the entry, as soon as it
+                                    has been processed. None if it failed
+                                    (with ignoreerrors).
+                       * playlist_index: The index of the entry.
     merge_output_format: Extension to use when merging formats.
     fixup:             Automatically correct known faults of the file.
                        One of:
@@ -281,6 +379,9 @@ class YoutubeDL(object):
                        every video.
                        If it returns a message, the video is ignored.
                        If it returns None, the video is downloaded.
+                       It is also called with incomplete=True for playlist
+                       entries that have not been extracted yet, if it
+                       accepts that keyword argument.
                        match_filter_func in utils.py is one example for this.
     no_color:          Do not emit color codes in output.
     geo_bypass:        Bypass geographic restriction via faking X-Forwarded-For
@@ -346,10 +447,30 @@ class YoutubeDL(object):
             params = {}
         self._ies = []
         self._ies_instances = {}
+        self._ies_index = None
         self._pps = []
+        self._download_archive = None
         self._progress_hooks = []
+        self._playlist_hooks = []
         self._download_retcode = 0
         self._num_downloads = 0
+        # Guards the state shared by the threads using this instance
+        self._lock = threading.RLock()
+        # Keeps the lines written by different threads whole
+        self._output_lock = threading.RLock()
+        # State of the download() calls of each thread
+        self._local = threading.local()
+        # Compiled output templates, by template
+        self._outtmpl_cache = {}
+        # Compiled format selectors and filters, by specification
+        self._format_selectors = {}
+        self._format_filters = {}
+        # Formats of the last MPD manifests downloaded in this run, by URL
+        self._mpd_cache = collections.OrderedDict()
+        # Use of the extraction cache (extraction_cache_ttl)
+        self._extraction_cache_stats = {'hits': 0, 'misses': 0, 'stored': 0}
+        # Use of the cache of permanent failures (failure_cache_ttl)
+        self._failure_cache_stats = {'skipped': 0, 'stored': 0}
         self._screen_file = [sys.stdout, sys.stderr][params.get('logtostderr', False)]
         self._err_file = sys.stderr
         self.params = {
@@ -358,6 +479,13 @@ class YoutubeDL(object):
         }
         self.params.update(params)
         self.cache = Cache(self)
+        self.host_limiter = HostRateLimiter(
+            self.params.get('max_request_rate'), self.params.get('request_burst'),
+            self.params.get('max_retry_after'))
+        self.retry_policy = RetryPolicy(
+            self.params.get('retry_backoff', 1.0),
+            failure_threshold=self.params.get('circuit_breaker_threshold'),
+            cooldown=self.params.get('circuit_breaker_cooldown', 30.0))
 
         def check_deprecated(param, option, suggestion):
             if self.params.get(param) is not None:
@@ -432,6 +560,9 @@ class YoutubeDL(object):
         for ph in self.params.get('progress_hooks', []):
             self.add_progress_hook(ph)
 
+        for ph in self.params.get('playlist_hooks', []):
+            self.add_playlist_hook(ph)
+
         register_socks_protocols()
 
     def warn_if_short_id(self, argv):
@@ -453,6 +584,7 @@ class YoutubeDL(object):
     def add_info_extractor(self, ie):
         """Add an InfoExtractor object to the end of the list."""
         self._ies.append(ie)
+        self._ies_index = None
         if not isinstance(ie, type):
             self._ies_instances[ie.ie_key()] = ie
             ie.set_downloader(self)
@@ -463,12 +595,21 @@ class YoutubeDL(object):
         the _ies list, if there's no instance it will create a new one and add
         it to the extractor list.
         """
-        ie = self._ies_instances.get(ie_key)
-        if ie is None:
-            ie = get_info_extractor(ie_key)()
-            self.add_info_extractor(ie)
+        with self._lock:
+            ie = self._ies_instances.get(ie_key)
+            if ie is None:
+                ie = get_info_extractor(ie_key)()
+                self.add_info_extractor(ie)
         return ie
 
+    def _candidate_ies(self, url):
+        """Info extractors that may be suitable for url, in order"""
+        index = self._ies_index
+        if index is None:
+            with self._lock:
+                index = self._ies_index = ExtractorIndex(self._ies)
+        return index.candidates(url)
+
     def add_default_info_extractors(self):
         """
         Add the InfoExtractors returned by gen_extractors to the end of the list
@@ -485,6 +626,14 @@ class YoutubeDL(object):
         """Add the progress hook (currently only for the file downloader)"""
         self._progress_hooks.append(ph)
 
+    def add_playlist_hook(self, ph):
+        """Add the playlist hook, see playlist_hooks"""
+        self._playlist_hooks.append(ph)
+
+    def _call_playlist_hooks(self, status, playlist, **kwargs):
+        for ph in self._playlist_hooks:
+            ph(dict(kwargs, status=status, playlist=playlist))
+
     def _bidi_workaround(self, message):
         if not hasattr(self, '_output_channel'):
             return message
@@ -503,18 +652,20 @@ class YoutubeDL(object):
         return self.to_stdout(message, skip_eol, check_quiet=True)
 
     def _write_string(self, s, out=None):
-        write_string(s, out=out, encoding=self.params.get('encoding'))
+        with self._output_lock:
+            write_string(s, out=out, encoding=self.params.get('encoding'))
 
     def to_stdout(self, message, skip_eol=False, check_quiet=False):
         """Print message to stdout if not in quiet mode."""
         if self.params.get('logger'):
             self.params['logger'].debug(message)
         elif not check_quiet or not self.params.get('quiet', False):
-            message = self._bidi_workaround(message)
-            terminator = ['\n', ''][skip_eol]
-            output = message + terminator
+            with self._output_lock:
+                message = self._bidi_workaround(message)
+                terminator = ['\n', ''][skip_eol]
+                output = message + terminator
 
-            self._write_string(output, self._screen_file)
+                self._write_string(output, self._screen_file)
 
     def to_stderr(self, message):
         """Print message to stderr."""
@@ -522,9 +673,10 @@ class YoutubeDL(object):
         if self.params.get('logger'):
             self.params['logger'].error(message)
         else:
-            message = self._bidi_workaround(message)
-            output = message + '\n'
-            self._write_string(output, self._err_file)
+            with self._output_lock:
+                message = self._bidi_workaround(message)
+                output = message + '\n'
+                self._write_string(output, self._err_file)
 
     def to_console_title(self, message):
         if not self.params.get('consoletitle', False):
@@ -565,6 +717,30 @@ class YoutubeDL(object):
         if self.params.get('cookiefile') is not None:
             self.cookiejar.save(ignore_discard=True, ignore_expires=True)
 
+        if self._download_archive is not None:
+            self._download_archive.close()
+            self._download_archive = None
+
+        if self.params.get('verbose'):
+            for kind, stats in sorted(self.retry_policy.stats().items()):
+                if stats['retries'] or stats['circuits_opened']:
+                    self._write_string(
+                        '[debug] %s requests: %d retries, %.1f seconds lost, %d circuits opened\n' % (
+                            kind, stats['retries'], stats['time_lost'], stats['circuits_opened']))
+            for host, stats in sorted(self.host_limiter.stats().items()):
+                if stats['throttled'] or stats['waited']:
+                    self._write_string(
+                        '[debug] %s: %d requests, %d throttled, waited %.1f seconds\n' % (
+                            host, stats['requests'], stats['throttled'], stats['waited']))
+            if self.params.get('extraction_cache_ttl'):
+                self._write_string(
+                    '[debug] Extraction cache: %(hits)d hits, %(misses)d misses, %(stored)d stored\n'
+                    % self._extraction_cache_stats)
+            if self.params.get('failure_cache_ttl'):
+                self._write_string(
+                    '[debug] Failure cache: %(skipped)d URLs skipped, %(stored)d failures stored\n'
+                    % self._failure_cache_stats)
+
     def trouble(self, message=None, tb=None):
         """Determine action to take when a download problem appears.
 
@@ -593,7 +769,57 @@ class YoutubeDL(object):
             else:
                 exc_info = sys.exc_info()
             raise DownloadError(message, exc_info)
-        self._download_retcode = 1
+        self._set_download_retcode(1)
+
+    @contextlib.contextmanager
+    def _download_job(self, cancel_event=None, progress_hooks=()):
+        """Context of a download() call: its return code only reflects the
+        errors of this call, even if other threads use the instance.
+
+        Setting cancel_event (a threading.Event) makes the call raise
+        DownloadCancelled at the next check_cancelled(). progress_hooks are
+        only called for the downloads of this call. Both are inherited by
+        nested calls.
+        """
+        outer = getattr(self._local, 'job', None)
+        job = self._local.job = {
+            'retcode': 0,
+            'cancel_event': cancel_event or (outer and outer['cancel_event']),
+            'progress_hooks': list(progress_hooks) + (outer['progress_hooks'] if outer else []),
+        }
+        try:
+            yield job
+        finally:
+            self._local.job = outer
+            if outer is not None:
+                outer['retcode'] = max(outer['retcode'], job['retcode'])
+
+    def check_cancelled(self):
+        """Raise DownloadCancelled if the download() call of the current
+        thread has been cancelled"""
+        job = getattr(self._local, 'job', None)
+        if job is not None and job['cancel_event'] is not None and job['cancel_event'].is_set():
+            raise DownloadCancelled()
+
+    def extract_info_async(self, url, *args, **kwargs):
+        """Asynchronous extract_info for asyncio code: return an AsyncJob
+        (see picta_dl.aio) to await for the result of the call"""
+        from .aio import AsyncJob
+        return AsyncJob(self, lambda: self.extract_info(url, *args, **kwargs))
+
+    def download_async(self, url_list):
+        """Asynchronous download for asyncio code: return an AsyncJob
+        (see picta_dl.aio) to await for the return code. The progress of its
+        downloads can be followed by iterating it with async for."""
+        from .aio import AsyncJob
+        return AsyncJob(self, lambda: self.download(url_list))
+
+    def _set_download_retcode(self, retcode):
+        with self._lock:
+            self._download_retcode = retcode
+        job = getattr(self._local, 'job', None)
+        if job is not None:
+            job['retcode'] = retcode
 
     def report_warning(self, message):
         '''
@@ -631,84 +857,51 @@ class YoutubeDL(object):
         except UnicodeEncodeError:
             self.to_screen('[download] The file has already been downloaded')
 
+    def _compiled_outtmpl(self):
+        outtmpl = self.params.get('outtmpl', DEFAULT_OUTTMPL)
+        compiled = self._outtmpl_cache.get(outtmpl)
+        if compiled is None:
+            compiled = self._outtmpl_cache[outtmpl] = OutputTemplate(outtmpl, self._NUMERIC_FIELDS)
+        return compiled
+
     def prepare_filename(self, info_dict):
         """Generate the output filename."""
         try:
-            template_dict = dict(info_dict)
+            outtmpl = self._compiled_outtmpl()
+            # Only the fields used by the template are sanitized
+            template_dict = dict(
+                (k, info_dict[k]) for k in outtmpl.fields if k in info_dict)
 
-            template_dict['epoch'] = int(time.time())
+            if 'epoch' in outtmpl.fields:
+                template_dict['epoch'] = int(time.time())
             autonumber_size = self.params.get('autonumber_size')
             if autonumber_size is None:
                 autonumber_size = 5
-            template_dict['autonumber'] = self.params.get('autonumber_start', 1) - 1 + self._num_downloads
-            if template_dict.get('resolution') is None:
-                if template_dict.get('width') and template_dict.get('height'):
-                    template_dict['resolution'] = '%dx%d' % (template_dict['width'], template_dict['height'])
-                elif template_dict.get('height'):
-                    template_dict['resolution'] = '%sp' % template_dict['height']
-                elif template_dict.get('width'):
-                    template_dict['resolution'] = '%dx?' % template_dict['width']
-
+            if 'autonumber' in outtmpl.fields:
+                # The number of the last download of this thread
+                num_downloads = getattr(self._local, 'num_downloads', self._num_downloads)
+                template_dict['autonumber'] = self.params.get('autonumber_start', 1) - 1 + num_downloads
+            if 'resolution' in outtmpl.fields and template_dict.get('resolution') is None:
+                if info_dict.get('width') and info_dict.get('height'):
+                    template_dict['resolution'] = '%dx%d' % (info_dict['width'], info_dict['height'])
+                elif info_dict.get('height'):
+                    template_dict['resolution'] = '%sp' % info_dict['height']
+                elif info_dict.get('width'):
+                    template_dict['resolution'] = '%dx?' % info_dict['width']
+
+            restricted = self.params.get('restrictfilenames')
             sanitize = lambda k, v: sanitize_filename(
-                compat_str(v),
-                restricted=self.params.get('restrictfilenames'),
+                compat_str(v), restricted=restricted,
                 is_id=(k == 'id' or k.endswith('_id')))
             template_dict = dict((k, v if isinstance(v, compat_numeric_types) else sanitize(k, v))
                                  for k, v in template_dict.items()
                                  if v is not None and not isinstance(v, (list, tuple, dict)))
             template_dict = collections.defaultdict(lambda: 'NA', template_dict)
 
-            outtmpl = self.params.get('outtmpl', DEFAULT_OUTTMPL)
-
-            # For fields playlist_index and autonumber convert all occurrences
-            # of %(field)s to %(field)0Nd for backward compatibility
-            field_size_compat_map = {
-                'playlist_index': len(str(template_dict['n_entries'])),
-                'autonumber': autonumber_size,
-            }
-            FIELD_SIZE_COMPAT_RE = r'(?<!%)%\((?P<field>autonumber|playlist_index)\)s'
-            mobj = re.search(FIELD_SIZE_COMPAT_RE, outtmpl)
-            if mobj:
-                outtmpl = re.sub(
-                    FIELD_SIZE_COMPAT_RE,
-                    r'%%(\1)0%dd' % field_size_compat_map[mobj.group('field')],
-                    outtmpl)
-
-            # Missing numeric fields used together with integer presentation types
-            # in format specification will break the argument substitution since
-            # string 'NA' is returned for missing fields. We will patch output
-            # template for missing fields to meet string presentation type.
-            for numeric_field in self._NUMERIC_FIELDS:
-                if numeric_field not in template_dict:
-                    # As of [1] format syntax is:
-                    #  %[mapping_key][conversion_flags][minimum_width][.precision][length_modifier]type
-                    # 1. https://docs.python.org/2/library/stdtypes.html#string-formatting
-                    FORMAT_RE = r'''(?x)
-                        (?<!%)
-                        %
-                        \({0}\)  # mapping key
-                        (?:[#0\-+ ]+)?  # conversion flags (optional)
-                        (?:\d+)?  # minimum field width (optional)
-                        (?:\.\d+)?  # precision (optional)
-                        [hlL]?  # length modifier (optional)
-                        [diouxXeEfFgGcrs%]  # conversion type
-                    '''
-                    outtmpl = re.sub(
-                        FORMAT_RE.format(numeric_field),
-                        r'%({0})s'.format(numeric_field), outtmpl)
-
-            # expand_path translates '%%' into '%' and '$$' into '$'
-            # correspondingly that is not what we want since we need to keep
-            # '%%' intact for template dict substitution step. Working around
-            # with boundary-alike separator hack.
-            sep = ''.join([random.choice(ascii_letters) for _ in range(32)])
-            outtmpl = outtmpl.replace('%%', '%{0}%'.format(sep)).replace('$$', '${0}$'.format(sep))
-
-            # outtmpl should be expand_path'ed before template dict substitution
-            # because meta fields may contain env variables we don't want to
-            # be expanded. For example, for outtmpl "%(title)s.%(ext)s" and
-            # title "Hello $PATH", we don't want `$PATH` to be expanded.
-            filename = expand_path(outtmpl).replace(sep, '') % template_dict
+            # n_entries is None for the playlists processed as they are
+            # extracted (stream_playlists)
+            streamed = 'n_entries' in info_dict and info_dict['n_entries'] is None
+            filename = outtmpl.substitute(template_dict, autonumber_size, streamed)
 
             # Temporary fix for #4787
             # 'Treat' all problem characters by passing filename through preferredencoding
@@ -753,12 +946,19 @@ class YoutubeDL(object):
         if self.in_download_archive(info_dict):
             return '%s has already been recorded in archive' % video_title
 
-        if not incomplete:
-            match_filter = self.params.get('match_filter')
-            if match_filter is not None:
+        match_filter = self.params.get('match_filter')
+        if match_filter is not None:
+            if not incomplete:
                 ret = match_filter(info_dict)
-                if ret is not None:
-                    return ret
+            else:
+                # Playlist entries may already carry some metadata, check it
+                # before paying for the full extraction. Only filters that
+                # know how to handle missing fields can be used here.
+                ret = None
+                if _accepts_keyword(match_filter, 'incomplete'):
+                    ret = match_filter(info_dict, incomplete=True)
+            if ret is not None:
+                return ret
 
         return None
 
@@ -776,13 +976,15 @@ class YoutubeDL(object):
         extra_info is a dict containing the extra values to add to each result
         '''
 
+        self.check_cancelled()
+
         if not ie_key and force_generic_extractor:
             ie_key = 'Generic'
 
         if ie_key:
             ies = [self.get_info_extractor(ie_key)]
         else:
-            ies = self._ies
+            ies = self._candidate_ies(url)
 
         for ie in ies:
             if not ie.suitable(url):
@@ -793,8 +995,14 @@ class YoutubeDL(object):
                 self.report_warning('The program functionality for this site has been marked as broken, '
                                     'and will probably not work.')
 
+            failure = self._cached_failure(ie, url)
+            if failure is not None:
+                self.report_error(
+                    '%s (remembered from a previous run, use --recheck-failed to extract it again)' % failure)
+                break
+
             try:
-                ie_result = ie.extract(url)
+                ie_result = self._extract_cached(ie, url)
                 if ie_result is None:  # Finished already (backwards compatibility; listformats and friends should be moved here)
                     break
                 if isinstance(ie_result, list):
@@ -814,12 +1022,14 @@ class YoutubeDL(object):
                     msg += '\nThis video is available in %s.' % ', '.join(
                         map(ISO3166Utils.short2full, e.countries))
                 msg += '\nYou might want to use a VPN or a proxy server (with --proxy) to workaround.'
+                self._remember_failure(ie, url, e, e.msg)
                 self.report_error(msg)
                 break
             except ExtractorError as e:  # An error we somewhat expected
+                self._remember_failure(ie, url, e, compat_str(e))
                 self.report_error(compat_str(e), e.format_traceback())
                 break
-            except MaxDownloadsReached:
+            except (MaxDownloadsReached, DownloadCancelled):
                 raise
             except Exception as e:
                 if self.params.get('ignoreerrors', False):
@@ -830,6 +1040,110 @@ class YoutubeDL(object):
         else:
             self.report_error('no suitable InfoExtractor for URL %s' % url)
 
+    # Number of MPD manifests whose formats are kept
+    _MPD_CACHE_SIZE = 8
+
+    def _get_cached_mpd(self, key):
+        with self._lock:
+            entry = self._mpd_cache.pop(key, None)
+            if entry is not None:
+                # The most recently used last
+                self._mpd_cache[key] = entry
+            return entry
+
+    def _cache_mpd(self, key, entry):
+        with self._lock:
+            self._mpd_cache.pop(key, None)
+            self._mpd_cache[key] = entry
+            while len(self._mpd_cache) > self._MPD_CACHE_SIZE:
+                self._mpd_cache.popitem(last=False)
+
+    def _extraction_cache_key(self, ie, url):
+        # The result depends on the whole URL (e.g. its playlist), on the
+        # data smuggled in it and on noplaylist, not only on the video
+        url, smuggled_data = unsmuggle_url(url)
+        key = json.dumps(
+            [url, smuggled_data, bool(self.params.get('noplaylist'))], sort_keys=True)
+        return '%s-%s' % (ie.ie_key(), hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def _count_cache_stat(self, stats, stat):
+        with self._lock:
+            stats[stat] += 1
+
+    def _extract_cached(self, ie, url):
+        """ie.extract(url), whose result is reused from the cache for
+        extraction_cache_ttl seconds"""
+        ttl = self.params.get('extraction_cache_ttl')
+        if not ttl:
+            return ie.extract(url)
+        key = self._extraction_cache_key(ie, url)
+        ie_result = self.cache.load_expiring('extractions', key)
+        if ie_result is not None:
+            self._count_cache_stat(self._extraction_cache_stats, 'hits')
+            self.to_screen('[%s] %s: Using the cached information' % (ie.IE_NAME, ie_result.get('id')))
+            return ie_result
+        self._count_cache_stat(self._extraction_cache_stats, 'misses')
+        ie_result = ie.extract(url)
+        # The entries of playlists may be generated lazily, only the videos
+        # are cached
+        if isinstance(ie_result, dict) and ie_result.get('_type', 'video') == 'video':
+            self.cache.store_expiring('extractions', key, ie_result, ttl)
+            self._count_cache_stat(self._extraction_cache_stats, 'stored')
+        return ie_result
+
+    @staticmethod
+    def _permanent_failure(err):
+        """The kind of permanent failure of err, an ExtractorError: 'login',
+        'geo' or 'not_found'. None if extracting again may succeed."""
+        if isinstance(err, LoginRequiredError):
+            return 'login'
+        if isinstance(err, GeoRestrictedError):
+            return 'geo'
+        if isinstance(err, VideoNotFoundError) or (
+                isinstance(err.cause, compat_HTTPError) and err.cause.code in (404, 410)):
+            return 'not_found'
+        return None
+
+    def _remember_failure(self, ie, url, err, message):
+        ttl = self.params.get('failure_cache_ttl')
+        kind = self._permanent_failure(err)
+        if not ttl or kind is None:
+            return
+        self.cache.store_expiring('failures', self._extraction_cache_key(ie, url), {
+            'kind': kind,
+            'message': message,
+        }, ttl)
+        self._count_cache_stat(self._failure_cache_stats, 'stored')
+
+    def _cached_failure(self, ie, url):
+        """The message of the permanent failure of url remembered by
+        _remember_failure, or None"""
+        if not self.params.get('failure_cache_ttl'):
+            return None
+        key = self._extraction_cache_key(ie, url)
+        if self.params.get('recheck_failed'):
+            self.cache.remove_entry('failures', key)
+            return None
+        failure = self.cache.load_expiring('failures', key)
+        if not isinstance(failure, dict):
+            return None
+        # The credentials may have been given since
+        if failure.get('kind') == 'login' and (
+                self.params.get('username') is not None or self.params.get('usenetrc')):
+            return None
+        self._count_cache_stat(self._failure_cache_stats, 'skipped')
+        return failure.get('message')
+
+    def _uncache_extraction(self, url):
+        """Remove the cached extraction of url"""
+        if not self.params.get('extraction_cache_ttl'):
+            return
+        for ie in self._candidate_ies(url):
+            if ie.suitable(url):
+                ie = self.get_info_extractor(ie.ie_key())
+                self.cache.remove_entry('extractions', self._extraction_cache_key(ie, url))
+                return
+
     def add_default_extra_info(self, ie_result, ie, url):
         self.add_extra_info(ie_result, {
             'extractor': ie.IE_NAME,
@@ -853,6 +1167,9 @@ class YoutubeDL(object):
             extract_flat = self.params.get('extract_flat', False)
             if ((extract_flat == 'in_playlist' and 'playlist' in extra_info)
                     or extract_flat is True):
+                # The data smuggled for the extractor (e.g. PictaIE's
+                # playlist entries) is not part of the output
+                ie_result['url'] = unsmuggle_url(ie_result['url'])[0]
                 self.__forced_printings(
                     ie_result, self.prepare_filename(ie_result),
                     incomplete=True)
@@ -926,6 +1243,8 @@ class YoutubeDL(object):
                 playlistitems = orderedSet(iter_playlistitems(playlistitems_str))
 
             ie_entries = ie_result['entries']
+            stream = self.params.get('stream_playlists', False)
+            n_entries = 0
 
             def make_playlistitems_entries(list_ie_entries):
                 num_entries = len(list_ie_entries)
@@ -964,11 +1283,23 @@ class YoutubeDL(object):
                 if playlistitems:
                     entries = make_playlistitems_entries(list(itertools.islice(
                         ie_entries, 0, max(playlistitems))))
+                elif stream and not (
+                        self.params.get('playlistreverse', False)
+                        or self.params.get('playlistrandom', False)):
+                    # The entries are extracted as they are processed, so
+                    # their number isn't known
+                    entries = itertools.islice(
+                        ie_entries, playliststart, playlistend)
+                    n_entries = None
+                    self.to_screen(
+                        '[%s] playlist %s: Downloading videos as they are extracted' %
+                        (ie_result['extractor'], playlist))
                 else:
                     entries = list(itertools.islice(
                         ie_entries, playliststart, playlistend))
-                n_entries = len(entries)
-                report_download(n_entries)
+                if n_entries is not None:
+                    n_entries = len(entries)
+                    report_download(n_entries)
 
             if self.params.get('playlistreverse', False):
                 entries = entries[::-1]
@@ -978,8 +1309,12 @@ class YoutubeDL(object):
 
             x_forwarded_for = ie_result.get('__x_forwarded_for_ip')
 
+            self._call_playlist_hooks('started', ie_result)
             for i, entry in enumerate(entries, 1):
-                self.to_screen('[download] Downloading video %s of %s' % (i, n_entries))
+                if n_entries is None:
+                    self.to_screen('[download] Downloading video %s' % i)
+                else:
+                    self.to_screen('[download] Downloading video %s of %s' % (i, n_entries))
                 # This __x_forwarded_for_ip thing is a bit ugly but requires
                 # minimal changes
                 if x_forwarded_for:
@@ -1006,8 +1341,15 @@ class YoutubeDL(object):
                 entry_result = self.process_ie_result(entry,
                                                       download=download,
                                                       extra_info=extra)
-                playlist_results.append(entry_result)
+                self._call_playlist_hooks(
+                    'entry', ie_result, info_dict=entry_result,
+                    playlist_index=extra['playlist_index'])
+                # When streaming, the memory used doesn't grow with the
+                # number of entries
+                if not stream:
+                    playlist_results.append(entry_result)
             ie_result['entries'] = playlist_results
+            self._call_playlist_hooks('finished', ie_result)
             self.to_screen('[download] Finished downloading playlist: %s' % playlist)
             return ie_result
         elif result_type == 'compat_list':
@@ -1034,24 +1376,42 @@ class YoutubeDL(object):
         else:
             raise Exception('Invalid result type: %s' % result_type)
 
+    _FILTER_OPERATORS = {
+        '<': operator.lt,
+        '<=': operator.le,
+        '>': operator.gt,
+        '>=': operator.ge,
+        '=': operator.eq,
+        '!=': operator.ne,
+    }
+    _FILTER_OPERATOR_RE = re.compile(r'''(?x)\s*
+        (?P<key>width|height|tbr|abr|vbr|asr|filesize|filesize_approx|fps)
+        \s*(?P<op>%s)(?P<none_inclusive>\s*\?)?\s*
+        (?P<value>[0-9.]+(?:[kKmMgGtTpPeEzZyY]i?[Bb]?)?)
+        $
+        ''' % '|'.join(map(re.escape, _FILTER_OPERATORS.keys())))
+    _FILTER_STR_OPERATORS = {
+        '=': operator.eq,
+        '^=': lambda attr, value: attr.startswith(value),
+        '$=': lambda attr, value: attr.endswith(value),
+        '*=': lambda attr, value: value in attr,
+    }
+    _FILTER_STR_OPERATOR_RE = re.compile(r'''(?x)
+        \s*(?P<key>ext|acodec|vcodec|container|protocol|format_id)
+        \s*(?P<negation>!\s*)?(?P<op>%s)(?P<none_inclusive>\s*\?)?
+        \s*(?P<value>[a-zA-Z0-9._-]+)
+        \s*$
+        ''' % '|'.join(map(re.escape, _FILTER_STR_OPERATORS.keys())))
+
     def _build_format_filter(self, filter_spec):
         " Returns a function to filter the formats according to the filter_spec "
+        _filter = self._format_filters.get(filter_spec)
+        if _filter is None:
+            _filter = self._format_filters[filter_spec] = self._compile_format_filter(filter_spec)
+        return _filter
 
-        OPERATORS = {
-            '<': operator.lt,
-            '<=': operator.le,
-            '>': operator.gt,
-            '>=': operator.ge,
-            '=': operator.eq,
-            '!=': operator.ne,
-        }
-        operator_rex = re.compile(r'''(?x)\s*
-            (?P<key>width|height|tbr|abr|vbr|asr|filesize|filesize_approx|fps)
-            \s*(?P<op>%s)(?P<none_inclusive>\s*\?)?\s*
-            (?P<value>[0-9.]+(?:[kKmMgGtTpPeEzZyY]i?[Bb]?)?)
-            $
-            ''' % '|'.join(map(re.escape, OPERATORS.keys())))
-        m = operator_rex.search(filter_spec)
+    def _compile_format_filter(self, filter_spec):
+        m = self._FILTER_OPERATOR_RE.search(filter_spec)
         if m:
             try:
                 comparison_value = int(m.group('value'))
@@ -1063,25 +1423,13 @@ class YoutubeDL(object):
                     raise ValueError(
                         'Invalid value %r in format specification %r' % (
                             m.group('value'), filter_spec))
-            op = OPERATORS[m.group('op')]
+            op = self._FILTER_OPERATORS[m.group('op')]
 
         if not m:
-            STR_OPERATORS = {
-                '=': operator.eq,
-                '^=': lambda attr, value: attr.startswith(value),
-                '$=': lambda attr, value: attr.endswith(value),
-                '*=': lambda attr, value: value in attr,
-            }
-            str_operator_rex = re.compile(r'''(?x)
-                \s*(?P<key>ext|acodec|vcodec|container|protocol|format_id)
-                \s*(?P<negation>!\s*)?(?P<op>%s)(?P<none_inclusive>\s*\?)?
-                \s*(?P<value>[a-zA-Z0-9._-]+)
-                \s*$
-                ''' % '|'.join(map(re.escape, STR_OPERATORS.keys())))
-            m = str_operator_rex.search(filter_spec)
+            m = self._FILTER_STR_OPERATOR_RE.search(filter_spec)
             if m:
                 comparison_value = m.group('value')
-                str_op = STR_OPERATORS[m.group('op')]
+                str_op = self._FILTER_STR_OPERATORS[m.group('op')]
                 if m.group('negation'):
                     op = lambda attr, value: not str_op(attr, value)
                 else:
@@ -1090,10 +1438,13 @@ class YoutubeDL(object):
         if not m:
             raise ValueError('Invalid filter specification %r' % filter_spec)
 
+        key = m.group('key')
+        none_inclusive = m.group('none_inclusive')
+
         def _filter(f):
-            actual_value = f.get(m.group('key'))
+            actual_value = f.get(key)
             if actual_value is None:
-                return m.group('none_inclusive')
+                return none_inclusive
             return op(actual_value, comparison_value)
         return _filter
 
@@ -1122,6 +1473,14 @@ class YoutubeDL(object):
         return '/'.join(req_format_list)
 
     def build_format_selector(self, format_spec):
+        """Return the function selecting the formats of format_spec. It is
+        compiled once per spec and reused for all the videos."""
+        selector = self._format_selectors.get(format_spec)
+        if selector is None:
+            selector = self._format_selectors[format_spec] = self._compile_format_selector(format_spec)
+        return selector
+
+    def _compile_format_selector(self, format_spec):
         def syntax_error(note, start):
             message = (
                 'Invalid format specification: '
@@ -1723,13 +2082,17 @@ class YoutubeDL(object):
             self.to_stdout(formatSeconds(info_dict['duration']))
         print_mandatory('format')
         if self.params.get('forcejson', False):
-            self.to_stdout(json.dumps(info_dict))
+            self.to_stdout(json.dumps(
+                compact_info(info_dict) if self.params.get('compact_json') else info_dict,
+                default=json_default))
 
     def process_info(self, info_dict):
         """Process a single resolved IE result."""
 
         assert info_dict.get('_type', 'video') == 'video'
 
+        self.check_cancelled()
+
         max_downloads = self.params.get('max_downloads')
         if max_downloads is not None:
             if self._num_downloads >= int(max_downloads):
@@ -1746,7 +2109,20 @@ class YoutubeDL(object):
             self.to_screen('[download] ' + reason)
             return
 
-        self._num_downloads += 1
+        claims = self.params.get('download_claims')
+        if claims is not None:
+            vid_id = self._make_archive_id(info_dict)
+            if vid_id and not claims.claim(vid_id):
+                self.to_screen(
+                    '[download] %s has already been claimed by another worker' % info_dict['title'])
+                return
+
+        with self._lock:
+            # Other threads may have reached the limit meanwhile
+            if max_downloads is not None and self._num_downloads >= int(max_downloads):
+                raise MaxDownloadsReached()
+            self._num_downloads += 1
+            self._local.num_downloads = self._num_downloads
 
         info_dict['_filename'] = filename = self.prepare_filename(info_dict)
 
@@ -1860,9 +2236,21 @@ class YoutubeDL(object):
                     fd = get_suitable_downloader(info, self.params)(self, self.params)
                     for ph in self._progress_hooks:
                         fd.add_progress_hook(ph)
+                    job = getattr(self._local, 'job', None)
+                    for ph in (job['progress_hooks'] if job else []):
+                        fd.add_progress_hook(ph)
                     if self.params.get('verbose'):
                         self.to_stdout('[debug] Invoking downloader on %r' % info.get('url'))
-                    return fd.download(name, info)
+                    # The requests of the downloader are for the media
+                    # URLs, see urlopen
+                    self._local.downloading = True
+                    try:
+                        if claims is None:
+                            return fd.download(name, info)
+                        with claims.lock_output(name):
+                            return fd.download(name, info)
+                    finally:
+                        self._local.downloading = False
 
                 if info_dict.get('requested_formats') is not None:
                     downloaded = []
@@ -2012,38 +2400,70 @@ class YoutubeDL(object):
                 and self.params.get('max_downloads') != 1):
             raise SameFileError(outtmpl)
 
-        for url in url_list:
-            try:
-                # It also downloads the videos
-                res = self.extract_info(
-                    url, force_generic_extractor=self.params.get('force_generic_extractor', False))
-            except UnavailableVideoError:
-                self.report_error('unable to download video')
-            except MaxDownloadsReached:
-                self.to_screen('[info] Maximum number of downloaded files reached.')
-                raise
-            else:
-                if self.params.get('dump_single_json', False):
-                    self.to_stdout(json.dumps(res))
+        json_writer = None
+        if self.params.get('dump_single_json', False):
+            json_writer = JSONStreamWriter(
+                lambda s: self.to_stdout(s, skip_eol=True),
+                lines=self.params.get('json_lines', False),
+                compact=self.params.get('compact_json', False),
+                # A logger gets each document as one message
+                buffered=self.params.get('buffer_json', False) or bool(self.params.get('logger')))
+            self.add_playlist_hook(json_writer.playlist_hook)
+        try:
+            with self._download_job() as job:
+                for url in url_list:
+                    try:
+                        # It also downloads the videos
+                        res = self.extract_info(
+                            url, force_generic_extractor=self.params.get('force_generic_extractor', False))
+                    except UnavailableVideoError:
+                        self.report_error('unable to download video')
+                    except MaxDownloadsReached:
+                        self.to_screen('[info] Maximum number of downloaded files reached.')
+                        raise
+                    else:
+                        if json_writer is not None:
+                            json_writer.result(res)
+                    finally:
+                        if json_writer is not None:
+                            json_writer.close()
+        finally:
+            if json_writer is not None:
+                self._playlist_hooks.remove(json_writer.playlist_hook)
 
-        return self._download_retcode
+        return job['retcode']
 
     def download_with_info_file(self, info_filename):
-        with contextlib.closing(fileinput.FileInput(
-                [info_filename], mode='r',
-                openhook=fileinput.hook_encoded('utf-8'))) as f:
-            # FileInput doesn't have a read method, we can't call json.load
-            info = self.filter_requested_info(json.loads('\n'.join(f)))
-        try:
-            self.process_ie_result(info, download=True)
-        except DownloadError:
-            webpage_url = info.get('webpage_url')
-            if webpage_url is not None:
-                self.report_warning('The info failed to download, trying with "%s"' % webpage_url)
-                return self.download([webpage_url])
-            else:
-                raise
-        return self._download_retcode
+        """Download the videos of the info JSON file info_filename, see
+        read_info_json for the files it can be"""
+        with self._download_job() as job:
+            for info in read_info_json(info_filename):
+                self.download_with_info(info)
+        return job['retcode']
+
+    def download_with_info(self, info):
+        """Download the video of info, an info dict loaded from JSON, without
+        extracting it again. It is only extracted again from its webpage_url
+        if the media URLs have expired (HTTP error 403 or 410)."""
+        info = self.filter_requested_info(info)
+        webpage_url = info.get('webpage_url')
+        with self._download_job() as job:
+            try:
+                self.process_ie_result(info, download=True)
+            except DownloadError:
+                if not job.get('expired_url') or webpage_url is None:
+                    raise
+            if job.get('expired_url') and webpage_url is not None:
+                self.report_warning('The media URLs have expired, extracting them again from "%s"' % webpage_url)
+                job['retcode'] = 0
+                self._uncache_extraction(webpage_url)
+                # The claim of the failed download, see DownloadClaims
+                claims = self.params.get('download_claims')
+                vid_id = self._make_archive_id(info)
+                if claims is not None and vid_id:
+                    claims.release(vid_id)
+                self.download([webpage_url])
+        return job['retcode']
 
     @staticmethod
     def filter_requested_info(info_dict):
@@ -2085,7 +2505,7 @@ class YoutubeDL(object):
             if not url:
                 return
             # Try to find matching extractor for the URL and take its ie_key
-            for ie in self._ies:
+            for ie in self._candidate_ies(url):
                 if ie.suitable(url):
                     extractor = ie.ie_key()
                     break
@@ -2093,33 +2513,36 @@ class YoutubeDL(object):
                 return
         return extractor.lower() + ' ' + video_id
 
+    @property
+    def download_archive(self):
+        """The DownloadArchive of the download_archive param, None if unset"""
+        with self._lock:
+            if self._download_archive is None:
+                fn = self.params.get('download_archive')
+                if fn is None:
+                    return None
+                self._download_archive = get_download_archive(
+                    fn, self.params.get('download_archive_backend'))
+            return self._download_archive
+
     def in_download_archive(self, info_dict):
-        fn = self.params.get('download_archive')
-        if fn is None:
+        archive = self.download_archive
+        if archive is None:
             return False
 
         vid_id = self._make_archive_id(info_dict)
         if not vid_id:
             return False  # Incomplete video information
 
-        try:
-            with locked_file(fn, 'r', encoding='utf-8') as archive_file:
-                for line in archive_file:
-                    if line.strip() == vid_id:
-                        return True
-        except IOError as ioe:
-            if ioe.errno != errno.ENOENT:
-                raise
-        return False
+        return vid_id in archive
 
     def record_download_archive(self, info_dict):
-        fn = self.params.get('download_archive')
-        if fn is None:
+        archive = self.download_archive
+        if archive is None:
             return
         vid_id = self._make_archive_id(info_dict)
         assert vid_id
-        with locked_file(fn, 'a', encoding='utf-8') as archive_file:
-            archive_file.write(vid_id + '\n')
+        archive.add(vid_id, info_dict)
 
     @staticmethod
     def format_resolution(format, default='unknown'):
@@ -2235,7 +2658,43 @@ class YoutubeDL(object):
         """ Start an HTTP download """
         if isinstance(req, compat_basestring):
             req = sanitized_Request(req)
-        return self._opener.open(req, timeout=self._socket_timeout)
+        host = compat_urllib_parse_urlparse(req.get_full_url()).netloc
+        if not host:
+            return self._opener.open(req, timeout=self._socket_timeout)
+        retries = self.params.get('throttle_retries')
+        if retries is None:
+            retries = self.params.get('retries', 3)
+        for attempt in itertools.count():
+            self.host_limiter.acquire(host)
+            try:
+                res = self._opener.open(req, timeout=self._socket_timeout)
+            except compat_HTTPError as err:
+                if err.code in (403, 410) and getattr(self._local, 'downloading', False):
+                    # The media URLs of a replayed info have expired, see
+                    # download_with_info
+                    job = getattr(self._local, 'job', None)
+                    if job is not None:
+                        job['expired_url'] = True
+                if err.code not in (429, 503):
+                    raise
+                retry_after = parse_retry_after(err.info().get('Retry-After'))
+                # Without Retry-After, a 503 is an ordinary server error
+                if err.code == 503 and retry_after is None:
+                    raise
+                delay = self.host_limiter.throttled(host, retry_after)
+                if attempt >= retries:
+                    # Already retried, see retry.classify_error
+                    err.throttled = True
+                    raise
+                err.close()
+                self.to_screen(
+                    '[throttle] %s: HTTP Error %d, waiting %.1f seconds%s before retrying (attempt %d of %s)...' % (
+                        host, err.code, delay,
+                        ' (asked for %.1f)' % retry_after if retry_after is not None and retry_after > delay else '',
+                        attempt + 1, retries))
+                continue
+            self.host_limiter.succeeded(host)
+            return res
 
     def print_debug_header(self):
         if not self.params.get('verbose'):
@@ -2284,6 +2743,8 @@ class YoutubeDL(object):
             platform.python_version(), python_implementation(),
             platform_name()))
 
+        from .downloader.rtmp import rtmpdump_version
+        from .extractor.openload import PhantomJSwrapper
         exe_versions = FFmpegPostProcessor.get_versions(self)
         exe_versions['rtmpdump'] = rtmpdump_version()
         exe_versions['phantomjs'] = PhantomJSwrapper._version()
@@ -2321,7 +2782,7 @@ class YoutubeDL(object):
         opts_proxy = self.params.get('proxy')
 
         if opts_cookiefile is None:
-            self.cookiejar = compat_cookiejar.CookieJar()
+            self.cookiejar = YoutubeDLCookieJar()
         else:
             opts_cookiefile = expand_path(opts_cookiefile)
             self.cookiejar = YoutubeDLCookieJar(opts_cookiefile)
@@ -7,6 +7,7 @@ __license__ = 'Public Domain'
 
 import codecs
 import io
+import itertools
 import os
 import random
 import sys
@@ -25,9 +26,12 @@ from .utils import (
     decodeOption,
     DEFAULT_OUTTMPL,
     DownloadError,
+    error_to_compat_str,
     expand_path,
+    iter_batch_urls,
     match_filter_func,
     MaxDownloadsReached,
+    parse_duration,
     preferredencoding,
     read_batch_urls,
     SameFileError,
@@ -41,7 +45,6 @@ from .downloader import (
     FileDownloader,
 )
 from .extractor import gen_extractors, list_extractors
-from .extractor.adobepass import MSO_INFO
 from .YoutubeDL import YoutubeDL
 
 
@@ -90,14 +93,22 @@ def _real_main(argv=None):
                 batchfd = io.open(
                     expand_path(opts.batchfile),
                     'r', encoding='utf-8', errors='ignore')
-            batch_urls = read_batch_urls(batchfd)
-            if opts.verbose:
+            if opts.job_queue is not None:
+                # Streamed into the queue, see below
+                batch_urls = iter_batch_urls(batchfd)
+            else:
+                batch_urls = read_batch_urls(batchfd)
+            if opts.verbose and opts.job_queue is None:
                 write_string('[debug] Batch file urls: ' + repr(batch_urls) + '\n')
         except IOError:
             sys.exit('ERROR: batch file %s could not be read' % opts.batchfile)
-    all_urls = batch_urls + [url.strip() for url in args]  # batch_urls are already striped in read_batch_urls
     _enc = preferredencoding()
+    all_urls = [url.strip() for url in args]
     all_urls = [url.decode(_enc, 'ignore') if isinstance(url, bytes) else url for url in all_urls]
+    if opts.job_queue is not None:
+        queued_urls = itertools.chain(all_urls, batch_urls)
+    else:
+        all_urls = batch_urls + all_urls  # batch_urls are already striped in read_batch_urls
 
     if opts.list_extractors:
         for ie in list_extractors(opts.age_limit):
@@ -120,6 +131,7 @@ def _real_main(argv=None):
             write_string(desc + '\n', out=sys.stdout)
         sys.exit(0)
     if opts.ap_list_mso:
+        from .extractor.adobepass import MSO_INFO
         table = [[mso_id, mso_info['name']] for mso_id, mso_info in MSO_INFO.items()]
         write_string('Supported TV Providers:\n' + render_table(['mso', 'mso name'], table) + '\n', out=sys.stdout)
         sys.exit(0)
@@ -141,6 +153,50 @@ def _real_main(argv=None):
             parser.error('auto number start must be positive or 0')
     if opts.usetitle and opts.useid:
         parser.error('using title conflicts with using video ID')
+    if opts.job_queue_retries < 0:
+        parser.error('job queue retries must be positive or 0')
+    if opts.workers is not None:
+        if opts.workers < 1:
+            parser.error('number of workers must be positive')
+        if opts.max_downloads is not None:
+            parser.error('--max-downloads can not be used with --workers')
+        if opts.autonumber or '%(autonumber)' in (opts.outtmpl or ''):
+            parser.error('auto number can not be used with --workers')
+    if opts.extraction_cache_ttl is not None and opts.extraction_cache_ttl <= 0:
+        parser.error('extraction cache TTL must be positive')
+    if opts.failure_cache_ttl is not None and opts.failure_cache_ttl <= 0:
+        parser.error('failure cache TTL must be positive')
+    if opts.retry_backoff < 0:
+        parser.error('retry back-off must be positive or 0')
+    if opts.circuit_breaker_threshold is not None and opts.circuit_breaker_threshold < 1:
+        parser.error('circuit breaker failures must be positive')
+    if opts.circuit_breaker_cooldown < 0:
+        parser.error('circuit breaker cooldown must be positive or 0')
+    if opts.extractor_retries is not None and opts.extractor_retries < 0:
+        parser.error('extractor retries must be positive or 0')
+    if opts.max_request_rate is not None and opts.max_request_rate <= 0:
+        parser.error('maximum request rate must be positive')
+    if opts.request_burst < 1:
+        parser.error('request burst must be positive')
+    if opts.time_budget is not None:
+        time_budget = parse_duration(opts.time_budget)
+        if time_budget is None:
+            parser.error('invalid time budget specified')
+        opts.time_budget = time_budget
+        if opts.schedule is None:
+            opts.schedule = 'shortest-first'
+    if opts.schedule is not None:
+        if opts.workers is not None or opts.job_queue is not None:
+            parser.error('--schedule can not be used with --workers or --job-queue')
+    if opts.daemon is not None and (args or opts.batchfile is not None):
+        # The daemon only downloads the URLs its clients send
+        parser.error('--daemon can not be used with URLs or --batch-file')
+    if opts.stream_playlists and opts.schedule is not None:
+        parser.error('--stream-playlists can not be used with --schedule')
+    if opts.json_lines and not opts.dump_single_json:
+        parser.error('--json-lines requires --dump-single-json')
+    if opts.compact_json and not (opts.dumpjson or opts.print_json or opts.dump_single_json):
+        parser.error('--compact-json requires --dump-json, --print-json or --dump-single-json')
     if opts.username is not None and opts.password is None:
         opts.password = compat_getpass('Type account password and press [Return]: ')
     if opts.ap_username is not None and opts.ap_password is None:
@@ -172,8 +228,10 @@ def _real_main(argv=None):
             parser.error('max sleep interval must be greater than or equal to min sleep interval')
     else:
         opts.max_sleep_interval = opts.sleep_interval
-    if opts.ap_mso and opts.ap_mso not in MSO_INFO:
-        parser.error('Unsupported TV Provider, use --ap-list-mso to get a list of supported TV Providers')
+    if opts.ap_mso:
+        from .extractor.adobepass import MSO_INFO
+        if opts.ap_mso not in MSO_INFO:
+            parser.error('Unsupported TV Provider, use --ap-list-mso to get a list of supported TV Providers')
 
     def parse_retries(retries):
         if retries in ('inf', 'infinite'):
@@ -188,6 +246,10 @@ def _real_main(argv=None):
         opts.retries = parse_retries(opts.retries)
     if opts.fragment_retries is not None:
         opts.fragment_retries = parse_retries(opts.fragment_retries)
+    if opts.throttle_retries is not None:
+        opts.throttle_retries = parse_retries(opts.throttle_retries)
+    if opts.max_retry_after < 0:
+        parser.error('--max-retry-after must not be negative')
     if opts.buffersize is not None:
         numeric_buffersize = FileDownloader.parse_bytes(opts.buffersize)
         if numeric_buffersize is None:
@@ -246,6 +308,8 @@ def _real_main(argv=None):
     any_getting = opts.geturl or opts.gettitle or opts.getid or opts.getthumbnail or opts.getdescription or opts.getfilename or opts.getformat or opts.getduration or opts.dumpjson or opts.dump_single_json
     any_printing = opts.print_json
     download_archive_fn = expand_path(opts.download_archive) if opts.download_archive is not None else opts.download_archive
+    if (opts.archive_import is not None or opts.archive_export is not None) and download_archive_fn is None:
+        parser.error('--archive-import and --archive-export require --download-archive')
 
     # PostProcessors
     postprocessors = []
@@ -310,9 +374,12 @@ def _real_main(argv=None):
     postprocessor_args = None
     if opts.postprocessor_args:
         postprocessor_args = compat_shlex_split(opts.postprocessor_args)
-    match_filter = (
-        None if opts.match_filter is None
-        else match_filter_func(opts.match_filter))
+    match_filter = None
+    if opts.match_filter is not None:
+        try:
+            match_filter = match_filter_func(opts.match_filter)
+        except ValueError as err:
+            parser.error('invalid match filter: %s' % err)
 
     ydl_opts = {
         'usenetrc': opts.usenetrc,
@@ -335,6 +402,8 @@ def _real_main(argv=None):
         'forceformat': opts.getformat,
         'forcejson': opts.dumpjson or opts.print_json,
         'dump_single_json': opts.dump_single_json,
+        'json_lines': opts.json_lines,
+        'compact_json': opts.compact_json,
         'simulate': opts.simulate or any_getting,
         'skip_download': opts.skip_download,
         'format': opts.format,
@@ -349,6 +418,14 @@ def _real_main(argv=None):
         'nooverwrites': opts.nooverwrites,
         'retries': opts.retries,
         'fragment_retries': opts.fragment_retries,
+        'retry_backoff': opts.retry_backoff,
+        'extractor_retries': opts.extractor_retries,
+        'circuit_breaker_threshold': opts.circuit_breaker_threshold,
+        'circuit_breaker_cooldown': opts.circuit_breaker_cooldown,
+        'max_request_rate': opts.max_request_rate,
+        'request_burst': opts.request_burst,
+        'throttle_retries': opts.throttle_retries,
+        'max_retry_after': opts.max_retry_after,
         'skip_unavailable_fragments': opts.skip_unavailable_fragments,
         'keep_fragments': opts.keep_fragments,
         'buffersize': opts.buffersize,
@@ -361,6 +438,7 @@ def _real_main(argv=None):
         'playlistend': opts.playlistend,
         'playlistreverse': opts.playlist_reverse,
         'playlistrandom': opts.playlist_random,
+        'stream_playlists': opts.stream_playlists,
         'noplaylist': opts.noplaylist,
         'logtostderr': opts.outtmpl == '-',
         'consoletitle': opts.consoletitle,
@@ -392,9 +470,13 @@ def _real_main(argv=None):
         'max_views': opts.max_views,
         'daterange': date,
         'cachedir': opts.cachedir,
+        'extraction_cache_ttl': opts.extraction_cache_ttl,
+        'failure_cache_ttl': opts.failure_cache_ttl,
+        'recheck_failed': opts.recheck_failed,
         'youtube_print_sig_code': opts.youtube_print_sig_code,
         'age_limit': opts.age_limit,
         'download_archive': download_archive_fn,
+        'download_archive_backend': opts.download_archive_backend,
         'cookiefile': opts.cookiefile,
         'nocheckcertificate': opts.no_check_certificate,
         'prefer_insecure': opts.prefer_insecure,
@@ -447,9 +529,41 @@ def _real_main(argv=None):
         if opts.rm_cachedir:
             ydl.cache.remove()
 
+        # Bulk import/export of the download archive
+        archive_transfer = opts.archive_import is not None or opts.archive_export is not None
+        if opts.archive_import is not None:
+            count = ydl.download_archive.import_text(expand_path(opts.archive_import))
+            ydl.to_screen('[download] Imported %d IDs into the download archive' % count)
+        if opts.archive_export is not None:
+            count = ydl.download_archive.export_text(expand_path(opts.archive_export))
+            ydl.to_screen('[download] Exported %d IDs from the download archive' % count)
+
+        if opts.daemon is not None:
+            from .daemon import serve_daemon
+            try:
+                serve_daemon(ydl, opts.daemon, opts.daemon_token)
+            except (OSError, IOError, ValueError) as err:
+                parser.error('unable to serve on %s: %s' % (opts.daemon, error_to_compat_str(err)))
+            sys.exit(ydl._download_retcode)
+
+        job_queue = None
+        if opts.job_queue is not None:
+            from .jobqueue import JobQueue
+            try:
+                job_queue = JobQueue(expand_path(opts.job_queue), opts.job_queue_retries)
+                added = job_queue.add(queued_urls)
+                recovered = job_queue.recover()
+            except Exception as err:
+                parser.error('unable to use the job queue %s: %s' % (opts.job_queue, error_to_compat_str(err)))
+            counts = job_queue.counts()
+            ydl.to_screen(
+                '[queue] Added %d URLs, resuming %d interrupted jobs: %d pending, %d done, %d failed' % (
+                    added, recovered, counts.get(JobQueue.PENDING, 0),
+                    counts.get(JobQueue.DONE, 0), counts.get(JobQueue.FAILED, 0)))
+
         # Maybe do nothing
-        if (len(all_urls) < 1) and (opts.load_info_filename is None):
-            if opts.update_self or opts.rm_cachedir:
+        if (len(all_urls) < 1) and (opts.load_info_filename is None) and job_queue is None:
+            if opts.update_self or opts.rm_cachedir or archive_transfer:
                 sys.exit()
 
             ydl.warn_if_short_id(sys.argv[1:] if argv is None else argv)
@@ -458,8 +572,37 @@ def _real_main(argv=None):
                 'Type picta-dl --help to see a list of all options.')
 
         try:
-            if opts.load_info_filename is not None:
+            if opts.load_info_filename is not None and opts.workers is not None and opts.workers > 1:
+                from .jsonstream import read_info_json
+                from .workers import download_with_workers
+                try:
+                    retcode = download_with_workers(
+                        ydl, read_info_json(expand_path(opts.load_info_filename)), opts.workers)
+                except ValueError as err:
+                    parser.error(error_to_compat_str(err))
+            elif opts.load_info_filename is not None:
                 retcode = ydl.download_with_info_file(expand_path(opts.load_info_filename))
+            elif job_queue is not None and opts.workers is not None and opts.workers > 1:
+                from .workers import download_with_workers
+                try:
+                    retcode = download_with_workers(ydl, None, opts.workers, job_queue=job_queue)
+                except ValueError as err:
+                    parser.error(error_to_compat_str(err))
+            elif job_queue is not None:
+                from .jobqueue import download_from_queue
+                try:
+                    retcode = download_from_queue(ydl, job_queue)
+                finally:
+                    job_queue.close()
+            elif opts.schedule is not None:
+                from .scheduler import download_scheduled
+                retcode = download_scheduled(ydl, all_urls, opts.schedule, opts.time_budget)
+            elif opts.workers is not None and opts.workers > 1 and len(all_urls) > 1:
+                from .workers import download_with_workers
+                try:
+                    retcode = download_with_workers(ydl, all_urls, opts.workers)
+                except ValueError as err:
+                    parser.error(error_to_compat_str(err))
             else:
                 retcode = ydl.download(all_urls)
         except MaxDownloadsReached:
@@ -0,0 +1,86 @@
+from __future__ import unicode_literals
+
+import asyncio
+import collections
+import threading
+
+
+class AsyncJob(object):
+    """A call to a YoutubeDL method, run in a worker thread on behalf of an
+    asyncio event loop (see YoutubeDL.extract_info_async and
+    YoutubeDL.download_async).
+
+    Awaiting the job returns the result of the call, or raises its
+    exception. Iterating it with async for yields the statuses of its
+    downloads, as passed to progress hooks, until the call ends.
+
+    Cancelling the task awaiting the job (or calling cancel()) makes the
+    call raise DownloadCancelled at its next check, that is before the next
+    fragment or data block is downloaded. The partial download is left to
+    be resumed like an interrupted one.
+
+    The calls run in the executor given, by default the one of the loop,
+    so that many jobs share a bounded number of threads, and one YoutubeDL
+    instance can serve all of them. A job must be created while the loop
+    running it is, from a coroutine or a callback.
+    """
+
+    def __init__(self, ydl, func, executor=None):
+        self._ydl = ydl
+        # Python < 3.7 has no get_running_loop
+        self._loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)()
+        self._cancel_event = threading.Event()
+        self._statuses = collections.deque()
+        self._waiter = None
+        self._future = self._loop.run_in_executor(executor, self._run, func)
+        self._future.add_done_callback(self._on_done)
+
+    def _run(self, func):
+        with self._ydl._download_job(self._cancel_event, [self._progress_hook]):
+            return func()
+
+    def _progress_hook(self, status):
+        # Called in the worker thread, which may keep running until its next
+        # check after the job is cancelled and the loop closed
+        if self._cancel_event.is_set():
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._push_status, status)
+        except RuntimeError:  # The loop is closed
+            pass
+
+    def _push_status(self, status):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(status)
+            self._waiter = None
+        else:
+            self._statuses.append(status)
+
+    def _on_done(self, future):
+        if future.cancelled():
+            self._cancel_event.set()
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_exception(StopAsyncIteration())
+            self._waiter = None
+
+    def cancel(self):
+        return self._future.cancel()
+
+    def done(self):
+        return self._future.done()
+
+    def __await__(self):
+        return self._future.__await__()
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        waiter = self._loop.create_future()
+        if self._statuses:
+            waiter.set_result(self._statuses.popleft())
+        elif self._future.done():
+            waiter.set_exception(StopAsyncIteration())
+        else:
+            self._waiter = waiter
+        return waiter
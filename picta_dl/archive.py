@@ -0,0 +1,191 @@
+from __future__ import unicode_literals
+
+import errno
+import io
+import os
+import threading
+import time
+
+from .utils import (
+    encodeFilename,
+    int_or_none,
+    locked_file,
+)
+
+
+class DownloadArchive(object):
+    """Base class for download archives.
+
+    A download archive records the IDs (as built by
+    YoutubeDL._make_archive_id) of the videos that have been downloaded.
+    Subclasses must implement __contains__, add and __iter__, which may be
+    called from several threads.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._lock = threading.Lock()
+
+    def __contains__(self, vid_id):
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def __iter__(self):
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def add(self, vid_id, info_dict=None):
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def close(self):
+        pass
+
+    def import_text(self, filename):
+        """Add all the IDs of a text archive file, return their number"""
+        count = 0
+        with locked_file(filename, 'r', encoding='utf-8') as archive_file:
+            for line in archive_file:
+                vid_id = line.strip()
+                if vid_id and vid_id not in self:
+                    self.add(vid_id)
+                    count += 1
+        return count
+
+    def export_text(self, filename):
+        """Write all the IDs to a text archive file, return their number"""
+        count = 0
+        with locked_file(filename, 'w', encoding='utf-8') as archive_file:
+            for vid_id in self:
+                archive_file.write(vid_id + '\n')
+                count += 1
+        return count
+
+
+class TextDownloadArchive(DownloadArchive):
+    """The classic archive: a text file with one ID per line.
+
+    The file is read once into a set. Then each lookup only checks the size
+    of the file: the lines appended since the last read (e.g. by another
+    process) are read, and the whole file again if it shrank (e.g. it was
+    edited or replaced), so a lookup is O(1) instead of a scan of the file.
+    """
+
+    def __init__(self, filename):
+        super(TextDownloadArchive, self).__init__(filename)
+        self._ids = set()
+        self._offset = 0
+
+    def _read_new_lines(self):
+        try:
+            size = os.path.getsize(encodeFilename(self.filename))
+            if size == self._offset:
+                return
+            if size < self._offset:
+                self._ids = set()
+                self._offset = 0
+            with locked_file(self.filename, 'rb') as archive_file:
+                archive_file.f.seek(self._offset)
+                data = archive_file.read()
+        except (IOError, OSError) as err:
+            if err.errno != errno.ENOENT:
+                raise
+            # The file was removed
+            self._ids = set()
+            self._offset = 0
+            return
+        # Writers hold an exclusive lock, so data only contains whole lines
+        self._offset += len(data)
+        self._ids.update(
+            line.strip() for line in data.decode('utf-8').split('\n') if line.strip())
+
+    def __contains__(self, vid_id):
+        with self._lock:
+            self._read_new_lines()
+            return vid_id in self._ids
+
+    def __iter__(self):
+        with self._lock:
+            self._read_new_lines()
+            return iter(sorted(self._ids))
+
+    def add(self, vid_id, info_dict=None):
+        with self._lock:
+            with locked_file(self.filename, 'a', encoding='utf-8') as archive_file:
+                archive_file.write(vid_id + '\n')
+            self._ids.add(vid_id)
+
+
+class SQLiteDownloadArchive(DownloadArchive):
+    """Download archive stored in an SQLite database.
+
+    Besides the ID it records when the video was downloaded, its file size
+    and format. Several processes may write to the same database.
+    """
+
+    _TIMEOUT = 60
+
+    def __init__(self, filename):
+        # Only imported when used, it is slow to load
+        try:
+            import sqlite3
+        except ImportError:  # Python built without sqlite support
+            raise ValueError(
+                'The sqlite download archive requires Python with sqlite3 support')
+        super(SQLiteDownloadArchive, self).__init__(filename)
+        self._conn = sqlite3.connect(
+            filename, timeout=self._TIMEOUT, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS archive ('
+                'id TEXT PRIMARY KEY, timestamp INTEGER, filesize INTEGER, format TEXT)')
+
+    def __contains__(self, vid_id):
+        with self._lock:
+            cursor = self._conn.execute(
+                'SELECT 1 FROM archive WHERE id = ?', (vid_id, ))
+            return cursor.fetchone() is not None
+
+    def __iter__(self):
+        with self._lock:
+            return iter([row[0] for row in self._conn.execute(
+                'SELECT id FROM archive ORDER BY id')])
+
+    def add(self, vid_id, info_dict=None):
+        info_dict = info_dict or {}
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO archive (id, timestamp, filesize, format) '
+                    'VALUES (?, ?, ?, ?)', (
+                        vid_id, int(time.time()),
+                        int_or_none(info_dict.get('filesize') or info_dict.get('filesize_approx')),
+                        info_dict.get('format_id')))
+
+    def import_text(self, filename):
+        with io.open(filename, 'r', encoding='utf-8') as archive_file:
+            ids = [(line.strip(), ) for line in archive_file if line.strip()]
+        now = int(time.time())
+        with self._lock:
+            with self._conn:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO archive (id, timestamp) VALUES (?, %d)' % now,
+                    ids)
+                return self._conn.total_changes - before
+
+    def close(self):
+        self._conn.close()
+
+
+_ARCHIVE_BACKENDS = {
+    'text': TextDownloadArchive,
+    'sqlite': SQLiteDownloadArchive,
+}
+
+
+def get_download_archive(filename, backend=None):
+    """Open the archive filename with the given backend ('text' or 'sqlite').
+    If backend is None it is guessed from the file extension."""
+    if backend is None:
+        backend = 'sqlite' if os.path.splitext(filename)[1] in ('.db', '.sqlite', '.sqlite3') else 'text'
+    if backend not in _ARCHIVE_BACKENDS:
+        raise ValueError('Invalid download archive backend %r' % backend)
+    return _ARCHIVE_BACKENDS[backend](filename)
@@ -6,6 +6,7 @@ import json
 import os
 import re
 import shutil
+import time
 import traceback
 
 from .compat import compat_getenv
@@ -37,7 +38,9 @@ class Cache(object):
     def enabled(self):
         return self._ydl.params.get('cachedir') is not False
 
-    def store(self, section, key, data, dtype='json'):
+    def store(self, section, key, data, dtype='json', private=False):
+        """ Store data, readable only by the owner with private (for
+        credentials) """
         assert dtype in ('json',)
 
         if not self.enabled:
@@ -50,7 +53,7 @@ class Cache(object):
             except OSError as ose:
                 if ose.errno != errno.EEXIST:
                     raise
-            write_json_file(data, fn)
+            write_json_file(data, fn, private=private)
         except Exception:
             tb = traceback.format_exc()
             self._ydl.report_warning(
@@ -79,6 +82,31 @@ class Cache(object):
 
         return default
 
+    def store_expiring(self, section, key, data, ttl, private=False):
+        """ Store data that load_expiring will ignore after ttl seconds """
+        self.store(section, key, {
+            'expires': time.time() + ttl,
+            'data': data,
+        }, private=private)
+
+    def load_expiring(self, section, key, default=None):
+        entry = self.load(section, key)
+        if not isinstance(entry, dict) or entry.get('expires', 0) < time.time():
+            return default
+        return entry.get('data', default)
+
+    def remove_entry(self, section, key, dtype='json'):
+        if not self.enabled:
+            return
+
+        cache_fn = self._get_cache_fn(section, key, dtype)
+        try:
+            os.remove(cache_fn)
+        except OSError as ose:
+            if ose.errno != errno.ENOENT:
+                self._ydl.report_warning(
+                    'Removing cache entry %r failed: %s' % (cache_fn, ose))
+
     def remove(self):
         if not self.enabled:
             self._ydl.to_screen('Cache is disabled (Did you combine --no-cache-dir and --rm-cache-dir?)')
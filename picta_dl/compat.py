@@ -22,6 +22,11 @@ import sys
 import xml.etree.ElementTree
 
 
+try:
+    import collections.abc as compat_collections_abc
+except ImportError:  # Python 2
+    import collections as compat_collections_abc
+
 try:
     import urllib.request as compat_urllib_request
 except ImportError:  # Python 2
@@ -2360,6 +2365,16 @@ try:
 except ImportError:
     import BaseHTTPServer as compat_http_server
 
+try:
+    import socketserver as compat_socketserver
+except ImportError:  # Python 2
+    import SocketServer as compat_socketserver
+
+try:
+    import queue as compat_queue
+except ImportError:  # Python 2
+    import Queue as compat_queue
+
 try:
     compat_str = unicode  # Python 2
 except NameError:
@@ -2997,6 +3012,7 @@ __all__ = [
     'compat_b64decode',
     'compat_basestring',
     'compat_chr',
+    'compat_collections_abc',
     'compat_cookiejar',
     'compat_cookiejar_Cookie',
     'compat_cookies',
@@ -3021,11 +3037,13 @@ __all__ = [
     'compat_os_name',
     'compat_parse_qs',
     'compat_print',
+    'compat_queue',
     'compat_realpath',
     'compat_setenv',
     'compat_shlex_quote',
     'compat_shlex_split',
     'compat_socket_create_connection',
+    'compat_socketserver',
     'compat_str',
     'compat_struct_pack',
     'compat_struct_unpack',
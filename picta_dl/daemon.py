@@ -0,0 +1,424 @@
+from __future__ import unicode_literals
+
+import binascii
+import collections
+import hmac
+import itertools
+import json
+import os
+import re
+import socket
+import threading
+import time
+
+from .compat import (
+    compat_http_server,
+    compat_queue,
+    compat_socketserver,
+    compat_str,
+)
+from .utils import (
+    DownloadError,
+    error_to_compat_str,
+    MaxDownloadsReached,
+)
+
+
+class DaemonJob(object):
+    """A URL to download with its parameter overrides, and what happened"""
+
+    # Events kept per job, older ones are dropped
+    MAX_EVENTS = 1000
+
+    def __init__(self, job_id, url, params=None):
+        self.id = job_id
+        self.url = url
+        self.params = params or {}
+        self.status = 'queued'
+        self.retcode = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._events = collections.deque(maxlen=self.MAX_EVENTS)
+        self._event_count = 0
+        self._cond = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in ('finished', 'failed')
+
+    def add_event(self, event):
+        event['time'] = time.time()
+        with self._cond:
+            self._events.append(event)
+            self._event_count += 1
+            self._cond.notify_all()
+
+    def set_status(self, status, **kwargs):
+        self.status = status
+        event = {'type': 'status', 'status': status}
+        event.update(kwargs)
+        self.add_event(event)
+
+    def events_since(self, position, timeout=None):
+        """Return (events, next_position) for the events added after
+        position, waiting up to timeout seconds for new ones"""
+        with self._cond:
+            if position >= self._event_count and not self.done:
+                self._cond.wait(timeout)
+            first = self._event_count - len(self._events)
+            events = list(self._events)[max(position - first, 0):]
+            return events, self._event_count
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'url': self.url,
+            'params': self.params,
+            'status': self.status,
+            'retcode': self.retcode,
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class _JobLogger(object):
+    """Sends the messages of a YoutubeDL to the events of a job"""
+
+    def __init__(self, job):
+        self._job = job
+
+    def _log(self, level, msg):
+        self._job.add_event({'type': 'log', 'level': level, 'message': msg})
+
+    def debug(self, msg):
+        # Progress lines are sent as progress events
+        if not msg.startswith('\r'):
+            self._log('debug', msg)
+
+    def warning(self, msg):
+        self._log('warning', msg)
+
+    def error(self, msg):
+        self._log('error', msg)
+
+
+class Daemon(object):
+    """Runs the jobs it is given one after another with a resident YoutubeDL.
+
+    The YoutubeDL instance, with its opener, cookies, caches and probed
+    executables, is reused by all the jobs. The parameters of a job, among
+    JOB_PARAMS, are applied on top of the ones of the YoutubeDL for its
+    duration. The other parameters (output template, external programs,
+    cookie file...) can't be changed by the clients.
+
+    The jobs done are forgotten after retention seconds, and only the last
+    max_done of them are kept.
+    """
+
+    # The parameters a job may override
+    JOB_PARAMS = (
+        'format', 'ratelimit', 'noplaylist', 'playliststart', 'playlistend',
+        'playlistitems', 'skip_download', 'writesubtitles',
+        'writeautomaticsub', 'allsubtitles', 'subtitleslangs',
+        'subtitlesformat', 'writethumbnail', 'writeinfojson',
+        'writedescription')
+
+    _PROGRESS_KEYS = (
+        'status', 'filename', 'downloaded_bytes', 'total_bytes',
+        'total_bytes_estimate', 'speed', 'eta', 'elapsed',
+        'fragment_index', 'fragment_count')
+
+    def __init__(self, ydl, retention=3600, max_done=100):
+        self.ydl = ydl
+        self.retention = retention
+        self.max_done = max_done
+        self._jobs = collections.OrderedDict()
+        self._job_ids = itertools.count(1)
+        self._queue = compat_queue.Queue()
+        self._lock = threading.Lock()
+        self._current_job = None
+        ydl.add_progress_hook(self._progress_hook)
+
+    def submit(self, url, params=None):
+        """Queue a job, raise ValueError if params has parameters that are
+        not in JOB_PARAMS"""
+        forbidden = sorted(set(params or {}) - set(self.JOB_PARAMS))
+        if forbidden:
+            raise ValueError('parameters %s can not be set by a job (allowed: %s)' % (
+                ', '.join(forbidden), ', '.join(self.JOB_PARAMS)))
+        with self._lock:
+            job = DaemonJob(next(self._job_ids), url, params)
+            self._jobs[job.id] = job
+        self._queue.put(job)
+        return job
+
+    def _prune(self):
+        with self._lock:
+            done = [job for job in self._jobs.values() if job.done]
+            expired = time.time() - self.retention
+            for i, job in enumerate(done):
+                if job.finished < expired or i < len(done) - self.max_done:
+                    del self._jobs[job.id]
+
+    def get_job(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def stop(self):
+        self._queue.put(None)
+
+    def run(self):
+        """Run the jobs until stop() is called"""
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            self.run_job(job)
+
+    def _progress_hook(self, status):
+        job = self._current_job
+        if job is not None:
+            event = dict(
+                (key, status[key]) for key in self._PROGRESS_KEYS if key in status)
+            event['type'] = 'progress'
+            job.add_event(event)
+
+    def run_job(self, job):
+        ydl = self.ydl
+        saved_params = dict(ydl.params)
+        ydl.params.update(job.params)
+        ydl.params['logger'] = _JobLogger(job)
+        # Each job starts afresh, as a new process would
+        ydl._num_downloads = 0
+        self._current_job = job
+        job.started = time.time()
+        job.set_status('running')
+        try:
+            job.retcode = ydl.download([job.url])
+        except MaxDownloadsReached:
+            job.retcode = 101
+        except DownloadError as err:
+            job.retcode = 1
+            job.error = error_to_compat_str(err)
+        except Exception as err:
+            job.retcode = 1
+            job.error = error_to_compat_str(err)
+        finally:
+            self._current_job = None
+            ydl.params.clear()
+            ydl.params.update(saved_params)
+        job.finished = time.time()
+        job.set_status(
+            'finished' if job.retcode == 0 else 'failed',
+            retcode=job.retcode, error=job.error)
+        self.ydl.to_screen('[daemon] Job %d %s: %s' % (job.id, job.status, job.url))
+        self._prune()
+
+
+class DaemonRequestHandler(compat_http_server.BaseHTTPRequestHandler):
+    """The job API of the daemon:
+
+    POST /jobs                 Queue a job, the body is a JSON object with
+                               the "url" and optionally the "params"
+                               overriding the daemon ones (see
+                               Daemon.JOB_PARAMS)
+    GET  /jobs                 List the jobs
+    GET  /jobs/ID              Get the status of a job
+    GET  /jobs/ID/events       Stream the events of a job (status changes,
+                               log messages and progress) as JSON lines,
+                               until the job is done
+    POST /shutdown             Stop the daemon after the current job
+
+    On TCP, the requests must have an "Authorization: Bearer TOKEN" header
+    with the token of the server and a Host header naming the loopback
+    interface, so that web pages can't use the API (DNS rebinding). The
+    bodies of the POST requests must be sent as application/json, which web
+    pages can't do without a CORS preflight request.
+    """
+
+    server_version = 'picta-dl-daemon'
+
+    def log_message(self, format, *args):
+        pass
+
+    def address_string(self):
+        # UNIX sockets have no client address
+        return self.client_address[0] if self.client_address else 'local'
+
+    def _send_json(self, obj, status=200):
+        data = json.dumps(obj).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error_json(self, status, message):
+        self._send_json({'error': message}, status)
+
+    def _check_request(self):
+        """Send an error and return False if the request is not allowed"""
+        token = self.server.token
+        if token is None:
+            # UNIX socket, only its owner can connect
+            return True
+        host = re.sub(r':\d+$', '', self.headers.get('Host') or '')
+        if not _is_loopback(host):
+            self._send_error_json(403, 'Forbidden host %s' % host)
+            return False
+        authorization = self.headers.get('Authorization') or ''
+        if not _compare_digest(authorization, 'Bearer %s' % token):
+            self._send_error_json(401, 'Missing or wrong token')
+            return False
+        if self.command == 'POST' and (self.headers.get('Content-Type') or '').split(';')[0].strip() != 'application/json':
+            self._send_error_json(415, 'Expected a body of type application/json')
+            return False
+        return True
+
+    def _get_job(self, job_id):
+        job = self.server.daemon.get_job(int(job_id))
+        if job is None:
+            self._send_error_json(404, 'No job %s' % job_id)
+        return job
+
+    def do_GET(self):
+        if not self._check_request():
+            return
+        if self.path == '/jobs':
+            return self._send_json([job.to_dict() for job in self.server.daemon.jobs()])
+        mobj = re.match(r'^/jobs/(\d+)(/events)?$', self.path)
+        if not mobj:
+            return self._send_error_json(404, 'Unknown path %s' % self.path)
+        job = self._get_job(mobj.group(1))
+        if job is None:
+            return
+        if not mobj.group(2):
+            return self._send_json(job.to_dict())
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        position = 0
+        try:
+            while True:
+                done = job.done
+                events, position = job.events_since(position, timeout=1)
+                for event in events:
+                    self.wfile.write(json.dumps(event).encode('utf-8') + b'\n')
+                self.wfile.flush()
+                if done and not events:
+                    break
+        except socket.error:
+            # The client went away
+            pass
+
+    def do_POST(self):
+        if not self._check_request():
+            return
+        if self.path == '/shutdown':
+            self._send_json({'status': 'stopping'})
+            self.server.daemon.stop()
+            threading.Thread(target=self.server.shutdown).start()
+            return
+        if self.path != '/jobs':
+            return self._send_error_json(404, 'Unknown path %s' % self.path)
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            request = json.loads(self.rfile.read(length).decode('utf-8'))
+            url = request['url']
+            params = request.get('params') or {}
+            if not isinstance(url, compat_str) or not isinstance(params, dict):
+                raise ValueError
+        except (ValueError, KeyError, TypeError):
+            return self._send_error_json(
+                400, 'Expected a JSON object with a "url" string and a "params" object')
+        try:
+            job = self.server.daemon.submit(url, params)
+        except ValueError as err:
+            return self._send_error_json(400, error_to_compat_str(err))
+        self._send_json(job.to_dict(), 202)
+
+
+def _is_loopback(host):
+    return host == 'localhost' or re.match(r'^127(?:\.\d{1,3}){3}$', host) is not None
+
+
+def _compare_digest(a, b):
+    if hasattr(hmac, 'compare_digest'):
+        return hmac.compare_digest(a.encode('utf-8'), b.encode('utf-8'))
+    return a == b
+
+
+class _DaemonHTTPServer(compat_socketserver.ThreadingMixIn, compat_http_server.HTTPServer):
+    daemon_threads = True
+
+
+if hasattr(compat_socketserver, 'UnixStreamServer'):
+    class _DaemonUnixServer(compat_socketserver.ThreadingMixIn, compat_socketserver.UnixStreamServer):
+        daemon_threads = True
+else:
+    _DaemonUnixServer = None
+
+
+def parse_daemon_address(address):
+    """Return ('tcp', (host, port)) for HOST:PORT or ('unix', path). HOST
+    must be the loopback interface."""
+    mobj = re.match(r'^(?P<host>[^/]*):(?P<port>\d+)$', address)
+    if mobj:
+        host = mobj.group('host') or '127.0.0.1'
+        if not _is_loopback(host):
+            raise ValueError('the daemon only listens on the loopback interface, not on %s' % host)
+        return 'tcp', (host, int(mobj.group('port')))
+    return 'unix', address
+
+
+def create_daemon_server(ydl, address, token=None):
+    """Return the server of the job API on address, its daemon attribute
+    is the Daemon running the jobs with ydl. The token of a TCP server is
+    generated if it isn't given, it is the token attribute of the server."""
+    kind, addr = parse_daemon_address(address)
+    if kind == 'unix':
+        if _DaemonUnixServer is None:
+            raise ValueError('UNIX sockets are not available on this platform')
+        if os.path.exists(addr):
+            os.remove(addr)
+        server = _DaemonUnixServer(addr, DaemonRequestHandler)
+        os.chmod(addr, 0o600)
+        server.token = None
+    else:
+        server = _DaemonHTTPServer(addr, DaemonRequestHandler)
+        server.token = token or binascii.hexlify(os.urandom(16)).decode('ascii')
+    server.daemon = Daemon(ydl)
+    return server
+
+
+def serve_daemon(ydl, address, token=None):
+    """Serve the job API on address until a shutdown request"""
+    server = create_daemon_server(ydl, address, token)
+    daemon = server.daemon
+    worker = threading.Thread(target=daemon.run)
+    worker.daemon = True
+    worker.start()
+    if isinstance(server.server_address, tuple):
+        ydl.to_screen('[daemon] Accepting jobs on http://%s:%d/jobs' % server.server_address[:2])
+        if token is None:
+            ydl.to_screen('[daemon] Token: %s' % server.token)
+    else:
+        ydl.to_screen('[daemon] Accepting jobs on %s' % server.server_address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        daemon.stop()
+    finally:
+        server.server_close()
+        if not isinstance(server.server_address, tuple) and os.path.exists(server.server_address):
+            os.remove(server.server_address)
+    worker.join()
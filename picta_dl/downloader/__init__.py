@@ -1,34 +1,50 @@
 from __future__ import unicode_literals
 
 from .common import FileDownloader
-from .f4m import F4mFD
-from .hls import HlsFD
-from .http import HttpFD
-from .rtmp import RtmpFD
-from .dash import DashSegmentsFD
-from .rtsp import RtspFD
-from .ism import IsmFD
 from .external import (
     get_external_downloader,
     FFmpegFD,
 )
 
+from ..compat import compat_collections_abc
 from ..utils import (
     determine_protocol,
 )
 
-PROTOCOL_MAP = {
-    'rtmp': RtmpFD,
-    'm3u8_native': HlsFD,
-    'm3u8': FFmpegFD,
-    'mms': RtspFD,
-    'rtsp': RtspFD,
-    'f4m': F4mFD,
-    'http_dash_segments': DashSegmentsFD,
-    'ism': IsmFD,
+# The downloader modules are only imported when a format needs them
+_PROTOCOL_DOWNLOADERS = {
+    'rtmp': ('rtmp', 'RtmpFD'),
+    'm3u8_native': ('hls', 'HlsFD'),
+    'm3u8': ('external', 'FFmpegFD'),
+    'mms': ('rtsp', 'RtspFD'),
+    'rtsp': ('rtsp', 'RtspFD'),
+    'f4m': ('f4m', 'F4mFD'),
+    'http_dash_segments': ('dash', 'DashSegmentsFD'),
+    'ism': ('ism', 'IsmFD'),
 }
 
 
+def _load_downloader(module, name):
+    mod = __import__('%s.%s' % (__name__, module), fromlist=(str(name),))
+    return getattr(mod, name)
+
+
+class _LazyProtocolMap(compat_collections_abc.Mapping):
+    """The downloader class of each protocol, imported when it is looked up"""
+
+    def __getitem__(self, protocol):
+        return _load_downloader(*_PROTOCOL_DOWNLOADERS[protocol])
+
+    def __iter__(self):
+        return iter(_PROTOCOL_DOWNLOADERS)
+
+    def __len__(self):
+        return len(_PROTOCOL_DOWNLOADERS)
+
+
+PROTOCOL_MAP = _LazyProtocolMap()
+
+
 def get_suitable_downloader(info_dict, params={}):
     """Get the downloader class that can handle the info dict."""
     protocol = determine_protocol(info_dict)
@@ -47,12 +63,12 @@ def get_suitable_downloader(info_dict, params={}):
         return FFmpegFD
 
     if protocol == 'm3u8' and params.get('hls_prefer_native') is True:
-        return HlsFD
+        return _load_downloader('hls', 'HlsFD')
 
     if protocol == 'm3u8_native' and params.get('hls_prefer_native') is False:
         return FFmpegFD
 
-    return PROTOCOL_MAP.get(protocol, HttpFD)
+    return _load_downloader(*_PROTOCOL_DOWNLOADERS.get(protocol, ('http', 'HttpFD')))
 
 
 __all__ = [
@@ -164,6 +164,13 @@ class FileDownloader(object):
     def report_error(self, *args, **kargs):
         self.ydl.report_error(*args, **kargs)
 
+    def check_cancelled(self):
+        """Raise DownloadCancelled if the download has been cancelled, see
+        YoutubeDL.check_cancelled (ydl may be another kind of object)"""
+        check_cancelled = getattr(self.ydl, 'check_cancelled', None)
+        if check_cancelled is not None:
+            check_cancelled()
+
     def slow_down(self, start_time, now, byte_counter):
         """Sleep if the download speed is over the rate limit."""
         rate_limit = self.params.get('ratelimit')
@@ -6,6 +6,8 @@ import json
 
 from .common import FileDownloader
 from .http import HttpFD
+from ..compat import compat_urllib_error
+from ..retry import FRAGMENT_RETRY_ON
 from ..utils import (
     error_to_compat_str,
     encodeFilename,
@@ -96,6 +98,8 @@ class FragmentFD(FileDownloader):
         frag_index_stream.close()
 
     def _download_fragment(self, ctx, frag_url, info_dict, headers=None):
+        # Cancelled downloads stop between fragments and can be resumed
+        self.check_cancelled()
         fragment_filename = '%s-Frag%d' % (ctx['tmpfilename'], ctx['fragment_index'])
         success = ctx['dl'].download(fragment_filename, {
             'url': frag_url,
@@ -109,6 +113,27 @@ class FragmentFD(FileDownloader):
         down.close()
         return True, frag_content
 
+    def _download_fragment_retrying(self, ctx, frag_url, info_dict, frag_index, headers=None):
+        """_download_fragment, retrying the HTTP errors with the retry policy
+        of the YoutubeDL instance. frag_content is None if the fragment
+        could not be downloaded after fragment_retries retries."""
+        fragment_retries = self.params.get('fragment_retries', 0)
+        retrier = self.ydl.retry_policy.retrier(
+            frag_url, fragment_retries, 'fragment', FRAGMENT_RETRY_ON,
+            self.check_cancelled)
+        while True:
+            retrier.attempt()
+            try:
+                result = self._download_fragment(ctx, frag_url, info_dict, headers)
+            except compat_urllib_error.HTTPError as err:
+                if not retrier.failed(err):
+                    return True, None
+                self.report_retry_fragment(err, frag_index, retrier.count, fragment_retries)
+                retrier.sleep()
+                continue
+            retrier.succeeded()
+            return result
+
     def _append_fragment(self, ctx, frag_content):
         try:
             ctx['dest_stream'].write(frag_content)
@@ -12,11 +12,12 @@ from .fragment import FragmentFD
 from .external import FFmpegFD
 
 from ..compat import (
-    compat_urllib_error,
     compat_urlparse,
     compat_struct_pack,
 )
 from ..utils import (
+    CircuitOpenError,
+    error_to_compat_str,
     parse_m3u8_attributes,
     update_url_query,
 )
@@ -138,26 +139,24 @@ class HlsFD(FragmentFD):
                         else compat_urlparse.urljoin(man_url, line))
                     if extra_query:
                         frag_url = update_url_query(frag_url, extra_query)
-                    count = 0
                     headers = info_dict.get('http_headers', {})
                     if byte_range:
                         headers['Range'] = 'bytes=%d-%d' % (byte_range['start'], byte_range['end'] - 1)
-                    while count <= fragment_retries:
-                        try:
-                            success, frag_content = self._download_fragment(
-                                ctx, frag_url, info_dict, headers)
-                            if not success:
-                                return False
-                            break
-                        except compat_urllib_error.HTTPError as err:
-                            # Unavailable (possibly temporary) fragments may be served.
-                            # First we try to retry then either skip or abort.
-                            # See https://github.com/ytdl-org/youtube-dl/issues/10165,
-                            # https://github.com/ytdl-org/youtube-dl/issues/10448).
-                            count += 1
-                            if count <= fragment_retries:
-                                self.report_retry_fragment(err, frag_index, count, fragment_retries)
-                    if count > fragment_retries:
+                    # Unavailable (possibly temporary) fragments may be served.
+                    # First we try to retry then either skip or abort.
+                    # See https://github.com/ytdl-org/youtube-dl/issues/10165,
+                    # https://github.com/ytdl-org/youtube-dl/issues/10448).
+                    try:
+                        success, frag_content = self._download_fragment_retrying(
+                            ctx, frag_url, info_dict, frag_index, headers)
+                    except CircuitOpenError as err:
+                        if not skip_unavailable_fragments:
+                            self.report_error(error_to_compat_str(err))
+                            return False
+                        success, frag_content = True, None
+                    if not success:
+                        return False
+                    if frag_content is None:
                         if skip_unavailable_fragments:
                             i += 1
                             media_sequence += 1
@@ -13,8 +13,10 @@ from ..compat import (
     compat_urllib_error,
 )
 from ..utils import (
+    CircuitOpenError,
     ContentTooShortError,
     encodeFilename,
+    error_to_compat_str,
     int_or_none,
     sanitize_open,
     sanitized_Request,
@@ -64,8 +66,9 @@ class HttpFD(FileDownloader):
 
         ctx.is_resume = ctx.resume_len > 0
 
-        count = 0
         retries = self.params.get('retries', 0)
+        retrier = self.ydl.retry_policy.retrier(
+            url, retries, 'http', check_cancelled=self.check_cancelled)
 
         class SucceedDownload(Exception):
             pass
@@ -230,6 +233,7 @@ class HttpFD(FileDownloader):
                 raise RetryDownload(e)
 
             while True:
+                self.check_cancelled()
                 try:
                     # Download and write
                     data_block = ctx.data.read(block_size if data_len is None else min(block_size, data_len - byte_counter))
@@ -322,10 +326,7 @@ class HttpFD(FileDownloader):
                 ctx.stream.close()
 
             if data_len is not None and byte_counter != data_len:
-                err = ContentTooShortError(byte_counter, int(data_len))
-                if count <= retries:
-                    retry(err)
-                raise err
+                retry(ContentTooShortError(byte_counter, int(data_len)))
 
             self.try_rename(ctx.tmpfilename, ctx.filename)
 
@@ -343,19 +344,30 @@ class HttpFD(FileDownloader):
 
             return True
 
-        while count <= retries:
+        while True:
             try:
+                retrier.attempt()
                 establish_connection()
-                return download()
+                result = download()
             except RetryDownload as e:
-                count += 1
-                if count <= retries:
-                    self.report_retry(e.source_error, count, retries)
+                if not retrier.failed(e.source_error):
+                    if isinstance(e.source_error, ContentTooShortError):
+                        raise e.source_error
+                    break
+                self.report_retry(e.source_error, retrier.count, retries)
+                retrier.sleep()
                 continue
             except NextFragment:
+                retrier.succeeded()
                 continue
             except SucceedDownload:
+                retrier.succeeded()
                 return True
+            except CircuitOpenError as e:
+                self.report_error(error_to_compat_str(e))
+                return False
+            retrier.succeeded()
+            return result
 
         self.report_error('giving up after %s retries' % retries)
         return False
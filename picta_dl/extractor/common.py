@@ -2,6 +2,7 @@
 from __future__ import unicode_literals
 
 import base64
+import copy
 import datetime
 import hashlib
 import json
@@ -12,6 +13,7 @@ import re
 import socket
 import ssl
 import sys
+import threading
 import time
 import math
 
@@ -41,6 +43,7 @@ from ..utils import (
     age_restricted,
     base_url,
     bug_reports_message,
+    CircuitOpenError,
     clean_html,
     compiled_regex_type,
     determine_ext,
@@ -51,11 +54,13 @@ from ..utils import (
     extract_attributes,
     fix_xml_ampersands,
     float_or_none,
+    FragmentList,
     GeoRestrictedError,
     GeoUtils,
     int_or_none,
     js_to_json,
     JSON_LD_RE,
+    LoginRequiredError,
     mimetype2ext,
     orderedSet,
     parse_bitrate,
@@ -162,7 +167,8 @@ class InfoExtractor(object):
                                  Base URL for fragments. Each fragment's path
                                  value (if present) will be relative to
                                  this URL.
-                    * fragments  A list of fragments of a fragmented media.
+                    * fragments  A list of fragments of a fragmented media,
+                                 or a FragmentList building them on access.
                                  Each fragment entry must contain either an url
                                  or a path. If an url is present it should be
                                  considered by a client. Otherwise both path and
@@ -383,6 +389,17 @@ class InfoExtractor(object):
     will be used by geo restriction bypass mechanism similarly
     to _GEO_COUNTRIES.
 
+    _LOGIN_SESSION_DOMAINS attribute may contain a list of cookie domains
+    whose cookies make up an authenticated session for this extractor. Such
+    sessions are stored in the cache, in files only their owner may read, by
+    _store_login_session and reused for _LOGIN_SESSION_TTL seconds by
+    subsequent runs, until the site answers with HTTP error 401 or 403.
+
+    An instance may extract several URLs at once from different threads,
+    so _real_extract must not keep per-URL state in its attributes. Data
+    meant for the extraction of another URL should be passed along with
+    smuggle_url instead.
+
     Finally, the _WORKING attribute should be set to False for broken IEs
     in order to warn the users and skip the tests.
     """
@@ -390,6 +407,9 @@ class InfoExtractor(object):
     _ready = False
     _downloader = None
     _x_forwarded_for_ip = None
+    _login_session_key = None
+    _LOGIN_SESSION_DOMAINS = ()
+    _LOGIN_SESSION_TTL = 24 * 3600
     _GEO_BYPASS = True
     _GEO_COUNTRIES = None
     _GEO_IP_BLOCKS = None
@@ -398,6 +418,7 @@ class InfoExtractor(object):
     def __init__(self, downloader=None):
         """Constructor. Receives an optional downloader."""
         self._ready = False
+        self._initialize_lock = threading.Lock()
         self._x_forwarded_for_ip = None
         self.set_downloader(downloader)
 
@@ -432,8 +453,12 @@ class InfoExtractor(object):
             'ip_blocks': self._GEO_IP_BLOCKS,
         })
         if not self._ready:
-            self._real_initialize()
-            self._ready = True
+            # Threads sharing the instance wait for a single initialization
+            # (e.g. login)
+            with self._initialize_lock:
+                if not self._ready:
+                    self._real_initialize()
+                    self._ready = True
 
     def _initialize_geo_bypass(self, geo_bypass_context):
         """
@@ -628,29 +653,56 @@ class InfoExtractor(object):
         exceptions = [compat_urllib_error.URLError, compat_http_client.HTTPException, socket.error]
         if hasattr(ssl, 'CertificateError'):
             exceptions.append(ssl.CertificateError)
-        try:
-            return self._downloader.urlopen(url_or_request)
-        except tuple(exceptions) as err:
-            if isinstance(err, compat_urllib_error.HTTPError):
-                if self.__can_accept_status_code(err, expected_status):
-                    # Retain reference to error to prevent file object from
-                    # being closed before it can be read. Works around the
-                    # effects of <https://bugs.python.org/issue15002>
-                    # introduced in Python 3.4.1.
-                    err.fp._error = err
-                    return err.fp
-
-            if errnote is False:
-                return False
-            if errnote is None:
-                errnote = 'Unable to download webpage'
-
-            errmsg = '%s: %s' % (errnote, error_to_compat_str(err))
-            if fatal:
-                raise ExtractorError(errmsg, sys.exc_info()[2], cause=err)
+        url = (url_or_request.get_full_url()
+               if isinstance(url_or_request, compat_urllib_request.Request)
+               else url_or_request)
+        retries = self._downloader.params.get('extractor_retries')
+        if retries is None:
+            # Requests allowed to fail are only retried if asked for
+            retries = 3 if fatal else 0
+        retrier = self._downloader.retry_policy.retrier(
+            url, retries, 'webpage', check_cancelled=self._downloader.check_cancelled)
+        while True:
+            try:
+                retrier.attempt()
+                res = self._downloader.urlopen(url_or_request)
+            except CircuitOpenError as err:
+                error, tb = err, sys.exc_info()[2]
+                break
+            except tuple(exceptions) as err:
+                error, tb = err, sys.exc_info()[2]
+                if isinstance(err, compat_urllib_error.HTTPError):
+                    if self.__can_accept_status_code(err, expected_status):
+                        retrier.succeeded()
+                        # Retain reference to error to prevent file object from
+                        # being closed before it can be read. Works around the
+                        # effects of <https://bugs.python.org/issue15002>
+                        # introduced in Python 3.4.1.
+                        err.fp._error = err
+                        return err.fp
+                    # The cached login session (if any) is no longer accepted
+                    if err.code in (401, 403):
+                        self._invalidate_login_session()
+                if not retrier.failed(err):
+                    break
+                self.to_screen('%s. Retrying (attempt %d of %d)...' % (
+                    error_to_compat_str(err), retrier.count, retries))
+                retrier.sleep()
             else:
-                self._downloader.report_warning(errmsg)
-                return False
+                retrier.succeeded()
+                return res
+
+        if errnote is False:
+            return False
+        if errnote is None:
+            errnote = 'Unable to download webpage'
+
+        errmsg = '%s: %s' % (errnote, error_to_compat_str(error))
+        if fatal:
+            raise ExtractorError(errmsg, tb, cause=error)
+        else:
+            self._downloader.report_warning(errmsg)
+            return False
 
     def _download_webpage_handle(self, url_or_request, video_id, note=None, errnote=None, fatal=True, encoding=None, data=None, headers={}, query={}, expected_status=None):
         """
@@ -936,9 +988,8 @@ class InfoExtractor(object):
 
     @staticmethod
     def raise_login_required(msg='This video is only available for registered users'):
-        raise ExtractorError(
-            '%s. Use --username and --password or --netrc to provide account credentials.' % msg,
-            expected=True)
+        raise LoginRequiredError(
+            '%s. Use --username and --password or --netrc to provide account credentials.' % msg)
 
     @staticmethod
     def raise_geo_restricted(msg='This video is not available from your location due to geo restriction', countries=None):
@@ -1081,6 +1132,78 @@ class InfoExtractor(object):
 
         return compat_getpass('Type %s and press [Return]: ' % note)
 
+    def _get_login_session_key(self, username):
+        return hashlib.sha1(
+            ('%s:%s' % (self._NETRC_MACHINE, username)).encode('utf-8')).hexdigest()
+
+    def _is_login_session_cookie(self, cookie):
+        domain = cookie.domain.lstrip('.')
+        return any(
+            domain == d.lstrip('.') or domain.endswith('.' + d.lstrip('.'))
+            for d in self._LOGIN_SESSION_DOMAINS)
+
+    def _load_login_session(self, username):
+        """
+        Restore the session stored by _store_login_session for username into
+        the cookie jar. Return the stored session data (a dict) or None if
+        there is no usable session, that is if none of its cookies is still
+        valid.
+        """
+        if self._downloader is None or username is None:
+            return None
+        key = self._get_login_session_key(username)
+        session = self._downloader.cache.load_expiring('login-sessions', key)
+        if not isinstance(session, dict):
+            return None
+        now = time.time()
+        cookies = [
+            c for c in session.get('cookies', [])
+            if c.get('expires') is None or c['expires'] >= now]
+        if not cookies:
+            self._downloader.cache.remove_entry('login-sessions', key)
+            return None
+        for c in cookies:
+            self._set_cookie(
+                c['domain'], c['name'], c['value'], expire_time=c.get('expires'),
+                port=c.get('port'), path=c.get('path', '/'),
+                secure=c.get('secure', False), discard=c.get('discard', False))
+        self._login_session_key = key
+        self.to_screen('Using cached login session')
+        return session
+
+    def _store_login_session(self, username, **kwargs):
+        """
+        Store the cookies of _LOGIN_SESSION_DOMAINS in the cache, along with
+        any additional JSON serializable data passed as keyword arguments
+        (e.g. tokens returned by the site).
+        """
+        if self._downloader is None or username is None:
+            return
+        session = dict(kwargs)
+        session['cookies'] = [{
+            'name': c.name,
+            'value': c.value,
+            'domain': c.domain,
+            'path': c.path,
+            'port': c.port,
+            'secure': c.secure,
+            'expires': c.expires,
+            'discard': c.discard,
+        } for c in self._downloader.cookiejar if self._is_login_session_cookie(c)]
+        key = self._get_login_session_key(username)
+        # The cookies give access to the account
+        self._downloader.cache.store_expiring(
+            'login-sessions', key, session, self._LOGIN_SESSION_TTL, private=True)
+        self._login_session_key = key
+
+    def _invalidate_login_session(self):
+        if self._login_session_key is None:
+            return
+        self._downloader.cache.remove_entry('login-sessions', self._login_session_key)
+        self._login_session_key = None
+        if self._downloader.params.get('verbose', False):
+            self._downloader.to_screen('[debug] Invalidated cached login session')
+
     # Helper functions for extracting OpenGraph info
     @staticmethod
     def _og_regexes(prop):
@@ -2056,21 +2179,52 @@ class InfoExtractor(object):
         return entries
 
     def _extract_mpd_formats(self, mpd_url, video_id, mpd_id=None, note=None, errnote=None, fatal=True, formats_dict={}, data=None, headers={}, query={}):
-        res = self._download_xml_handle(
+        # A recently used manifest isn't parsed again, for all the
+        # extractions (retries, entries of several playlists) using it. It
+        # is requested again, with its ETag if any, to check that it
+        # hasn't changed. Only the last few manifests are kept, each video
+        # has its own.
+        cache_key = None
+        cached = None
+        if not formats_dict and data is None and not query:
+            cache_key = (mpd_url, mpd_id)
+            cached = self._downloader._get_cached_mpd(cache_key)
+        if cached and cached['etag']:
+            headers = dict(headers)
+            headers['If-None-Match'] = cached['etag']
+        res = self._download_webpage_handle(
             mpd_url, video_id,
             note=note or 'Downloading MPD manifest',
             errnote=errnote or 'Failed to download MPD manifest',
-            fatal=fatal, data=data, headers=headers, query=query)
+            fatal=fatal, data=data, headers=headers, query=query,
+            expected_status=304 if cached and cached['etag'] else None)
         if res is False:
             return []
-        mpd_doc, urlh = res
-        if mpd_doc is None:
-            return []
+        mpd_string, urlh = res
+        if cached and urlh.getcode() == 304:
+            return copy.deepcopy(cached['formats'])
         mpd_base_url = base_url(urlh.geturl())
+        etag = urlh.headers.get('ETag')
+        digest = hashlib.sha1(mpd_string.encode('utf-8')).hexdigest()
+        if cached and cached['digest'] == digest and cached['base_url'] == mpd_base_url:
+            cached['etag'] = etag
+            return copy.deepcopy(cached['formats'])
 
-        return self._parse_mpd_formats(
+        mpd_doc = self._parse_xml(mpd_string, video_id, fatal=fatal)
+        if mpd_doc is None:
+            return []
+        formats = self._parse_mpd_formats(
             mpd_doc, mpd_id=mpd_id, mpd_base_url=mpd_base_url,
             formats_dict=formats_dict, mpd_url=mpd_url)
+        if cache_key is not None:
+            self._downloader._cache_mpd(cache_key, {
+                'etag': etag,
+                'digest': digest,
+                'base_url': mpd_base_url,
+                'formats': formats,
+            })
+            formats = copy.deepcopy(formats)
+        return formats
 
     def _parse_mpd_formats(self, mpd_doc, mpd_id=None, mpd_base_url='', formats_dict={}, mpd_url=None):
         """
@@ -2088,6 +2242,8 @@ class InfoExtractor(object):
         def _add_ns(path):
             return self._xpath_ns(path, namespace)
 
+        s_tag = _add_ns('S')
+
         def is_drm_protected(element):
             return element.find(_add_ns('ContentProtection')) is not None
 
@@ -2100,19 +2256,13 @@ class InfoExtractor(object):
             def extract_common(source):
                 segment_timeline = source.find(_add_ns('SegmentTimeline'))
                 if segment_timeline is not None:
-                    s_e = segment_timeline.findall(_add_ns('S'))
+                    # (t, d, r) of each S, @d is mandatory (see [1, 5.3.9.6.2, Table 17, page 60])
+                    s_e = [
+                        (int(s.get('t', 0)), int(s.attrib['d']), int(s.get('r', 0)))
+                        for s in segment_timeline.findall(s_tag)]
                     if s_e:
-                        ms_info['total_number'] = 0
-                        ms_info['s'] = []
-                        for s in s_e:
-                            r = int(s.get('r', 0))
-                            ms_info['total_number'] += 1 + r
-                            ms_info['s'].append({
-                                't': int(s.get('t', 0)),
-                                # @d is mandatory (see [1, 5.3.9.6.2, Table 17, page 60])
-                                'd': int(s.attrib['d']),
-                                'r': r,
-                            })
+                        ms_info['total_number'] = len(s_e) + sum(r for _, _, r in s_e)
+                        ms_info['s'] = s_e
                 start_number = source.get('startNumber')
                 if start_number:
                     ms_info['start_number'] = int(start_number)
@@ -2244,13 +2394,12 @@ class InfoExtractor(object):
                                 'Bandwidth': bandwidth,
                             }
 
-                        def location_key(location):
-                            return 'url' if re.match(r'^https?://', location) else 'path'
-
+                        # The fragments are only built when they are
+                        # accessed, see FragmentList
+                        fragments = None
                         if 'segment_urls' not in representation_ms_info and 'media' in representation_ms_info:
 
                             media_template = prepare_template('media', ('Number', 'Bandwidth', 'Time'))
-                            media_location_key = location_key(media_template)
 
                             # As per [1, 5.3.9.4.4, Table 16, page 55] $Number$ and $Time$
                             # can't be used at the same time
@@ -2259,96 +2408,53 @@ class InfoExtractor(object):
                                 if 'total_number' not in representation_ms_info and 'segment_duration' in representation_ms_info:
                                     segment_duration = float_or_none(representation_ms_info['segment_duration'], representation_ms_info['timescale'])
                                     representation_ms_info['total_number'] = int(math.ceil(float(period_duration) / segment_duration))
-                                representation_ms_info['fragments'] = [{
-                                    media_location_key: media_template % {
-                                        'Number': segment_number,
-                                        'Bandwidth': bandwidth,
-                                    },
-                                    'duration': segment_duration,
-                                } for segment_number in range(
-                                    representation_ms_info['start_number'],
-                                    representation_ms_info['total_number'] + representation_ms_info['start_number'])]
+                                fragments = dict(
+                                    media=media_template,
+                                    count=representation_ms_info['total_number'],
+                                    duration=segment_duration)
                             else:
                                 # $Number*$ or $Time$ in media template with S list available
                                 # Example $Number*$: http://www.svtplay.se/klipp/9023742/stopptid-om-bjorn-borg
                                 # Example $Time$: https://play.arkena.com/embed/avp/v2/player/media/b41dda37-d8e7-4d3f-b1b5-9a9db578bdfe/1/129411
-                                representation_ms_info['fragments'] = []
-                                segment_time = 0
-                                segment_d = None
-                                segment_number = representation_ms_info['start_number']
-
-                                def add_segment_url():
-                                    segment_url = media_template % {
-                                        'Time': segment_time,
-                                        'Bandwidth': bandwidth,
-                                        'Number': segment_number,
-                                    }
-                                    representation_ms_info['fragments'].append({
-                                        media_location_key: segment_url,
-                                        'duration': float_or_none(segment_d, representation_ms_info['timescale']),
-                                    })
-
-                                for num, s in enumerate(representation_ms_info['s']):
-                                    segment_time = s.get('t') or segment_time
-                                    segment_d = s['d']
-                                    add_segment_url()
-                                    segment_number += 1
-                                    for r in range(s.get('r', 0)):
-                                        segment_time += segment_d
-                                        add_segment_url()
-                                        segment_number += 1
-                                    segment_time += segment_d
+                                fragments = dict(
+                                    media=media_template,
+                                    timeline=representation_ms_info['s'])
                         elif 'segment_urls' in representation_ms_info and 's' in representation_ms_info:
                             # No media template
                             # Example: https://www.youtube.com/watch?v=iXZV5uAYMJI
                             # or any YouTube dashsegments video
-                            fragments = []
-                            segment_index = 0
-                            timescale = representation_ms_info['timescale']
-                            for s in representation_ms_info['s']:
-                                duration = float_or_none(s['d'], timescale)
-                                for r in range(s.get('r', 0) + 1):
-                                    segment_uri = representation_ms_info['segment_urls'][segment_index]
-                                    fragments.append({
-                                        location_key(segment_uri): segment_uri,
-                                        'duration': duration,
-                                    })
-                                    segment_index += 1
-                            representation_ms_info['fragments'] = fragments
+                            fragments = dict(
+                                media=representation_ms_info['segment_urls'],
+                                timeline=representation_ms_info['s'])
                         elif 'segment_urls' in representation_ms_info:
                             # Segment URLs with no SegmentTimeline
                             # Example: https://www.seznam.cz/zpravy/clanek/cesko-zasahne-vitr-o-sile-vichrice-muze-byt-i-zivotu-nebezpecny-39091
                             # https://github.com/ytdl-org/youtube-dl/pull/14844
-                            fragments = []
-                            segment_duration = float_or_none(
-                                representation_ms_info['segment_duration'],
-                                representation_ms_info['timescale']) if 'segment_duration' in representation_ms_info else None
-                            for segment_url in representation_ms_info['segment_urls']:
-                                fragment = {
-                                    location_key(segment_url): segment_url,
-                                }
-                                if segment_duration:
-                                    fragment['duration'] = segment_duration
-                                fragments.append(fragment)
-                            representation_ms_info['fragments'] = fragments
-                        # If there is a fragments key available then we correctly recognized fragmented media.
+                            fragments = dict(
+                                media=representation_ms_info['segment_urls'],
+                                duration=float_or_none(
+                                    representation_ms_info['segment_duration'],
+                                    representation_ms_info['timescale']) if 'segment_duration' in representation_ms_info else None)
+                        # If there are fragments then we correctly recognized fragmented media.
                         # Otherwise we will assume unfragmented media with direct access. Technically, such
                         # assumption is not necessarily correct since we may simply have no support for
                         # some forms of fragmented media renditions yet, but for now we'll use this fallback.
-                        if 'fragments' in representation_ms_info:
+                        if fragments is not None:
+                            initialization_url = representation_ms_info.get('initialization_url')
                             f.update({
                                 # NB: mpd_url may be empty when MPD manifest is parsed from a string
                                 'url': mpd_url or base_url,
                                 'fragment_base_url': base_url,
-                                'fragments': [],
+                                'fragments': FragmentList(
+                                    start_number=representation_ms_info['start_number'],
+                                    bandwidth=bandwidth,
+                                    timescale=representation_ms_info['timescale'],
+                                    initialization=initialization_url,
+                                    **fragments),
                                 'protocol': 'http_dash_segments',
                             })
-                            if 'initialization_url' in representation_ms_info:
-                                initialization_url = representation_ms_info['initialization_url']
-                                if not f.get('url'):
-                                    f['url'] = initialization_url
-                                f['fragments'].append({location_key(initialization_url): initialization_url})
-                            f['fragments'].extend(representation_ms_info['fragments'])
+                            if initialization_url and not f.get('url'):
+                                f['url'] = initialization_url
                         else:
                             # Assuming direct URL to unfragmented media.
                             f['url'] = base_url
@@ -0,0 +1,318 @@
+from __future__ import unicode_literals
+
+import re
+
+from ..compat import compat_str
+
+
+_FLAGS_RE = re.compile(r'^\(\?([aiLmsux]+)\)')
+_DOMAIN_RE = re.compile(r'^[a-z0-9-]+(?:\.[a-z0-9-]+)+$')
+_QUANTIFIER_RE = re.compile(r'(?:(?P<simple>[?*+])|\{(?P<min>\d*)(?:,\d*)?\})[?+]?')
+# Character classes that only match characters of host names
+_HOST_CLASS_RE = re.compile(r'^\[(?:[a-zA-Z0-9_.-]|\\[wd.-])+\]$')
+# Give up enumerating the strings matched by a part of a regex past this
+# number
+_MAX_STRINGS = 64
+# The authority of a URL, after its "://"
+_AUTHORITY_RE = re.compile(r'[^/?#]*')
+
+
+def _strip_verbose(regex):
+    """regex without the whitespace and the comments ignored by re.VERBOSE"""
+    out = []
+    i = 0
+    in_class = False
+    while i < len(regex):
+        c = regex[i]
+        if c == '\\':
+            out.append(regex[i:i + 2])
+            i += 2
+            continue
+        if in_class:
+            in_class = c != ']'
+        elif c == '[':
+            in_class = True
+        elif c.isspace():
+            i += 1
+            continue
+        elif c == '#':
+            while i < len(regex) and regex[i] != '\n':
+                i += 1
+            continue
+        out.append(c)
+        i += 1
+    return ''.join(out)
+
+
+def _class_end(regex, i):
+    """Index past the character class starting at regex[i]"""
+    i += 1
+    if regex[i:i + 1] == '^':
+        i += 1
+    if regex[i:i + 1] == ']':
+        i += 1
+    while regex[i] != ']':
+        i += 2 if regex[i] == '\\' else 1
+    return i + 1
+
+
+def _parse(regex, i=0):
+    """Parse regex from i up to the end of the enclosing group. Return its
+    branches and the index where it stopped.
+
+    A branch is a list of (kind, value, quantifier): ('lit', character),
+    ('group', branches), ('class', source) or ('other', source) for
+    anything else (escapes like \\w, ".", anchors, lookarounds...). The
+    quantifier is None, '?', '*' (optional and repeated) or '+'.
+    """
+    branches = [[]]
+    while i < len(regex):
+        c = regex[i]
+        if c == ')':
+            break
+        if c == '|':
+            branches.append([])
+            i += 1
+            continue
+        if c == '\\':
+            escaped = regex[i + 1]
+            item = ('other', regex[i:i + 2]) if escaped.isalnum() else ('lit', escaped)
+            i += 2
+        elif c == '[':
+            end = _class_end(regex, i)
+            item = ('class', regex[i:end])
+            i = end
+        elif c == '(':
+            if regex.startswith('(?:', i):
+                start = i + 3
+            elif regex.startswith('(?P<', i):
+                start = regex.index('>', i) + 1
+            elif regex.startswith('(?', i):
+                start = None
+            else:
+                start = i + 1
+            if start is None:
+                # Lookarounds, comments, inline flags, back references
+                depth = 0
+                j = i
+                while True:
+                    if regex[j] == '\\':
+                        j += 2
+                        continue
+                    if regex[j] == '[':
+                        j = _class_end(regex, j)
+                        continue
+                    depth += {'(': 1, ')': -1}.get(regex[j], 0)
+                    j += 1
+                    if depth == 0:
+                        break
+                item = ('other', regex[i:j])
+                i = j
+            else:
+                group, end = _parse(regex, start)
+                item = ('group', group)
+                i = end + 1
+        elif c in '.^$':
+            item = ('other', c)
+            i += 1
+        else:
+            item = ('lit', c)
+            i += 1
+        quantifier = None
+        mobj = _QUANTIFIER_RE.match(regex, i)
+        if mobj:
+            quantifier = mobj.group('simple')
+            if quantifier is None:
+                # {m,n} may only match once if its minimum is 0
+                quantifier = '*' if mobj.group('min') in ('', '0') else '+'
+            i = mobj.end()
+        branches[-1].append(item + (quantifier, ))
+    return branches, i
+
+
+def _expand(items):
+    """The set of (lowercase) strings matched by items, None if it isn't a
+    small finite set"""
+    strings = set([''])
+    for kind, value, quantifier in items:
+        if kind == 'lit':
+            matched = set([value.lower()])
+        elif kind == 'group':
+            matched = set()
+            for branch in value:
+                expanded = _expand(branch)
+                if expanded is None:
+                    return None
+                matched |= expanded
+        else:
+            return None
+        if quantifier == '?':
+            matched.add('')
+        elif quantifier is not None:
+            return None
+        strings = set(s + m for s in strings for m in matched)
+        if len(strings) > _MAX_STRINGS:
+            return None
+    return strings
+
+
+def _in_host(items):
+    """Whether items can only match characters of a host name (so they
+    never match "/", ":" or "@")"""
+    for kind, value, _ in items:
+        if kind == 'lit':
+            if value in '/:@?#':
+                return False
+        elif kind == 'group':
+            if not all(_in_host(branch) for branch in value):
+                return False
+        elif kind == 'class':
+            if not _HOST_CLASS_RE.match(value):
+                return False
+        elif value not in ('\\w', '\\d'):
+            return False
+    return True
+
+
+def _ends_label(item):
+    """Whether item is a group always ending with a "." (like "(?:www\\.)?")"""
+    kind, value, _ = item
+    return kind == 'group' and all(
+        branch and branch[-1] == ('lit', '.', None) and _in_host(branch)
+        for branch in value)
+
+
+def _hosts(items):
+    """The domains that end the host matched by items, None if unknown"""
+    if len(items) == 1 and items[0][0] == 'group' and items[0][2] is None:
+        hosts = set()
+        for branch in items[0][1]:
+            branch_hosts = _hosts(branch)
+            if branch_hosts is None:
+                return None
+            hosts |= branch_hosts
+        return hosts
+    # Subdomains, the domains are complete labels after them
+    while items and _ends_label(items[0]):
+        items = items[1:]
+    hosts = _expand(items)
+    if not hosts or not all(_DOMAIN_RE.match(host) for host in hosts):
+        return None
+    return hosts
+
+
+def _branch_keys(branch):
+    """Return the hosts of the URLs that branch matches, or else the
+    literal prefix of the strings it matches, or None"""
+    if branch and branch[0] == ('other', '^', None):
+        branch = branch[1:]
+    literals = ''.join(
+        value if kind == 'lit' and quantifier is None else '\0'
+        for kind, value, quantifier in branch)
+    scheme_end = literals.find('://')
+    if scheme_end != -1 and _in_host(branch[:scheme_end]):
+        host_items = branch[scheme_end + 3:]
+        for end, (kind, value, quantifier) in enumerate(host_items):
+            if kind == 'lit' and quantifier is None and value in '/:?':
+                hosts = _hosts(host_items[:end])
+                if hosts is not None:
+                    return hosts, set()
+                break
+    prefix = literals.partition('\0')[0].lower()
+    # Too many URLs start with the scheme to tell anything
+    if len(prefix) < 2 or 'https://'.startswith(prefix) or prefix.startswith('http'):
+        return None
+    return set(), set([prefix])
+
+
+def extractor_keys(regex):
+    """Return (hosts, prefixes) for the URLs that regex matches (from their
+    start, like re.match): each matched URL has a host ending with one of
+    hosts (as complete labels), or starts with one of prefixes. Return None
+    if regex does not tell."""
+    mobj = _FLAGS_RE.match(regex)
+    if mobj:
+        if 'x' in mobj.group(1):
+            regex = _strip_verbose(regex)
+            mobj = _FLAGS_RE.match(regex)
+        regex = regex[mobj.end():]
+    try:
+        branches, end = _parse(regex)
+    except (IndexError, ValueError):
+        return None
+    if end != len(regex):
+        return None
+    hosts, prefixes = set(), set()
+    for branch in branches:
+        keys = _branch_keys(branch)
+        if keys is None:
+            return None
+        hosts |= keys[0]
+        prefixes |= keys[1]
+    return hosts, prefixes
+
+
+class ExtractorIndex(object):
+    """Index of info extractors by the hosts of the URLs they match.
+
+    The hosts (e.g. "picta.cu") come from the literal part of _VALID_URL
+    following the scheme, and the extractors whose URLs have no scheme (like
+    "ytsearch:") are indexed by the literal prefix of _VALID_URL.
+    candidates() only returns the extractors indexed under the host or a
+    prefix of the URL, plus those the index can't tell anything about (like
+    the ones accepting bare IDs), in their original order. So the first
+    suitable candidate is the same extractor a scan of the whole list would
+    find.
+
+    Overridden suitable() methods are assumed to only reject URLs matched
+    by _VALID_URL.
+    """
+
+    _CACHE_SIZE = 1024
+
+    def __init__(self, ies):
+        self._ies = list(ies)
+        self._cache = {}
+        self._by_host = {}
+        self._unindexed = []
+        prefix_positions = {}
+        for pos, ie in enumerate(self._ies):
+            if hasattr(ie, '_make_valid_url'):
+                regex = ie._make_valid_url()
+            else:
+                regex = getattr(ie, '_VALID_URL', None)
+            keys = extractor_keys(regex) if isinstance(regex, compat_str) else None
+            if keys is None:
+                self._unindexed.append(pos)
+                continue
+            hosts, prefixes = keys
+            for host in hosts:
+                self._by_host.setdefault(host, []).append(pos)
+            for prefix in prefixes:
+                prefix_positions.setdefault(prefix, []).append(pos)
+        self._prefixes = list(prefix_positions.items())
+        self._prefix_len = max([len(prefix) for prefix in prefix_positions] or [0])
+
+    def candidates(self, url):
+        """Return the info extractors that may be suitable for url"""
+        url = url.lower()
+        start = url.find('://')
+        end = 0 if start == -1 else _AUTHORITY_RE.match(url, start + 3).end()
+        # The candidates only depend on the host and on the prefixes of url
+        key = url[:max(end, self._prefix_len)]
+        ies = self._cache.get(key)
+        if ies is None:
+            positions = set(self._unindexed)
+            if start != -1:
+                host = url[start + 3:end].rpartition('@')[2].partition(':')[0]
+                labels = host.split('.')
+                for i in range(len(labels)):
+                    positions.update(self._by_host.get('.'.join(labels[i:]), ()))
+            for prefix, prefix_positions in self._prefixes:
+                if url.startswith(prefix):
+                    positions.update(prefix_positions)
+            ies = [self._ies[pos] for pos in sorted(positions)]
+            if len(self._cache) >= self._CACHE_SIZE:
+                self._cache.clear()
+            self._cache[key] = ies
+        return ies
@@ -2,10 +2,20 @@
 from __future__ import unicode_literals
 
 from base64 import b64encode
+import datetime
 import re
 
 from ..compat import compat_str, compat_HTTPError
-from ..utils import int_or_none, unified_timestamp, try_get, ExtractorError
+from ..utils import (
+    int_or_none,
+    run_concurrently,
+    smuggle_url,
+    unified_timestamp,
+    try_get,
+    unsmuggle_url,
+    ExtractorError,
+    VideoNotFoundError,
+)
 from .common import InfoExtractor
 
 ROOT_BASE_URL = "https://www.picta.cu/"
@@ -18,7 +28,7 @@ class PictaBaseIE(InfoExtractor):
     @staticmethod
     def _extract_video(video, video_id=None, require_title=True):
         if len(video["results"]) == 0:
-            raise ExtractorError("Cannot find video!")
+            raise VideoNotFoundError("Cannot find video!", video_id)
 
         title = (
             video["results"][0]["nombre"]
@@ -134,9 +144,6 @@ class PictaIE(PictaBaseIE):
 
     _SUBTITLE_FORMATS = ('srt', )
 
-    def _real_initialize(self):
-        self.playlist_id = None
-
     @classmethod
     def _match_playlist_id(cls, url):
         if '_VALID_URL_RE' not in cls.__dict__:
@@ -152,12 +159,23 @@ class PictaIE(PictaBaseIE):
         sub_url = video.get('subtitle_url', '')
 
         if sub_url:
+            # Fetch the subtitle contents right away when they are going to be
+            # written, so that they are downloaded together with the manifest
+            # instead of in a later sequential step
+            sub_data = None
+            if self._downloader.params.get('writesubtitles', False):
+                sub_data = self._download_webpage(
+                    sub_url, video.get('id'), 'Downloading subtitles',
+                    fatal=False)
             sub_formats = []
             for ext in self._SUBTITLE_FORMATS:
-                sub_formats.append({
+                sub_format = {
                     'url': sub_url,
                     'ext': ext,
-                })
+                }
+                if sub_data:
+                    sub_format['data'] = sub_data
+                sub_formats.append(sub_format)
             sub_lang_list[lang] = sub_formats
         if not sub_lang_list:
             self._downloader.report_warning('video doesn\'t have subtitles')
@@ -165,6 +183,9 @@ class PictaIE(PictaBaseIE):
         return sub_lang_list
 
     def _real_extract(self, url):
+        # Playlist entries are smuggled, they are not expanded again
+        url, smuggled_data = unsmuggle_url(url, {})
+        in_playlist = smuggled_data.get('in_playlist', False)
         playlist_id = None
         video_id = self._match_id(url)
         json_url = API_BASE_URL + "publicacion/?format=json&slug_url_raw=%s" % video_id
@@ -172,19 +193,17 @@ class PictaIE(PictaBaseIE):
         info = self._extract_video(video, video_id)
         if (
                 info["playlist_channel"]
-                and self.playlist_id is None
+                and not in_playlist
                 and self._match_playlist_id(url) is None
         ):
             playlist_id = info["playlist_channel"].get("id")
-            self.playlist_id = playlist_id
         # Download Playlist (--yes-playlist) in first place
         if (
-                self.playlist_id is None
+                not in_playlist
                 and self._match_playlist_id(url)
                 and not self._downloader.params.get('noplaylist')
         ):
             playlist_id = compat_str(self._match_playlist_id(url))
-            self.playlist_id = playlist_id
             self.to_screen('Downloading playlist %s - add --no-playlist to just download video' % playlist_id)
             return self.url_result(
                 ROOT_BASE_URL + "medias/" + video_id + "?" + "playlist=" + playlist_id,
@@ -202,22 +221,26 @@ class PictaIE(PictaBaseIE):
         elif self._downloader.params.get('noplaylist'):
             self.to_screen('Downloading just video %s because of --no-playlist' % video_id)
 
-        formats = []
-        # MPD manifest
-        if info.get("manifest_url"):
-            formats.extend(
-                self._extract_mpd_formats(info.get("manifest_url"), video_id)
-            )
+        def extract_formats():
+            # MPD manifest
+            if info.get("manifest_url"):
+                return self._extract_mpd_formats(info.get("manifest_url"), video_id)
+            return []
+
+        # Manifest and subtitles are independent of each other, fetch them
+        # concurrently once the publication JSON is known
+        formats, video_subtitles = run_concurrently([
+            extract_formats,
+            lambda: self.extract_subtitles(info),
+        ])
 
         if not formats:
             raise ExtractorError("Cannot find video formats")
 
         self._sort_formats(formats)
         info["formats"] = formats
-
-        # subtitles
-        video_subtitles = self.extract_subtitles(info)
         info["subtitles"] = video_subtitles
+        info["webpage_url"] = url
         return info
 
 
@@ -290,6 +313,8 @@ class PictaPlaylistIE(InfoExtractor):
 
     _NETRC_MACHINE = "picta"
 
+    _auth_header = None
+
     @classmethod
     def _match_playlist_id(cls, url):
         if '_VALID_URL_RE' not in cls.__dict__:
@@ -299,10 +324,13 @@ class PictaPlaylistIE(InfoExtractor):
         return m.group('playlist_id')
 
     def _set_auth_basic(self):
+        if self._auth_header is not None:
+            return dict(self._auth_header)
         header = {}
         username, password = self._get_login_info()
         if username is None:
-            return header
+            self._auth_header = header
+            return dict(header)
 
         if isinstance(username, str):
             username = username.encode('latin1')
@@ -313,7 +341,28 @@ class PictaPlaylistIE(InfoExtractor):
         authstr = "Basic " + compat_str(b64encode(b":".join((username, password))).decode("utf-8"))
 
         header["Authorization"] = authstr
-        return header
+        self._auth_header = header
+        return dict(header)
+
+    @staticmethod
+    def _extract_entry_metadata(video):
+        """ Metadata of a playlist publication, so that playlist entries can
+        be filtered before the full extraction of every video """
+        timestamp = int_or_none(unified_timestamp(video.get("fecha_creacion")))
+        upload_date = None
+        if timestamp is not None:
+            try:
+                upload_date = datetime.datetime.utcfromtimestamp(timestamp).strftime('%Y%m%d')
+            except (ValueError, OverflowError, OSError):
+                pass
+        metadata = {
+            "title": video.get("nombre"),
+            "description": video.get("descripcion"),
+            "uploader": try_get(video, lambda x: x["usuario"]["username"], compat_str),
+            "timestamp": timestamp,
+            "upload_date": upload_date,
+        }
+        return dict((k, v) for k, v in metadata.items() if v is not None)
 
     def _extract_playlist(self, playlist, playlist_id=None, require_title=True):
         if len(playlist["results"]) == 0:
@@ -353,9 +402,12 @@ class PictaPlaylistIE(InfoExtractor):
         playlist_entries = info_playlist.get("entries")
 
         for video in playlist_entries:
-            video_id = video.get("id")
+            video_id = compat_str(video.get("id"))
             video_url = ROOT_BASE_URL + "medias/" + video.get("slug_url") + "?" + "playlist=" + playlist_id
-            yield self.url_result(video_url, PictaIE.ie_key(), video_id)
+            entry = self.url_result(
+                smuggle_url(video_url, {'in_playlist': True}), PictaIE.ie_key(), video_id)
+            entry.update(self._extract_entry_metadata(video))
+            yield entry
 
     def _real_extract(self, url):
         playlist_id = self._match_playlist_id(url)
@@ -413,6 +465,9 @@ class PictaUserPlaylistIE(PictaPlaylistIE, PictaBaseIE):
             video = self._download_json(json_url, video_id, "Downloading video JSON")
             info = self._extract_video(video, video_id)
             entry["slug_url"] = info.get("slug_url")
+            for key in ("nombre", "descripcion", "fecha_creacion", "usuario"):
+                if entry.get(key) is None:
+                    entry[key] = try_get(video, lambda x: x["results"][0][key])
 
         return {
             "id": try_get(playlist, lambda x: x["results"][0]["id"], compat_str) or playlist_id,
@@ -12,8 +12,6 @@ import time
 import traceback
 
 from .common import InfoExtractor, SearchInfoExtractor
-from ..jsinterp import JSInterpreter
-from ..swfinterp import SWFInterpreter
 from ..compat import (
     compat_chr,
     compat_HTTPError,
@@ -68,6 +66,8 @@ class YoutubeBaseInfoExtractor(InfoExtractor):
     # If True it will raise an error if no login info is provided
     _LOGIN_REQUIRED = False
 
+    _LOGIN_SESSION_DOMAINS = ('youtube.com', 'google.com')
+
     _PLAYLIST_ID_RE = r'(?:PL|LL|EC|UU|FL|RD|UL|TL|PU|OLAK5uy_)[0-9A-Za-z-_]{10,}'
 
     _YOUTUBE_CLIENT_HEADERS = {
@@ -101,6 +101,9 @@ class YoutubeBaseInfoExtractor(InfoExtractor):
                 raise ExtractorError('No login info available, needed for using %s.' % self.IE_NAME, expected=True)
             return True
 
+        if self._load_login_session(username) is not None:
+            return True
+
         login_page = self._download_webpage(
             self._LOGIN_URL, None,
             note='Downloading login page',
@@ -267,6 +270,7 @@ class YoutubeBaseInfoExtractor(InfoExtractor):
             warn('Unable to log in')
             return False
 
+        self._store_login_session(username)
         return True
 
     def _download_webpage_handle(self, *args, **kwargs):
@@ -1413,11 +1417,13 @@ class YoutubeIE(YoutubeBaseInfoExtractor):
              r'\bc\s*&&\s*[a-zA-Z0-9]+\.set\([^,]+\s*,\s*\([^)]*\)\s*\(\s*(?P<sig>[a-zA-Z0-9$]+)\('),
             jscode, 'Initial JS player signature function name', group='sig')
 
+        from ..jsinterp import JSInterpreter
         jsi = JSInterpreter(jscode)
         initial_function = jsi.extract_function(funcname)
         return lambda s: initial_function([s])
 
     def _parse_sig_swf(self, file_contents):
+        from ..swfinterp import SWFInterpreter
         swfi = SWFInterpreter(file_contents)
         TARGET_CLASSNAME = 'SignatureDecipher'
         searched_class = swfi.extract_class(TARGET_CLASSNAME)
@@ -0,0 +1,113 @@
+from __future__ import unicode_literals
+
+import email.utils
+import threading
+import time
+
+
+def parse_retry_after(value):
+    """Number of seconds to wait from the value of a Retry-After header,
+    either a number of seconds or an HTTP date. None if it is invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    date = email.utils.parsedate_tz(value)
+    if date is None:
+        return None
+    return max(email.utils.mktime_tz(date) - time.time(), 0)
+
+
+class HostRateLimiter(object):
+    """Limits the HTTP requests made to each host by the extractors and the
+    downloaders, which all go through YoutubeDL.urlopen.
+
+    The requests to a host are spaced by a token bucket of rate requests per
+    second (unlimited if None) that holds up to burst tokens. When a host
+    throttles a request (throttled()), all the requests to that host wait
+    for the delay it asked for in Retry-After, up to max_retry_after seconds,
+    or else for an exponential back-off. It is safe to use from several
+    threads.
+    """
+
+    BACKOFF_BASE = 1
+    BACKOFF_MAX = 60
+    RETRY_AFTER_MAX = 300
+
+    def __init__(self, rate=None, burst=1, max_retry_after=None, clock=time.time, sleep=time.sleep):
+        self.rate = float(rate) if rate else None
+        self.burst = max(burst or 1, 1)
+        self.max_retry_after = (
+            self.RETRY_AFTER_MAX if max_retry_after is None else max_retry_after)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _host(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = {
+                'tokens': self.burst,
+                'last': self._clock(),
+                'blocked_until': 0,
+                'backoffs': 0,
+                'requests': 0,
+                'throttled': 0,
+                'waited': 0,
+            }
+        return state
+
+    def acquire(self, host):
+        """Wait until a request can be made to host, return the time waited"""
+        waited = 0
+        while True:
+            with self._lock:
+                state = self._host(host)
+                now = self._clock()
+                if self.rate:
+                    state['tokens'] = min(
+                        self.burst, state['tokens'] + (now - state['last']) * self.rate)
+                    state['last'] = now
+                    wait = (1 - state['tokens']) / self.rate if state['tokens'] < 1 else 0
+                else:
+                    wait = 0
+                wait = max(wait, state['blocked_until'] - now)
+                if wait <= 0:
+                    if self.rate:
+                        state['tokens'] -= 1
+                    state['requests'] += 1
+                    state['waited'] += waited
+                    return waited
+            self._sleep(wait)
+            waited += wait
+
+    def throttled(self, host, retry_after=None):
+        """Record that host throttled a request, asking to wait retry_after
+        seconds if it said so. Return the delay before the next request."""
+        with self._lock:
+            state = self._host(host)
+            if retry_after is None:
+                retry_after = min(
+                    self.BACKOFF_BASE * 2 ** state['backoffs'], self.BACKOFF_MAX)
+            else:
+                retry_after = min(retry_after, self.max_retry_after)
+            state['backoffs'] += 1
+            state['throttled'] += 1
+            state['blocked_until'] = max(
+                state['blocked_until'], self._clock() + retry_after)
+            return retry_after
+
+    def succeeded(self, host):
+        """Record a successful request to host, which resets its back-off"""
+        with self._lock:
+            self._host(host)['backoffs'] = 0
+
+    def stats(self):
+        """Return the number of requests, of throttled requests and the time
+        waited for each host"""
+        with self._lock:
+            return dict(
+                (host, dict((key, state[key]) for key in ('requests', 'throttled', 'waited')))
+                for host, state in self._hosts.items())
@@ -0,0 +1,226 @@
+from __future__ import unicode_literals
+
+import collections
+import contextlib
+import errno
+import os
+import socket
+import threading
+import time
+
+from .compat import compat_str
+from .utils import (
+    DownloadError,
+    error_to_compat_str,
+    MaxDownloadsReached,
+)
+
+
+Job = collections.namedtuple('Job', ['id', 'url', 'attempts'])
+
+
+def _process_exists(pid):
+    if os.name == 'nt':
+        import ctypes
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        handle = ctypes.windll.kernel32.OpenProcess(
+            PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except OSError as err:
+        return err.errno == errno.EPERM
+    return True
+
+
+class JobQueue(object):
+    """Batch of URLs stored in an SQLite database, so that a run interrupted
+    at any point can be resumed where it stopped.
+
+    Every URL is a job that goes through the states PENDING, EXTRACTING,
+    DOWNLOADING, POSTPROCESSING and then DONE or FAILED. A failed job goes
+    back to PENDING until it has been attempted retries + 1 times. Jobs are
+    claimed atomically, so several processes may consume the same queue.
+    The jobs left in flight by a process that died are taken over by
+    recover().
+    """
+
+    PENDING = 'pending'
+    EXTRACTING = 'extracting'
+    DOWNLOADING = 'downloading'
+    POSTPROCESSING = 'postprocessing'
+    DONE = 'done'
+    FAILED = 'failed'
+    IN_FLIGHT = (EXTRACTING, DOWNLOADING, POSTPROCESSING)
+
+    _TIMEOUT = 60
+
+    def __init__(self, filename, retries=0):
+        # Only imported when used, it is slow to load
+        try:
+            import sqlite3
+        except ImportError:  # Python built without sqlite support
+            raise ValueError('The job queue requires Python with sqlite3 support')
+        self.filename = filename
+        self.retries = retries
+        self._lock = threading.Lock()
+        # Transactions are handled explicitly, see _transaction
+        self._conn = sqlite3.connect(
+            filename, timeout=self._TIMEOUT, check_same_thread=False,
+            isolation_level=None)
+        with self._transaction():
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT UNIQUE NOT NULL, '
+                'state TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, '
+                'owner TEXT, error TEXT, created REAL NOT NULL, updated REAL NOT NULL)')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id)')
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """Write transaction, which takes the database lock at once so that
+        a claim is never interleaved with another"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    @staticmethod
+    def _owner():
+        # Computed on every call, a forked worker has its own PID
+        return '%s:%d' % (socket.gethostname(), os.getpid())
+
+    def add(self, urls):
+        """Queue the URLs of the iterable urls that are not queued yet and
+        return their number. urls is consumed lazily, so a large batch file
+        is never held in memory."""
+        now = time.time()
+        with self._transaction():
+            before = self._conn.total_changes
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO jobs (url, state, created, updated) '
+                'VALUES (?, ?, ?, ?)',
+                ((url, self.PENDING, now, now) for url in urls))
+            return self._conn.total_changes - before
+
+    def recover(self):
+        """Put the in-flight jobs of dead processes of this host back in the
+        queue and return their number"""
+        hostname = socket.gethostname()
+        with self._transaction():
+            stale = []
+            for job_id, owner in self._conn.execute(
+                    'SELECT id, owner FROM jobs WHERE state IN (?, ?, ?)', self.IN_FLIGHT):
+                host, _, pid = (owner or '').rpartition(':')
+                if host == hostname and not _process_exists(int(pid)):
+                    stale.append((self.PENDING, time.time(), job_id))
+            self._conn.executemany(
+                'UPDATE jobs SET state = ?, owner = NULL, updated = ? WHERE id = ?',
+                stale)
+        return len(stale)
+
+    def claim(self):
+        """Take the oldest pending job, return None if there is none left"""
+        with self._transaction():
+            row = self._conn.execute(
+                'SELECT id, url, attempts FROM jobs WHERE state = ? ORDER BY id LIMIT 1',
+                (self.PENDING, )).fetchone()
+            if row is None:
+                return None
+            job = Job(row[0], row[1], row[2] + 1)
+            self._conn.execute(
+                'UPDATE jobs SET state = ?, attempts = ?, owner = ?, error = NULL, '
+                'updated = ? WHERE id = ?',
+                (self.EXTRACTING, job.attempts, self._owner(), time.time(), job.id))
+        return job
+
+    def set_state(self, job, state):
+        with self._transaction():
+            self._conn.execute(
+                'UPDATE jobs SET state = ?, updated = ? WHERE id = ?',
+                (state, time.time(), job.id))
+
+    def release(self, job):
+        """Put job back in the queue without counting the attempt"""
+        with self._transaction():
+            self._conn.execute(
+                'UPDATE jobs SET state = ?, attempts = attempts - 1, owner = NULL, '
+                'updated = ? WHERE id = ?',
+                (self.PENDING, time.time(), job.id))
+
+    def finish(self, job, error=None):
+        """Mark job as done, or as failed with the message error. Return its
+        new state."""
+        if error is None:
+            state = self.DONE
+        elif job.attempts <= self.retries:
+            state = self.PENDING
+        else:
+            state = self.FAILED
+        with self._transaction():
+            self._conn.execute(
+                'UPDATE jobs SET state = ?, owner = NULL, error = ?, updated = ? '
+                'WHERE id = ?', (state, error, time.time(), job.id))
+        return state
+
+    def counts(self):
+        """Return the number of jobs in each state"""
+        with self._lock:
+            return dict(self._conn.execute(
+                'SELECT state, COUNT(*) FROM jobs GROUP BY state'))
+
+    def close(self):
+        self._conn.close()
+
+
+def download_from_queue(ydl, queue, abort=None, on_done=None):
+    """Download the jobs of queue with ydl until none is pending (or abort,
+    a threading.Event, is set). on_done(url, retcode) is called after each
+    job. Return the aggregated return code.
+
+    Without the ignoreerrors option, the first error is raised like in
+    YoutubeDL.download. An interrupted job is put back in the queue."""
+    retcode = 0
+    while abort is None or not abort.is_set():
+        job = queue.claim()
+        if job is None:
+            break
+        states = [queue.EXTRACTING]
+
+        def progress_hook(status):
+            state = {
+                'downloading': queue.DOWNLOADING,
+                'finished': queue.POSTPROCESSING,
+            }.get(status['status'])
+            if state is not None and state != states[-1]:
+                states.append(state)
+                queue.set_state(job, state)
+
+        try:
+            with ydl._download_job(progress_hooks=[progress_hook]):
+                job_retcode = ydl.download([job.url])
+        except DownloadError as err:
+            queue.finish(job, error_to_compat_str(err))
+            if on_done is not None:
+                on_done(job.url, 1)
+            raise
+        except (KeyboardInterrupt, MaxDownloadsReached):
+            queue.release(job)
+            raise
+        except Exception as err:
+            queue.finish(job, error_to_compat_str(err) or compat_str(type(err).__name__))
+            raise
+        # With ignoreerrors the error has only been reported
+        queue.finish(job, 'download failed' if job_retcode else None)
+        retcode = max(retcode, job_retcode)
+        if on_done is not None:
+            on_done(job.url, job_retcode)
+    return retcode
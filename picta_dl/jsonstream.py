@@ -0,0 +1,166 @@
+from __future__ import unicode_literals
+
+import io
+import json
+import os
+import sys
+
+from .utils import json_default
+
+
+# Fields of the info dicts and of their formats left out of the compact
+# JSON output, their size grows with the length of the videos
+BULKY_FIELDS = ('fragments', 'http_headers')
+
+
+def compact_info(info_dict):
+    """Copy of info_dict without the BULKY_FIELDS, in it and in its formats"""
+    info_dict = dict(
+        (k, v) for k, v in info_dict.items() if k not in BULKY_FIELDS)
+    for key in ('formats', 'requested_formats'):
+        if info_dict.get(key):
+            info_dict[key] = [
+                dict((k, v) for k, v in f.items() if k not in BULKY_FIELDS)
+                for f in info_dict[key]]
+    return info_dict
+
+
+class JSONStreamWriter(object):
+    """Writes the result of each URL as JSON (--dump-single-json) while it is
+    resolved, with write, a function writing a string.
+
+    Its playlist_hook must be added to the YoutubeDL: the fields of a
+    playlist are written when it is started, then each entry as soon as it
+    is processed. By default the result of a URL is one JSON document, the
+    same as json.dumps(result), followed by a new line: the entries that
+    failed are null. With lines, the playlists (without their entries) and
+    the entries are written each on a line of their own (newline-delimited
+    JSON), and the entries that failed are left out. With compact, the
+    BULKY_FIELDS are left out. With buffered, each document is written at
+    once when it is complete, for outputs that several processes share.
+    """
+
+    def __init__(self, write, lines=False, compact=False, buffered=False):
+        self._write = write
+        self._lines = lines
+        self._compact = compact
+        self._buffered = buffered
+        self._buffer = []
+        # The number of entries written of each playlist being written
+        self._open = []
+        # The last playlist completely written, its result must not be
+        # written again
+        self._finished = None
+
+    def _dumps(self, obj):
+        if self._compact and obj is not None:
+            obj = compact_info(obj)
+        return json.dumps(obj, default=json_default)
+
+    def _emit(self, s):
+        self._buffer.append(s)
+        if not self._open or not self._buffered:
+            self._write(''.join(self._buffer))
+            self._buffer = []
+
+    def _start_item(self):
+        # Separates the entries of the playlist being written
+        if self._open:
+            if self._open[-1]:
+                self._emit(', ')
+            self._open[-1] += 1
+
+    def playlist_hook(self, d):
+        status = d['status']
+        playlist = d['playlist']
+        if status == 'started':
+            fields = dict((k, v) for k, v in playlist.items() if k != 'entries')
+            if self._lines:
+                self._emit(self._dumps(fields) + '\n')
+                return
+            self._start_item()
+            header = self._dumps(fields)[:-1]
+            self._open.append(0)
+            self._emit(header + (', ' if fields else '') + '"entries": [')
+        elif status == 'entry':
+            self.result(d['info_dict'])
+        elif status == 'finished':
+            self._finished = playlist
+            if not self._lines:
+                self._open.pop()
+                self._emit(']}' if self._open else ']}\n')
+
+    def result(self, info_dict):
+        """Write info_dict, a result that isn't a playlist already written"""
+        if info_dict is not None and info_dict is self._finished:
+            self._finished = None
+            return
+        if self._lines:
+            if info_dict is not None:
+                self._emit(self._dumps(info_dict) + '\n')
+            return
+        self._start_item()
+        self._emit(self._dumps(info_dict) + ('' if self._open else '\n'))
+
+    def close(self):
+        """Terminate the playlists left open by an error, so that the output
+        is still valid JSON"""
+        while self._open:
+            self._open.pop()
+            self._emit(']}' if self._open else ']}\n')
+        self._finished = None
+
+
+def _read_lines(f, name):
+    lines = iter(f)
+    for line in lines:
+        if line.strip():
+            break
+    else:
+        return
+    try:
+        info_dict = json.loads(line)
+    except ValueError:
+        # A document written on several lines
+        yield json.loads(line + ''.join(lines))
+        return
+    yield info_dict
+    for lineno, line in enumerate(lines, 2):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as err:
+            raise ValueError('%s, line %d: %s' % (name, lineno, err))
+
+
+def read_info_json(path):
+    """Generate the info dicts stored in path: a JSON file (as written by
+    --write-info-json), a directory of them (the *.info.json files of its
+    tree) or a file with a JSON document on each line (as printed by
+    --dump-json or --json-lines). '-' reads the standard input.
+
+    The playlists without entries (the ones printed by --json-lines, whose
+    entries are on the next lines) are left out.
+    """
+    if path != '-' and os.path.isdir(path):
+        def generate():
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if filename.endswith('.info.json'):
+                        with io.open(os.path.join(dirpath, filename), encoding='utf-8') as f:
+                            yield json.load(f)
+    else:
+        def generate():
+            if path == '-':
+                f = io.open(sys.stdin.fileno(), encoding='utf-8', closefd=False)
+            else:
+                f = io.open(path, encoding='utf-8')
+            with f:
+                for info_dict in _read_lines(f, path):
+                    yield info_dict
+    for info_dict in generate():
+        if info_dict.get('_type') == 'playlist' and 'entries' not in info_dict:
+            continue
+        yield info_dict
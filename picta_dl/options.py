@@ -198,6 +198,21 @@ def parseOpts(overrideArguments=None):
         action='store_true', dest='no_color',
         default=False,
         help='Do not emit color codes in output')
+    general.add_option(
+        '--daemon',
+        dest='daemon', metavar='ADDRESS', default=None,
+        help=(
+            'Stay running and download the URLs of the jobs sent to ADDRESS, '
+            'either HOST:PORT (HTTP) or the path of a UNIX socket. '
+            'A job is queued by POSTing {"url": URL, "params": {...}} to /jobs, '
+            'where params optionally overrides some options of this run (the format, '
+            'subtitles, rate limit...); its status and progress are at /jobs/ID and /jobs/ID/events. '
+            'HOST must be the loopback interface, and the requests must have an '
+            '"Authorization: Bearer TOKEN" header'))
+    general.add_option(
+        '--daemon-token',
+        dest='daemon_token', metavar='TOKEN', default=None,
+        help='Token of the requests to a --daemon on HOST:PORT (default is a random token, printed at start)')
 
     network = optparse.OptionGroup(parser, 'Network Options')
     network.add_option(
@@ -344,6 +359,19 @@ def parseOpts(overrideArguments=None):
         '--download-archive', metavar='FILE',
         dest='download_archive',
         help='Download only videos not listed in the archive file. Record the IDs of all downloaded videos in it.')
+    selection.add_option(
+        '--download-archive-backend', metavar='BACKEND',
+        dest='download_archive_backend', default=None, choices=('text', 'sqlite'),
+        help='Storage of the download archive: "text" (one ID per line) or "sqlite". '
+             'Default is sqlite for files ending in .db, .sqlite or .sqlite3 and text otherwise')
+    selection.add_option(
+        '--archive-import', metavar='FILE',
+        dest='archive_import',
+        help='Add the IDs of the text archive FILE to the --download-archive')
+    selection.add_option(
+        '--archive-export', metavar='FILE',
+        dest='archive_export',
+        help='Write the IDs of the --download-archive to the text archive FILE')
     selection.add_option(
         '--include-ads',
         dest='include_ads', action='store_true',
@@ -499,6 +527,11 @@ def parseOpts(overrideArguments=None):
         '--playlist-random',
         action='store_true',
         help='Download playlist videos in random order')
+    downloader.add_option(
+        '--stream-playlists',
+        action='store_true', dest='stream_playlists', default=False,
+        help='Download playlist videos as they are extracted and don\'t keep their information in memory, '
+             'for very long playlists')
     downloader.add_option(
         '--xattr-set-filesize',
         dest='xattr_set_filesize', action='store_true',
@@ -525,6 +558,66 @@ def parseOpts(overrideArguments=None):
         '--external-downloader-args',
         dest='external_downloader_args', metavar='ARGS',
         help='Give these arguments to the external downloader')
+    downloader.add_option(
+        '--retry-backoff',
+        dest='retry_backoff', metavar='SECONDS', type=float, default=1.0,
+        help='Base of the exponential back-off between retries, doubled at every '
+             'retry up to 60 seconds, with jitter (default is %default, 0 retries at once)')
+    downloader.add_option(
+        '--circuit-breaker',
+        dest='circuit_breaker_threshold', metavar='FAILURES', type=int, default=None,
+        help='Suspend the requests to a host after FAILURES consecutive timeouts, '
+             'reset connections or server errors, even if they have retries left (default is disabled)')
+    downloader.add_option(
+        '--circuit-breaker-cooldown',
+        dest='circuit_breaker_cooldown', metavar='SECONDS', type=float, default=30.0,
+        help='Seconds during which the requests to a host are suspended by --circuit-breaker (default is %default)')
+    downloader.add_option(
+        '--extractor-retries',
+        dest='extractor_retries', metavar='RETRIES', type=int, default=None,
+        help='Number of retries of a webpage or API request after a timeout, '
+             'a reset connection or a server error (default is 3, and none for '
+             'the requests that are allowed to fail)')
+    downloader.add_option(
+        '--max-request-rate',
+        dest='max_request_rate', metavar='RATE', type=float, default=None,
+        help='Maximum number of HTTP requests per second to each host. '
+             'Requests throttled by the host (HTTP error 429, or 503 with '
+             'Retry-After) always pause all the requests to that host')
+    downloader.add_option(
+        '--throttle-retries',
+        dest='throttle_retries', metavar='RETRIES', default=None,
+        help='Number of retries of a request throttled by the host, '
+             'or "infinite" (default is --retries)')
+    downloader.add_option(
+        '--max-retry-after',
+        dest='max_retry_after', metavar='SECONDS', type=float, default=300,
+        help='Maximum number of seconds to wait for a throttling host, '
+             'whatever it asks for (default is %default)')
+    downloader.add_option(
+        '--request-burst',
+        dest='request_burst', metavar='N', type=int, default=1,
+        help='Number of requests to a host that may be made at once before '
+             '--max-request-rate applies (default is %default)')
+    downloader.add_option(
+        '--workers',
+        dest='workers', metavar='N', type=int, default=None,
+        help='Download the URLs in N processes at once. The processes share '
+             'the download archive, never download the same video twice and '
+             'never write the same file at once (not available on Windows)')
+    downloader.add_option(
+        '--schedule',
+        dest='schedule', metavar='ORDER', default=None,
+        choices=('shortest-first', 'largest-first'),
+        help='Extract the metadata of all the URLs first, then download the videos '
+             'ordered by estimated size: shortest-first or largest-first')
+    downloader.add_option(
+        '--time-budget',
+        dest='time_budget', metavar='DURATION', default=None,
+        help='Skip the videos that are not expected to finish downloading within '
+             'DURATION (e.g. 90m or 2h30m), estimated from their size and the '
+             'observed throughput. Implies --schedule shortest-first unless '
+             'another order is given')
 
     workarounds = optparse.OptionGroup(parser, 'Workarounds')
     workarounds.add_option(
@@ -630,6 +723,15 @@ def parseOpts(overrideArguments=None):
         '-J', '--dump-single-json',
         action='store_true', dest='dump_single_json', default=False,
         help='Simulate, quiet but print JSON information for each command-line argument. If the URL refers to a playlist, dump the whole playlist information in a single line.')
+    verbosity.add_option(
+        '--json-lines',
+        action='store_true', dest='json_lines', default=False,
+        help='With --dump-single-json, print the information of playlists and of each of their videos '
+             'on a line of their own, as soon as it is known')
+    verbosity.add_option(
+        '--compact-json',
+        action='store_true', dest='compact_json', default=False,
+        help='Leave the fragments and the HTTP headers of the formats out of the printed JSON information')
     verbosity.add_option(
         '--print-json',
         action='store_true', dest='print_json', default=False,
@@ -682,6 +784,17 @@ def parseOpts(overrideArguments=None):
         dest='batchfile', metavar='FILE',
         help="File containing URLs to download ('-' for stdin), one URL per line. "
              "Lines starting with '#', ';' or ']' are considered as comments and ignored.")
+    filesystem.add_option(
+        '--job-queue',
+        dest='job_queue', metavar='FILE', default=None,
+        help='Download through a job queue stored in this SQLite file: the URLs '
+             'are added to the queue, which records the state of each of them, so '
+             'that running again with the same file resumes an interrupted batch. '
+             'Several processes may consume the same queue')
+    filesystem.add_option(
+        '--job-queue-retries',
+        dest='job_queue_retries', metavar='RETRIES', type=int, default=0,
+        help='Number of times a failed job of the queue is retried (default is %default)')
     filesystem.add_option(
         '--id', default=False,
         action='store_true', dest='useid', help='Use only video ID in file name')
@@ -748,7 +861,10 @@ def parseOpts(overrideArguments=None):
     filesystem.add_option(
         '--load-info-json', '--load-info',
         dest='load_info_filename', metavar='FILE',
-        help='JSON file containing the video information (created with the "--write-info-json" option)')
+        help='JSON file containing the video information (created with the "--write-info-json" option), '
+             'a directory of such files, or a file with the information of a video on each line '
+             '(as printed by --dump-json), "-" for stdin. The videos are not extracted again, '
+             'unless their media URLs have expired. They are downloaded in parallel with --workers')
     filesystem.add_option(
         '--cookies',
         dest='cookiefile', metavar='FILE',
@@ -763,6 +879,21 @@ def parseOpts(overrideArguments=None):
         '--rm-cache-dir',
         action='store_true', dest='rm_cachedir',
         help='Delete all filesystem cache files')
+    filesystem.add_option(
+        '--extraction-cache-ttl',
+        type=int, dest='extraction_cache_ttl', default=None, metavar='SECONDS',
+        help='Reuse the extracted information of a video from the cache directory during SECONDS seconds, '
+             'without extracting it again. Keep it shorter than the validity of the media URLs (default is disabled)')
+    filesystem.add_option(
+        '--failure-cache-ttl',
+        type=int, dest='failure_cache_ttl', default=None, metavar='SECONDS',
+        help='Remember in the cache directory the URLs that failed permanently '
+             '(deleted or private videos, login required, geo restriction) and skip them '
+             'without network access during SECONDS seconds (default is disabled)')
+    filesystem.add_option(
+        '--recheck-failed',
+        action='store_true', dest='recheck_failed', default=False,
+        help='Extract again the URLs skipped by --failure-cache-ttl')
 
     thumbnail = optparse.OptionGroup(parser, 'Thumbnail images')
     thumbnail.add_option(
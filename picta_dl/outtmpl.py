@@ -0,0 +1,99 @@
+from __future__ import unicode_literals
+
+import re
+
+from .compat import compat_str
+from .utils import expand_path
+
+
+class OutputTemplate(object):
+    """An output template (the outtmpl option) compiled once for
+    YoutubeDL.prepare_filename.
+
+    fields is the set of the fields the template references, so that only
+    those have to be sanitized. The rewrites prepare_filename used to apply
+    to the template on every call depend on little more than which
+    numeric fields are missing, so each variant is built once and cached.
+    """
+
+    # For fields playlist_index and autonumber convert all occurrences
+    # of %(field)s to %(field)0Nd for backward compatibility
+    _FIELD_SIZE_COMPAT_RE = re.compile(r'(?<!%)%\((?P<field>autonumber|playlist_index)\)s')
+
+    _FIELD_RE = re.compile(r'%(?:%|\((?P<field>[^)]*)\))')
+
+    # Missing numeric fields used together with integer presentation types
+    # in format specification will break the argument substitution since
+    # string 'NA' is returned for missing fields. We will patch output
+    # template for missing fields to meet string presentation type.
+    # As of [1] format syntax is:
+    #  %[mapping_key][conversion_flags][minimum_width][.precision][length_modifier]type
+    # 1. https://docs.python.org/2/library/stdtypes.html#string-formatting
+    _NUMERIC_FORMAT_RE = r'''(?x)
+        (?<!%)
+        %
+        \({0}\)  # mapping key
+        (?:[#0\-+ ]+)?  # conversion flags (optional)
+        (?:\d+)?  # minimum width (optional)
+        (?:\.\d+)?  # precision (optional)
+        [hlL]?  # length modifier (optional)
+        [diouxXeEfFgGcrs%]  # conversion type
+    '''
+
+    # Separator protecting '%%' and '$$' from expand_path, which would
+    # translate them into '%' and '$'
+    _SEP = '\0'
+
+    def __init__(self, outtmpl, numeric_fields):
+        self.outtmpl = outtmpl
+        mobj = self._FIELD_SIZE_COMPAT_RE.search(outtmpl)
+        self._size_compat_field = mobj.group('field') if mobj else None
+        # Environment variables may add fields too
+        self.fields = frozenset(
+            mobj.group('field')
+            for tmpl in (outtmpl, self._expand(outtmpl))
+            for mobj in self._FIELD_RE.finditer(tmpl)
+            if mobj.group('field') is not None)
+        if self._size_compat_field == 'playlist_index':
+            self.fields |= frozenset(['n_entries'])
+        self._numeric_fields = self.fields & frozenset(numeric_fields)
+        self._variants = {}
+
+    def _expand(self, outtmpl):
+        # outtmpl should be expand_path'ed before template dict substitution
+        # because meta fields may contain env variables we don't want to
+        # be expanded. For example, for outtmpl "%(title)s.%(ext)s" and
+        # title "Hello $PATH", we don't want `$PATH` to be expanded.
+        sep = self._SEP
+        outtmpl = outtmpl.replace('%%', '%{0}%'.format(sep)).replace('$$', '${0}$'.format(sep))
+        return expand_path(outtmpl).replace(sep, '')
+
+    def _variant(self, field_size, missing):
+        key = (field_size, missing)
+        outtmpl = self._variants.get(key)
+        if outtmpl is None:
+            outtmpl = self.outtmpl
+            if field_size is not None:
+                outtmpl = self._FIELD_SIZE_COMPAT_RE.sub(
+                    r'%%(\1)0%dd' % field_size, outtmpl)
+            for numeric_field in missing:
+                outtmpl = re.sub(
+                    self._NUMERIC_FORMAT_RE.format(numeric_field),
+                    r'%({0})s'.format(numeric_field), outtmpl)
+            outtmpl = self._variants[key] = self._expand(outtmpl)
+        return outtmpl
+
+    def substitute(self, template_dict, autonumber_size, streamed=False):
+        """Fill the template with template_dict, a mapping of the sanitized
+        fields returning 'NA' for the missing ones. streamed tells that the
+        number of entries of the playlist is unknown because they are
+        processed as they are extracted, then playlist_index isn't padded."""
+        field_size = None
+        if self._size_compat_field == 'autonumber':
+            field_size = autonumber_size
+        elif self._size_compat_field == 'playlist_index' and not streamed:
+            # The size of 'NA' if n_entries is missing
+            field_size = len(compat_str(template_dict['n_entries']))
+        missing = frozenset(
+            field for field in self._numeric_fields if field not in template_dict)
+        return self._variant(field_size, missing) % template_dict
@@ -72,11 +72,20 @@ class FFmpegPostProcessor(PostProcessor):
     def get_versions(downloader=None):
         return FFmpegPostProcessor(downloader)._versions
 
+    # Versions of the executables by path, shared by all the instances so
+    # that they are only probed once per process
+    _exe_versions = {}
+
     def _determine_executables(self):
         programs = ['avprobe', 'avconv', 'ffmpeg', 'ffprobe']
         prefer_ffmpeg = True
 
         def get_ffmpeg_version(path):
+            if path not in FFmpegPostProcessor._exe_versions:
+                FFmpegPostProcessor._exe_versions[path] = probe_ffmpeg_version(path)
+            return FFmpegPostProcessor._exe_versions[path]
+
+        def probe_ffmpeg_version(path):
             ver = get_exe_version(path, args=['-version'])
             if ver:
                 regexs = [
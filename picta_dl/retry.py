@@ -0,0 +1,194 @@
+from __future__ import unicode_literals
+
+import errno
+import random
+import socket
+import threading
+import time
+
+from .compat import (
+    compat_http_client,
+    compat_urllib_error,
+    compat_urllib_parse_urlparse,
+)
+from .utils import (
+    CircuitOpenError,
+    ContentTooShortError,
+)
+
+
+def classify_error(err):
+    """Category of a network error, one of 'timeout', 'reset', 'server'
+    (HTTP 5xx), 'not_found' (HTTP 404), 'throttled' (HTTP 429, or 503 already
+    retried by YoutubeDL.urlopen after its Retry-After), 'http' (other HTTP
+    errors), 'incomplete' (the connection closed early) or None if it isn't
+    a network error"""
+    if isinstance(err, compat_urllib_error.HTTPError):
+        if getattr(err, 'throttled', False):
+            return 'throttled'
+        if 500 <= err.code < 600:
+            return 'server'
+        return {404: 'not_found', 429: 'throttled'}.get(err.code, 'http')
+    if isinstance(err, compat_urllib_error.URLError):
+        err = err.reason
+    if isinstance(err, socket.timeout):
+        return 'timeout'
+    if isinstance(err, (ContentTooShortError, compat_http_client.IncompleteRead)):
+        return 'incomplete'
+    if isinstance(err, compat_http_client.HTTPException):
+        return 'reset'
+    if isinstance(err, socket.error):
+        if err.errno == errno.ETIMEDOUT or getattr(err, 'message', None) == 'The read operation timed out':
+            return 'timeout'
+        if err.errno in (errno.ECONNRESET, errno.ECONNREFUSED, errno.ECONNABORTED, errno.EPIPE):
+            return 'reset'
+    return None
+
+
+# The errors that tell that a host is failing, rather than a resource
+_HOST_FAILURES = ('timeout', 'reset', 'server')
+
+# Fragments may be unavailable for a moment, so any HTTP error is retried.
+# Throttled requests are never retried here: YoutubeDL.urlopen already waits
+# and retries them as many times as throttle_retries.
+FRAGMENT_RETRY_ON = ('server', 'not_found', 'http')
+
+
+class RetryPolicy(object):
+    """Retry policy shared by the downloaders and the extractors of a
+    YoutubeDL instance (YoutubeDL.retry_policy).
+
+    A retried request waits for an exponential back-off with jitter: the
+    n-th retry waits between half and all of backoff * 2 ** (n - 1) seconds,
+    at most max_backoff. If failure_threshold is set, after that many
+    consecutive timeouts, resets or server errors of a host, its circuit
+    opens: for cooldown seconds the requests to the host fail at once with
+    CircuitOpenError, then a single success closes it again. Without it, the
+    requests are only limited by their own number of retries.
+    """
+
+    def __init__(self, backoff=1.0, max_backoff=60.0, failure_threshold=None,
+                 cooldown=30.0, clock=time.time, sleep=time.sleep):
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self._stats = {}
+
+    def retrier(self, url, retries, kind, retry_on=_HOST_FAILURES + ('incomplete', ), check_cancelled=None):
+        """Retry state of one request to url: retried at most retries times
+        for the error categories of retry_on. kind names the requests in
+        the stats (e.g. 'http' or 'fragment')."""
+        return Retrier(self, url, retries, kind, retry_on, check_cancelled)
+
+    def delay(self, count):
+        """Seconds to wait before the retry number count"""
+        delay = min(self.max_backoff, self.backoff * 2 ** (count - 1))
+        return delay / 2 + random.random() * delay / 2
+
+    def _host(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = {'failures': 0, 'open_until': None}
+        return state
+
+    def _check_circuit(self, host):
+        with self._lock:
+            open_until = self._host(host)['open_until']
+            if open_until is not None and self._clock() < open_until:
+                raise CircuitOpenError(host, open_until - self._clock())
+
+    def _record(self, host, kind, failure=False, retry=False, lost=0):
+        with self._lock:
+            state = self._host(host)
+            if failure and self.failure_threshold:
+                state['failures'] += 1
+                if state['failures'] >= self.failure_threshold:
+                    # Half-open once the cooldown is over: the next failure
+                    # opens the circuit again
+                    state['failures'] = self.failure_threshold - 1
+                    state['open_until'] = self._clock() + self.cooldown
+                    self._stat(kind)['circuits_opened'] += 1
+            elif failure is None:
+                state['failures'] = 0
+                state['open_until'] = None
+            stat = self._stat(kind)
+            stat['retries'] += 1 if retry else 0
+            stat['time_lost'] += lost
+
+    def _stat(self, kind):
+        stat = self._stats.get(kind)
+        if stat is None:
+            stat = self._stats[kind] = {'retries': 0, 'time_lost': 0, 'circuits_opened': 0}
+        return stat
+
+    def stats(self):
+        """Return the number of retries, the seconds lost in failed attempts
+        and back-offs and the number of circuits opened, by kind"""
+        with self._lock:
+            return dict((kind, dict(stat)) for kind, stat in self._stats.items())
+
+
+class Retrier(object):
+    """The retry state of one request, see RetryPolicy.retrier.
+
+        retrier = policy.retrier(url, retries, 'http')
+        while True:
+            retrier.attempt()
+            try:
+                ...
+            except SomeError as err:
+                if not retrier.failed(err):
+                    raise
+                report the retry
+                retrier.sleep()
+            else:
+                retrier.succeeded()
+                break
+    """
+
+    _SLEEP_STEP = 0.5
+
+    def __init__(self, policy, url, retries, kind, retry_on, check_cancelled=None):
+        self._policy = policy
+        self.host = compat_urllib_parse_urlparse(url).netloc
+        self.retries = retries
+        self.kind = kind
+        self.retry_on = retry_on
+        self._check_cancelled = check_cancelled
+        self._start = None
+        self.count = 0
+
+    def attempt(self):
+        """Start an attempt, raise CircuitOpenError if the host is failing"""
+        self._policy._check_circuit(self.host)
+        self._start = self._policy._clock()
+
+    def failed(self, err):
+        """Record that the attempt failed with err, return whether to retry"""
+        category = classify_error(err)
+        lost = self._policy._clock() - self._start if self._start is not None else 0
+        retry = category in self.retry_on and self.count < self.retries
+        if retry:
+            self.count += 1
+        self._policy._record(
+            self.host, self.kind, failure=category in _HOST_FAILURES, retry=retry, lost=lost)
+        return retry
+
+    def succeeded(self):
+        self._policy._record(self.host, self.kind, failure=None)
+
+    def sleep(self):
+        """Wait for the back-off of the current retry"""
+        delay = self._policy.delay(self.count)
+        left = delay
+        while left > 0:
+            if self._check_cancelled is not None:
+                self._check_cancelled()
+            self._policy._sleep(min(left, self._SLEEP_STEP))
+            left -= self._SLEEP_STEP
+        self._policy._record(self.host, self.kind, lost=delay)
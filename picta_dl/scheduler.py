@@ -0,0 +1,141 @@
+from __future__ import unicode_literals
+
+import time
+
+from .utils import (
+    DEFAULT_OUTTMPL,
+    DownloadError,
+    format_bytes,
+    formatSeconds,
+    SameFileError,
+)
+
+
+SCHEDULE_ORDERS = ('shortest-first', 'largest-first')
+
+
+def estimate_filesize(info_dict):
+    """Estimated size in bytes of the download of a processed info_dict,
+    from the sizes of its selected formats or else from their bitrates and
+    the duration. None if it can't be estimated."""
+    total = 0
+    for f in info_dict.get('requested_formats') or [info_dict]:
+        size = f.get('filesize') or f.get('filesize_approx')
+        if not size:
+            tbr = f.get('tbr') or (f.get('vbr') or 0) + (f.get('abr') or 0)
+            if not tbr or not info_dict.get('duration'):
+                return None
+            size = tbr * 1000 / 8 * info_dict['duration']
+        total += size
+    return int(total)
+
+
+def _iter_videos(ie_result):
+    """The videos of a result of extract_info(download=False), with the
+    entries of the playlists flattened"""
+    if ie_result is None:
+        return
+    if ie_result.get('_type', 'video') in ('playlist', 'multi_video'):
+        for entry in ie_result.get('entries') or []:
+            for video in _iter_videos(entry):
+                yield video
+    else:
+        yield ie_result
+
+
+class _Throughput(object):
+    """Observed rate of the downloads, in bytes per second of the time spent
+    on the videos that transferred data (so it includes the overhead of
+    connecting and post-processing)"""
+
+    def __init__(self, initial_rate=None):
+        self._initial_rate = initial_rate
+        self._bytes = 0
+        self._seconds = 0
+        self.transferred = 0
+
+    def progress_hook(self, status):
+        # 'elapsed' is only given when data has been transferred, not for
+        # files that were already downloaded
+        if status['status'] == 'finished' and status.get('elapsed') is not None:
+            self.transferred += status.get('downloaded_bytes') or 0
+
+    def add(self, transferred, seconds):
+        if transferred:
+            self._bytes += transferred
+            self._seconds += seconds
+
+    @property
+    def rate(self):
+        if self._seconds > 0:
+            return self._bytes / self._seconds
+        return self._initial_rate
+
+
+def download_scheduled(ydl, url_list, order='shortest-first', time_budget=None):
+    """Extract the metadata of all the URLs of url_list first, then download
+    their videos ordered by estimated size, shortest or largest first (the
+    videos of unknown size come last). Return the return code.
+
+    With a time_budget in seconds, a video is skipped if, at the throughput
+    observed so far (or the rate limit before the first download), it isn't
+    expected to be downloaded before the budget runs out. A download that has
+    started is never interrupted.
+    """
+    if order not in SCHEDULE_ORDERS:
+        raise ValueError('Invalid schedule order %r' % order)
+    deadline = time.time() + time_budget if time_budget is not None else None
+
+    with ydl._download_job() as job:
+        videos = []
+        for url in url_list:
+            ie_result = ydl.extract_info(
+                url, download=False,
+                force_generic_extractor=ydl.params.get('force_generic_extractor', False))
+            videos.extend(_iter_videos(ie_result))
+
+        outtmpl = ydl.params.get('outtmpl', DEFAULT_OUTTMPL)
+        if len(videos) > 1 and outtmpl != '-' and '%' not in outtmpl:
+            raise SameFileError(outtmpl)
+
+        sizes = [estimate_filesize(video) for video in videos]
+        # sorted is stable, so equal sizes keep the order of the batch
+        schedule = sorted(
+            range(len(videos)),
+            key=lambda i: (sizes[i] is None, (sizes[i] or 0) * (-1 if order == 'largest-first' else 1)))
+        ydl.to_screen('[schedule] Downloading %d videos, %s, %s estimated' % (
+            len(videos), order.replace('-', ' '),
+            format_bytes(sum(size for size in sizes if size))))
+
+        throughput = _Throughput(ydl.params.get('ratelimit'))
+        with ydl._download_job(progress_hooks=[throughput.progress_hook]):
+            for i in schedule:
+                video, size = videos[i], sizes[i]
+                if deadline is not None:
+                    left = deadline - time.time()
+                    rate = throughput.rate
+                    eta = size / float(rate) if size is not None and rate else None
+                    if left <= 0 or (eta is not None and eta > left):
+                        ydl.to_screen(
+                            '[schedule] %s: Skipping, %s would take %s with %s left' % (
+                                video.get('id'), format_bytes(size),
+                                formatSeconds(int(eta)) if eta is not None else 'unknown time',
+                                formatSeconds(max(int(left), 0))))
+                        continue
+                start = time.time()
+                throughput.transferred = 0
+                _download_video(ydl, video)
+                throughput.add(throughput.transferred, time.time() - start)
+    return job['retcode']
+
+
+def _download_video(ydl, info_dict):
+    try:
+        ydl.process_ie_result(ydl.filter_requested_info(info_dict), download=True)
+    except DownloadError:
+        # The media URLs may have expired since the metadata was extracted
+        webpage_url = info_dict.get('webpage_url')
+        if webpage_url is None:
+            raise
+        ydl.report_warning('The info failed to download, trying with "%s"' % webpage_url)
+        ydl.download([webpage_url])
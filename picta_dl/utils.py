@@ -5,6 +5,7 @@ from __future__ import unicode_literals
 
 import base64
 import binascii
+import bisect
 import calendar
 import codecs
 import collections
@@ -31,6 +32,7 @@ import ssl
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 import traceback
 import xml.etree.ElementTree
@@ -1792,8 +1794,9 @@ def preferredencoding():
     return pref
 
 
-def write_json_file(obj, fn):
-    """ Encode obj as JSON and write it to fn, atomically if possible """
+def write_json_file(obj, fn, private=False):
+    """ Encode obj as JSON and write it to fn, atomically if possible.
+    With private, only the owner may read the file (mode 0600). """
 
     fn = encodeFilename(fn)
     if sys.version_info < (3, 0) and sys.platform != 'win32':
@@ -1829,7 +1832,7 @@ def write_json_file(obj, fn):
 
     try:
         with tf:
-            json.dump(obj, tf)
+            json.dump(obj, tf, default=json_default)
         if sys.platform == 'win32':
             # Need to remove existing file on Windows, else os.rename raises
             # WindowsError or FileExistsError.
@@ -1837,12 +1840,14 @@ def write_json_file(obj, fn):
                 os.unlink(fn)
             except OSError:
                 pass
-        try:
-            mask = os.umask(0)
-            os.umask(mask)
-            os.chmod(tf.name, 0o666 & ~mask)
-        except OSError:
-            pass
+        # The temporary file is created with mode 0600
+        if not private:
+            try:
+                mask = os.umask(0)
+                os.umask(mask)
+                os.chmod(tf.name, 0o666 & ~mask)
+            except OSError:
+                pass
         os.rename(tf.name, fn)
     except Exception:
         try:
@@ -2076,32 +2081,57 @@ def timeconvert(timestr):
     return timestamp
 
 
+def _replace_insane_char(char, restricted):
+    if restricted and char in ACCENT_CHARS:
+        return ACCENT_CHARS[char]
+    if char == '?' or ord(char) < 32 or ord(char) == 127:
+        return ''
+    elif char == '"':
+        return '' if restricted else '\''
+    elif char == ':':
+        return '_-' if restricted else ' -'
+    elif char in '\\/|*<>':
+        return '_'
+    if restricted and (char in '!&\'()[]{}$;`^,#' or char.isspace()):
+        return '_'
+    if restricted and ord(char) > 127:
+        return '_'
+    return char
+
+
+class _SanitizeTable(dict):
+    """Translation table for unicode.translate replacing the characters
+    that can't be used in filenames, filled in as characters are met"""
+
+    def __init__(self, restricted):
+        self.restricted = restricted
+
+    def __missing__(self, code):
+        self[code] = _replace_insane_char(compat_chr(code), self.restricted)
+        return self[code]
+
+
+_SANITIZE_TABLES = {
+    False: _SanitizeTable(False),
+    True: _SanitizeTable(True),
+}
+
+_TIMESTAMP_RE = re.compile(r'[0-9]+(?::[0-9]+)+')
+
+
 def sanitize_filename(s, restricted=False, is_id=False):
     """Sanitizes a string so it could be used as part of a filename.
     If restricted is set, use a stricter subset of allowed characters.
     Set is_id if this is not an arbitrary string, but an ID that should be kept
     if possible.
     """
-    def replace_insane(char):
-        if restricted and char in ACCENT_CHARS:
-            return ACCENT_CHARS[char]
-        if char == '?' or ord(char) < 32 or ord(char) == 127:
-            return ''
-        elif char == '"':
-            return '' if restricted else '\''
-        elif char == ':':
-            return '_-' if restricted else ' -'
-        elif char in '\\/|*<>':
-            return '_'
-        if restricted and (char in '!&\'()[]{}$;`^,#' or char.isspace()):
-            return '_'
-        if restricted and ord(char) > 127:
-            return '_'
-        return char
-
     # Handle timestamps
-    s = re.sub(r'[0-9]+(?::[0-9]+)+', lambda m: m.group(0).replace(':', '_'), s)
-    result = ''.join(map(replace_insane, s))
+    if ':' in s:
+        s = _TIMESTAMP_RE.sub(lambda m: m.group(0).replace(':', '_'), s)
+    if isinstance(s, compat_str):
+        result = s.translate(_SANITIZE_TABLES[bool(restricted)])
+    else:
+        result = ''.join(_replace_insane_char(char, restricted) for char in s)
     if not is_id:
         while '__' in result:
             result = result.replace('__', '_')
@@ -2384,6 +2414,18 @@ class GeoRestrictedError(ExtractorError):
         self.countries = countries
 
 
+class VideoNotFoundError(ExtractorError):
+    """The video doesn't exist: it was deleted or it is private"""
+    def __init__(self, msg, video_id=None):
+        super(VideoNotFoundError, self).__init__(msg, expected=True, video_id=video_id)
+
+
+class LoginRequiredError(ExtractorError):
+    """The video is only available for registered users"""
+    def __init__(self, msg):
+        super(LoginRequiredError, self).__init__(msg, expected=True)
+
+
 class DownloadError(YoutubeDLError):
     """Download Error exception.
 
@@ -2424,6 +2466,19 @@ class MaxDownloadsReached(YoutubeDLError):
     pass
 
 
+class DownloadCancelled(YoutubeDLError):
+    """ The download was cancelled by its caller. """
+    pass
+
+
+class CircuitOpenError(YoutubeDLError):
+    """ The requests to a host that keeps failing are suspended. """
+    def __init__(self, host, cooldown):
+        super(CircuitOpenError, self).__init__(
+            '%s keeps failing, its requests are suspended for %d seconds' % (host, cooldown))
+        self.host = host
+
+
 class UnavailableVideoError(YoutubeDLError):
     """Unavailable Format exception.
 
@@ -2752,6 +2807,12 @@ class YoutubeDLCookieJar(compat_cookiejar.MozillaCookieJar):
         'CookieFileEntry',
         ('domain_name', 'include_subdomains', 'path', 'https_only', 'expires_at', 'name', 'value'))
 
+    def __iter__(self):
+        # Iterate over a copy, so that other threads can set cookies
+        # meanwhile
+        with self._cookies_lock:
+            return iter(list(compat_cookiejar.MozillaCookieJar.__iter__(self)))
+
     def save(self, filename=None, ignore_discard=False, ignore_expires=False):
         """
         Save cookies to a file.
@@ -3275,12 +3336,12 @@ else:
 
 class locked_file(object):
     def __init__(self, filename, mode, encoding=None):
-        assert mode in ['r', 'a', 'w']
+        assert mode in ['r', 'rb', 'a', 'w']
         self.f = io.open(filename, mode, encoding=encoding)
         self.mode = mode
 
     def __enter__(self):
-        exclusive = self.mode != 'r'
+        exclusive = self.mode not in ('r', 'rb')
         try:
             _lock_file(self.f, exclusive)
         except IOError:
@@ -3843,6 +3904,194 @@ class InAdvancePagedList(PagedList):
         return res
 
 
+class FragmentList(object):
+    """
+    The fragments of a DASH format (the fragments field of the formats), in
+    the compact form of the manifest. The fragment dicts are only built when
+    they are accessed, so the formats that are never downloaded don't hold
+    a dict and a URL for each of their fragments.
+
+    media is either the segment template, formatted with the Number, Time
+    and Bandwidth of each fragment, or the list of the segment URLs.
+    timeline is the list of the (t, d, r) entries of the SegmentTimeline,
+    in timescale units. Without a timeline there are count fragments of
+    duration seconds each. initialization is the URL of the initialization
+    fragment, if any.
+
+    A FragmentList is a read-only sequence of fragment dicts. It compares
+    equal to the list of its fragments, and json_default serializes it as
+    that list.
+    """
+
+    _URL_RE = re.compile(r'^https?://')
+
+    def __init__(self, media, start_number=1, bandwidth=None, timeline=None,
+                 timescale=1, count=None, duration=None, initialization=None):
+        self._media = media
+        self._start_number = start_number
+        self._bandwidth = bandwidth
+        self._timescale = timescale
+        self._duration = duration
+        self._initialization = initialization
+        self._is_template = isinstance(media, compat_str)
+        if self._is_template:
+            self._media_key = self._location_key(media)
+        # The first index, time and duration of each run of fragments
+        # of the same duration
+        self._run_starts = []
+        self._run_times = []
+        self._run_durations = []
+        if timeline is not None:
+            count = 0
+            segment_time = 0
+            for t, d, r in timeline:
+                segment_time = t or segment_time
+                # Entries continuing the previous run, with the same
+                # duration and no gap, are merged into it
+                if not (self._run_durations and d == self._run_durations[-1]
+                        and segment_time == self._run_times[-1] + (count - self._run_starts[-1]) * d):
+                    self._run_starts.append(count)
+                    self._run_times.append(segment_time)
+                    self._run_durations.append(d)
+                # A negative repeat count (until the next entry) is
+                # taken as no repeat
+                r = max(r, 0)
+                count += r + 1
+                segment_time += (r + 1) * d
+        if not self._is_template:
+            # There can't be more fragments than segment URLs
+            count = len(media) if count is None else min(count, len(media))
+        self._count = count
+        self._first = 1 if initialization else 0
+
+    @classmethod
+    def _location_key(cls, location):
+        return 'url' if cls._URL_RE.match(location) else 'path'
+
+    def _fragment(self, index):
+        if index < self._first:
+            return {self._location_key(self._initialization): self._initialization}
+        index -= self._first
+        segment_time = None
+        if self._run_starts:
+            run = bisect.bisect_right(self._run_starts, index) - 1
+            d = self._run_durations[run]
+            segment_time = self._run_times[run] + (index - self._run_starts[run]) * d
+            duration = float_or_none(d, self._timescale)
+        else:
+            duration = self._duration
+        if self._is_template:
+            return {
+                self._media_key: self._media % {
+                    'Time': segment_time,
+                    'Bandwidth': self._bandwidth,
+                    'Number': self._start_number + index,
+                },
+                'duration': duration,
+            }
+        segment_url = self._media[index]
+        fragment = {self._location_key(segment_url): segment_url}
+        # The segment URLs without a timeline only have a duration if the
+        # manifest gives one
+        if self._run_starts or duration:
+            fragment['duration'] = duration
+        return fragment
+
+    def __len__(self):
+        return self._first + self._count
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._fragment(i) for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError('fragment index out of range')
+        return self._fragment(idx)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._fragment(i)
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, FragmentList)):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == list(other)
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
+
+    # Read-only, so copies can share it
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def json_default(obj):
+    """ The default function of json.dump(s) for info dicts, which may hold
+    FragmentLists """
+    if isinstance(obj, FragmentList):
+        return list(obj)
+    raise TypeError('%r is not JSON serializable' % (obj, ))
+
+
+def run_concurrently(funcs, max_workers=None):
+    """
+    Call every function in funcs in a pool of threads and return the list of
+    their results, in the same order as funcs. If any call raised, the first
+    exception (in funcs order) is re-raised once all of them have finished.
+    """
+    funcs = list(funcs)
+    if not funcs:
+        return []
+    if max_workers is None:
+        max_workers = len(funcs)
+    results = [None] * len(funcs)
+    errors = [None] * len(funcs)
+    if max_workers <= 1 or len(funcs) == 1:
+        for i, func in enumerate(funcs):
+            try:
+                results[i] = func()
+            except Exception as e:
+                errors[i] = e
+    else:
+        jobs = iter(enumerate(funcs))
+        jobs_lock = threading.Lock()
+
+        def worker():
+            while True:
+                with jobs_lock:
+                    try:
+                        i, func = next(jobs)
+                    except StopIteration:
+                        return
+                try:
+                    results[i] = func()
+                except Exception as e:
+                    errors[i] = e
+
+        threads = [
+            threading.Thread(target=worker)
+            for _ in range(min(max_workers, len(funcs)))]
+        for t in threads:
+            t.daemon = True
+            t.start()
+        for t in threads:
+            t.join()
+    for e in errors:
+        if e is not None:
+            raise e
+    return results
+
+
 def uppercase_escape(s):
     unicode_escape = codecs.getdecoder('unicode_escape')
     return re.sub(
@@ -3878,7 +4127,8 @@ def escape_url(url):
     ).geturl()
 
 
-def read_batch_urls(batch_fd):
+def iter_batch_urls(batch_fd):
+    """Generate the URLs of a batch file as they are read, then close it"""
     def fixup(url):
         if not isinstance(url, compat_str):
             url = url.decode('utf-8', 'replace')
@@ -3891,7 +4141,14 @@ def read_batch_urls(batch_fd):
         return url
 
     with contextlib.closing(batch_fd) as fd:
-        return [url for url in map(fixup, fd) if url]
+        for line in fd:
+            url = fixup(line)
+            if url:
+                yield url
+
+
+def read_batch_urls(batch_fd):
+    return list(iter_batch_urls(batch_fd))
 
 
 def urlencode_postdata(*args, **kargs):
@@ -4312,86 +4569,151 @@ def render_table(header_row, data):
     return '\n'.join(format_str % tuple(row) for row in table)
 
 
-def _match_one(filter_part, dct):
-    COMPARISON_OPERATORS = {
-        '<': operator.lt,
-        '<=': operator.le,
-        '>': operator.gt,
-        '>=': operator.ge,
-        '=': operator.eq,
-        '!=': operator.ne,
-    }
-    operator_rex = re.compile(r'''(?x)\s*
-        (?P<key>[a-z_]+)
-        \s*(?P<op>%s)(?P<none_inclusive>\s*\?)?\s*
-        (?:
-            (?P<intval>[0-9.]+(?:[kKmMgGtTpPeEzZyY]i?[Bb]?)?)|
-            (?P<quote>["\'])(?P<quotedstrval>(?:\\.|(?!(?P=quote)|\\).)+?)(?P=quote)|
-            (?P<strval>(?![0-9.])[a-z0-9A-Z]*)
-        )
-        \s*$
-        ''' % '|'.join(map(re.escape, COMPARISON_OPERATORS.keys())))
-    m = operator_rex.search(filter_part)
+_MATCH_COMPARISON_OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '=': operator.eq,
+    '!=': operator.ne,
+}
+
+_MATCH_COMPARISON_RE = re.compile(r'''(?x)\s*
+    (?P<key>[a-z_]+)
+    \s*(?P<op>%s)(?P<none_inclusive>\s*\?)?\s*
+    (?:
+        (?P<intval>[0-9.]+(?:[kKmMgGtTpPeEzZyY]i?[Bb]?)?)|
+        (?P<quote>["\'])(?P<quotedstrval>(?:\\.|(?!(?P=quote)|\\).)+?)(?P=quote)|
+        (?P<strval>(?![0-9.])[a-z0-9A-Z]*)
+    )
+    \s*$
+    ''' % '|'.join(map(re.escape, _MATCH_COMPARISON_OPERATORS.keys())))
+
+_MATCH_UNARY_OPERATORS = {
+    '': lambda v: (v is True) if isinstance(v, bool) else (v is not None),
+    '!': lambda v: (v is False) if isinstance(v, bool) else (v is None),
+}
+
+_MATCH_UNARY_RE = re.compile(r'''(?x)\s*
+    (?P<op>%s)\s*(?P<key>[a-z_]+)
+    \s*$
+    ''' % '|'.join(map(re.escape, _MATCH_UNARY_OPERATORS.keys())))
+
+
+def _compile_match_one(filter_part):
+    """ Parse a part of a match_str filter into a function of (dct, incomplete) """
+    m = _MATCH_COMPARISON_RE.search(filter_part)
     if m:
-        op = COMPARISON_OPERATORS[m.group('op')]
-        actual_value = dct.get(m.group('key'))
-        if (m.group('quotedstrval') is not None
-            or m.group('strval') is not None
-            # If the original field is a string and matching comparisonvalue is
-            # a number we should respect the origin of the original field
-            # and process comparison value as a string (see
-            # https://github.com/ytdl-org/youtube-dl/issues/11082).
-            or actual_value is not None and m.group('intval') is not None
-                and isinstance(actual_value, compat_str)):
-            if m.group('op') not in ('=', '!='):
+        key = m.group('key')
+        op_str = m.group('op')
+        op = _MATCH_COMPARISON_OPERATORS[op_str]
+        none_inclusive = m.group('none_inclusive')
+        intval = m.group('intval')
+        if m.group('quotedstrval') is not None or m.group('strval') is not None:
+            if op_str not in ('=', '!='):
                 raise ValueError(
-                    'Operator %s does not support string values!' % m.group('op'))
-            comparison_value = m.group('quotedstrval') or m.group('strval') or m.group('intval')
+                    'Operator %s does not support string values!' % op_str)
+            comparison_value = m.group('quotedstrval') or m.group('strval') or intval
             quote = m.group('quote')
             if quote is not None:
                 comparison_value = comparison_value.replace(r'\%s' % quote, quote)
-        else:
-            try:
-                comparison_value = int(m.group('intval'))
-            except ValueError:
-                comparison_value = parse_filesize(m.group('intval'))
-                if comparison_value is None:
-                    comparison_value = parse_filesize(m.group('intval') + 'B')
-                if comparison_value is None:
+
+            def _match(dct, incomplete):
+                actual_value = dct.get(key)
+                if actual_value is None:
+                    return incomplete or none_inclusive
+                return op(actual_value, comparison_value)
+            return _match
+
+        try:
+            int_value = int(intval)
+        except ValueError:
+            int_value = parse_filesize(intval)
+            if int_value is None:
+                int_value = parse_filesize(intval + 'B')
+        # With = and != a value like 1.2.3 may still be compared to
+        # string fields
+        if int_value is None and op_str not in ('=', '!='):
+            raise ValueError(
+                'Invalid integer value %r in filter part %r' % (intval, filter_part))
+
+        def _match(dct, incomplete):
+            actual_value = dct.get(key)
+            if actual_value is None:
+                if int_value is None:
                     raise ValueError(
-                        'Invalid integer value %r in filter part %r' % (
-                            m.group('intval'), filter_part))
-        if actual_value is None:
-            return m.group('none_inclusive')
-        return op(actual_value, comparison_value)
-
-    UNARY_OPERATORS = {
-        '': lambda v: (v is True) if isinstance(v, bool) else (v is not None),
-        '!': lambda v: (v is False) if isinstance(v, bool) else (v is None),
-    }
-    operator_rex = re.compile(r'''(?x)\s*
-        (?P<op>%s)\s*(?P<key>[a-z_]+)
-        \s*$
-        ''' % '|'.join(map(re.escape, UNARY_OPERATORS.keys())))
-    m = operator_rex.search(filter_part)
+                        'Invalid integer value %r in filter part %r' % (intval, filter_part))
+                return incomplete or none_inclusive
+            # If the original field is a string and matching comparisonvalue is
+            # a number we should respect the origin of the original field
+            # and process comparison value as a string (see
+            # https://github.com/ytdl-org/youtube-dl/issues/11082).
+            if isinstance(actual_value, compat_str):
+                if op_str not in ('=', '!='):
+                    raise ValueError(
+                        'Operator %s does not support string values!' % op_str)
+                return op(actual_value, intval)
+            if int_value is None:
+                raise ValueError(
+                    'Invalid integer value %r in filter part %r' % (intval, filter_part))
+            return op(actual_value, int_value)
+        return _match
+
+    m = _MATCH_UNARY_RE.search(filter_part)
     if m:
-        op = UNARY_OPERATORS[m.group('op')]
-        actual_value = dct.get(m.group('key'))
-        return op(actual_value)
+        key = m.group('key')
+        op = _MATCH_UNARY_OPERATORS[m.group('op')]
+
+        def _match(dct, incomplete):
+            actual_value = dct.get(key)
+            if incomplete and actual_value is None:
+                return True
+            return op(actual_value)
+        return _match
 
     raise ValueError('Invalid filter part %r' % filter_part)
 
 
-def match_str(filter_str, dct):
-    """ Filter a dictionary with a simple string syntax. Returns True (=passes filter) or false """
+# The parts of the filters compiled last, the most recently used last
+_MATCH_FILTERS = collections.OrderedDict()
+_MATCH_FILTERS_SIZE = 32
+_MATCH_FILTERS_LOCK = threading.Lock()
 
-    return all(
-        _match_one(filter_part, dct) for filter_part in filter_str.split('&'))
+
+def compile_match_filter(filter_str):
+    """ Parse filter_str once into a function of (dct, incomplete=False)
+    returning whether dct passes the filter, see match_str. Raises
+    ValueError if filter_str is invalid """
+    with _MATCH_FILTERS_LOCK:
+        matches = _MATCH_FILTERS.pop(filter_str, None)
+    if matches is None:
+        matches = tuple(
+            _compile_match_one(filter_part) for filter_part in filter_str.split('&'))
+    with _MATCH_FILTERS_LOCK:
+        _MATCH_FILTERS[filter_str] = matches
+        while len(_MATCH_FILTERS) > _MATCH_FILTERS_SIZE:
+            _MATCH_FILTERS.popitem(last=False)
+
+    def _match_filter(dct, incomplete=False):
+        for match in matches:
+            if not match(dct, incomplete):
+                return False
+        return True
+    return _match_filter
+
+
+def match_str(filter_str, dct, incomplete=False):
+    """ Filter a dictionary with a simple string syntax. Returns True (=passes filter) or false
+    When incomplete, fields missing from dct are assumed to pass the filter """
+
+    return compile_match_filter(filter_str)(dct, incomplete)
 
 
 def match_filter_func(filter_str):
-    def _match_func(info_dict):
-        if match_str(filter_str, info_dict):
+    match = compile_match_filter(filter_str)
+
+    def _match_func(info_dict, incomplete=False):
+        if match(info_dict, incomplete):
             return None
         else:
             video_title = info_dict.get('title', info_dict.get('id', 'video'))
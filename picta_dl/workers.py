@@ -0,0 +1,349 @@
+from __future__ import unicode_literals
+
+import errno
+import hashlib
+import itertools
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import traceback
+
+from .compat import (
+    compat_queue,
+    compat_str,
+)
+from .jobqueue import (
+    download_from_queue,
+    JobQueue,
+)
+from .utils import (
+    DEFAULT_OUTTMPL,
+    DownloadError,
+    format_bytes,
+    locked_file,
+    SameFileError,
+)
+
+
+class DownloadClaims(object):
+    """Coordinates the processes downloading a batch through files in a
+    directory they share: a video is only downloaded by the process that
+    claims it first, and an output file is only written by one process at a
+    time."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, kind, key):
+        return os.path.join(
+            self.directory, '%s-%s' % (kind, hashlib.md5(key.encode('utf-8')).hexdigest()))
+
+    def claim(self, vid_id):
+        """Return True if vid_id (an archive ID) was not claimed before"""
+        try:
+            os.close(os.open(self._path('video', vid_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except OSError as err:
+            if err.errno == errno.EEXIST:
+                return False
+            raise
+        return True
+
+    def release(self, vid_id):
+        """Let vid_id be claimed again, e.g. to download it again after a
+        failure"""
+        try:
+            os.remove(self._path('video', vid_id))
+        except OSError as err:
+            if err.errno != errno.ENOENT:
+                raise
+
+    def lock_output(self, filename):
+        """Exclusive lock of the output file filename, a context manager"""
+        return locked_file(
+            self._path('output', os.path.abspath(filename)), 'a', encoding='utf-8')
+
+
+class _EventWriter(object):
+    """File-like object sending what the worker prints to the parent"""
+
+    def __init__(self, events, worker_id, stream, isatty):
+        self._events = events
+        self._worker_id = worker_id
+        self._stream = stream
+        self._isatty = isatty
+
+    def write(self, s):
+        if isinstance(s, bytes):
+            s = s.decode('utf-8', 'replace')
+        self._events.put(('output', self._worker_id, self._stream, s))
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return self._isatty
+
+
+# Fields of the progress statuses sent to the parent
+_PROGRESS_KEYS = (
+    'status', 'filename', 'downloaded_bytes', 'total_bytes',
+    'total_bytes_estimate', 'speed')
+# Minimum interval between two progress statuses of a worker, unless the
+# status or the file changes
+_PROGRESS_INTERVAL = 0.5
+
+
+class _ProgressSender(object):
+    """Progress hook of a worker, sending the statuses to the parent at
+    most every _PROGRESS_INTERVAL seconds"""
+
+    def __init__(self, events, worker_id, clock=time.time):
+        self._events = events
+        self._worker_id = worker_id
+        self._clock = clock
+        self._last = None
+        self._last_time = 0
+
+    def __call__(self, status):
+        now = self._clock()
+        key = (status.get('status'), status.get('filename'))
+        if key == self._last and now - self._last_time < _PROGRESS_INTERVAL:
+            return
+        self._last = key
+        self._last_time = now
+        self._events.put(('progress', self._worker_id, dict(
+            (k, status.get(k)) for k in _PROGRESS_KEYS)))
+
+
+def _run_worker(ydl, worker_id, tasks, events, abort, claims_dir, job_queue=None):
+    """Download the URLs or the info dicts of tasks, or the URLs of the
+    JobQueue file job_queue, with ydl, a forked copy of the parent's
+    YoutubeDL"""
+    # The connection to an SQLite archive can't be shared with the parent
+    ydl._download_archive = None
+    ydl.params.update({
+        'noprogress': True,
+        'consoletitle': False,
+        # The output of the workers is interleaved
+        'buffer_json': True,
+    })
+    if job_queue is None:
+        # The jobs of a JobQueue are already claimed by a single process,
+        # and a failed job must be downloaded again when it is retried
+        ydl.params['download_claims'] = DownloadClaims(claims_dir)
+    ydl._screen_file = _EventWriter(events, worker_id, 'stdout', ydl._screen_file.isatty())
+    ydl._err_file = _EventWriter(events, worker_id, 'stderr', ydl._err_file.isatty())
+
+    ydl.add_progress_hook(_ProgressSender(events, worker_id))
+
+    try:
+        if job_queue is not None:
+            _consume_job_queue(ydl, worker_id, events, abort, job_queue)
+            return
+        for task in iter(tasks.get, None):
+            if abort.is_set():
+                continue
+            url = task.get('webpage_url') if isinstance(task, dict) else task
+            try:
+                if isinstance(task, dict):
+                    retcode = ydl.download_with_info(task)
+                else:
+                    retcode = ydl.download([task])
+            except DownloadError:
+                # Without --ignore-errors the first error stops the batch
+                retcode = 1
+                abort.set()
+            except Exception:
+                ydl._err_file.write(traceback.format_exc())
+                retcode = 1
+                abort.set()
+            events.put(('done', worker_id, url, retcode))
+    except KeyboardInterrupt:
+        abort.set()
+    finally:
+        if ydl._download_archive is not None:
+            ydl._download_archive.close()
+        events.put(('exit', worker_id))
+
+
+def _consume_job_queue(ydl, worker_id, events, abort, job_queue):
+    # Each process needs its own connection to the database
+    queue = JobQueue(job_queue.filename, job_queue.retries)
+    try:
+        download_from_queue(
+            ydl, queue, abort,
+            lambda url, retcode: events.put(('done', worker_id, url, retcode)))
+    except DownloadError:
+        abort.set()
+    except Exception:
+        ydl._err_file.write(traceback.format_exc())
+        events.put(('done', worker_id, None, 1))
+        abort.set()
+    finally:
+        queue.close()
+
+
+class _ProgressLine(object):
+    """The aggregated progress of the workers, shown on a terminal"""
+
+    _INTERVAL = 0.5
+
+    def __init__(self, ydl, total=None):
+        self._ydl = ydl
+        self._out = ydl._screen_file
+        self.enabled = (
+            not ydl.params.get('quiet') and not ydl.params.get('noprogress')
+            and self._out.isatty())
+        self.total = total
+        self.done = 0
+        self._statuses = {}
+        self._shown = False
+        self._last = 0
+
+    def update(self, worker_id, status):
+        if status['status'] == 'downloading':
+            self._statuses[worker_id] = status
+        else:
+            self._statuses.pop(worker_id, None)
+
+    def clear(self):
+        if self._shown:
+            self._ydl._write_string('\r\033[K', self._out)
+            self._shown = False
+
+    def show(self, force=False):
+        if not self.enabled or (not force and time.time() - self._last < self._INTERVAL):
+            return
+        self._last = time.time()
+        speed = sum(s.get('speed') or 0 for s in self._statuses.values())
+        downloaded = sum(s.get('downloaded_bytes') or 0 for s in self._statuses.values())
+        done = '%d of %d' % (self.done, self.total) if self.total is not None else '%d' % self.done
+        self._ydl._write_string(
+            '\r\033[K[workers] %s URLs done, %d downloading, %s at %s/s' % (
+                done, len(self._statuses),
+                format_bytes(downloaded), format_bytes(speed)), self._out)
+        self._shown = True
+
+
+def _fork_context():
+    if not hasattr(multiprocessing, 'get_context'):
+        # Python 2 always forks on POSIX systems
+        return multiprocessing if os.name == 'posix' else None
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context('fork')
+
+
+def download_with_workers(ydl, url_list, workers, job_queue=None):
+    """Download url_list in workers processes, forked from this one so that
+    they share the options, extractors and opener of ydl. Return the
+    aggregated return code. The items of url_list may also be info dicts
+    loaded from JSON, downloaded with YoutubeDL.download_with_info.
+
+    url_list may be any iterable, a generator is only consumed as the
+    workers need new items.
+
+    If job_queue (a JobQueue) is given, url_list is ignored and the workers
+    consume the pending jobs of the queue instead."""
+    ctx = _fork_context()
+    if ctx is None:
+        raise ValueError('worker processes are not supported on this platform')
+    if job_queue is not None:
+        total = job_queue.counts().get(JobQueue.PENDING, 0)
+        # SQLite connections must not be used across a fork
+        job_queue.close()
+        pending = iter(())
+        workers = min(workers, total)
+    else:
+        total = len(url_list) if hasattr(url_list, '__len__') else None
+        pending = iter(url_list)
+        # The first items of each worker, only the rest is consumed lazily
+        first = list(itertools.islice(pending, workers))
+        if len(first) < workers:
+            total = len(first)
+        workers = min(workers, len(first))
+    outtmpl = ydl.params.get('outtmpl', DEFAULT_OUTTMPL)
+    if (total is None or total > 1) and outtmpl != '-' and '%' not in outtmpl:
+        raise SameFileError(outtmpl)
+
+    tasks = ctx.Queue()
+    events = ctx.Queue()
+    abort = ctx.Event()
+
+    claims_dir = tempfile.mkdtemp(prefix='picta-dl-workers-')
+    progress = _ProgressLine(ydl, total)
+    retcode = 0
+    outputs = {'stdout': ydl._screen_file, 'stderr': ydl._err_file}
+    processes = {}
+    fed = [job_queue is not None]
+
+    def feed():
+        # One new task for each task done, the workers stop at the end
+        if fed[0]:
+            return
+        task = None if abort.is_set() else next(pending, None)
+        if task is not None:
+            tasks.put(task)
+            return
+        fed[0] = True
+        for _ in range(workers):
+            tasks.put(None)
+
+    try:
+        for worker_id in range(workers):
+            process = ctx.Process(
+                target=_run_worker,
+                args=(ydl, worker_id, tasks, events, abort, claims_dir, job_queue))
+            process.daemon = True
+            process.start()
+            processes[worker_id] = process
+        if job_queue is None:
+            # Only fed now, the queue starts a thread that must not be forked
+            for task in first:
+                tasks.put(task)
+
+        running = set(processes)
+        while running:
+            try:
+                event = events.get(timeout=1)
+            except compat_queue.Empty:
+                for worker_id in list(running):
+                    if not processes[worker_id].is_alive():
+                        ydl.report_warning(
+                            'worker %d exited unexpectedly' % worker_id)
+                        running.discard(worker_id)
+                        retcode = 1
+                progress.show()
+                continue
+            kind, worker_id = event[:2]
+            if kind == 'output':
+                progress.clear()
+                ydl._write_string(compat_str(event[3]), outputs[event[2]])
+            elif kind == 'progress':
+                progress.update(worker_id, event[2])
+            elif kind == 'done':
+                progress.done += 1
+                retcode = max(retcode, event[3])
+                feed()
+            elif kind == 'exit':
+                running.discard(worker_id)
+            progress.show(force=kind == 'done')
+        progress.clear()
+    except KeyboardInterrupt:
+        abort.set()
+        raise
+    finally:
+        if not fed[0]:
+            # Reading url_list failed, stop the workers
+            abort.set()
+            fed[0] = True
+            for _ in range(workers):
+                tasks.put(None)
+        for process in processes.values():
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+        shutil.rmtree(claims_dir, ignore_errors=True)
+    return retcode
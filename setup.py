@@ -18,6 +18,11 @@ except ImportError:
     setuptools_available = False
 from distutils.spawn import spawn
 
+try:
+    from setuptools.command.build_py import build_py
+except ImportError:
+    from distutils.command.build_py import build_py
+
 # Get the version from picta_dl/version.py without importing the package
 exec(compile(open("picta_dl/version.py").read(), "picta_dl/version.py", "exec"))
 
@@ -195,7 +200,31 @@ class build_lazy_extractors(Command):
         )
 
 
-cmdclass = {"build_lazy_extractors": build_lazy_extractors}
+class build_py_lazy_extractors(build_py):
+    """Build the package along with its extractor lazy loading module"""
+
+    def run(self):
+        build_py.run(self)
+        script = "devscripts/make_lazy_extractors.py"
+        if not os.path.exists(script):
+            warnings.warn(
+                "Skipping the lazy extractors since %s is not present" % script
+            )
+            return
+        spawn(
+            [
+                sys.executable,
+                script,
+                os.path.join(self.build_lib, "picta_dl", "extractor", "lazy_extractors.py"),
+            ],
+            dry_run=self.dry_run,
+        )
+
+
+cmdclass = {
+    "build_lazy_extractors": build_lazy_extractors,
+    "build_py": build_py_lazy_extractors,
+}
 
 if make_executable:
     cmdclass.update(pyinstaller_cmd)
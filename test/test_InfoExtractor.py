@@ -5,7 +5,10 @@ from __future__ import unicode_literals
 # Allow direct execution
 import io
 import os
+import shutil
 import sys
+import tempfile
+import time
 import unittest
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -31,6 +34,25 @@ class InfoExtractorTestRequestHandler(compat_http_server.BaseHTTPRequestHandler)
             self.send_header('Content-Type', 'text/html; charset=utf-8')
             self.end_headers()
             self.wfile.write(TEAPOT_RESPONSE_BODY.encode())
+        elif self.path == '/forbidden':
+            self.send_response(403)
+            self.end_headers()
+        elif self.path.startswith('/manifest'):
+            self.server.manifest_requests.append(self.path)
+            etag = '"v1"' if self.path == '/manifest.mpd' else None
+            if etag and self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            with open('./test/testdata/mpd/urls_only.mpd', 'rb') as f:
+                content = f.read()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/dash+xml')
+            if etag:
+                self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
         else:
             assert False
 
@@ -1066,6 +1088,94 @@ jwplayer("mediaplayer").setup({"abouttext":"Visit Indie DB","aboutlink":"http:\/
             expected_status=TEAPOT_RESPONSE_STATUS)
         self.assertEqual(content, TEAPOT_RESPONSE_BODY)
 
+    def test_mpd_cache(self):
+        httpd = compat_http_server.HTTPServer(
+            ('127.0.0.1', 0), InfoExtractorTestRequestHandler)
+        httpd.manifest_requests = []
+        port = http_server_port(httpd)
+        server_thread = threading.Thread(target=httpd.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+
+        parsed = []
+        parse_mpd_formats = self.ie._parse_mpd_formats
+
+        def _parse_mpd_formats(*args, **kwargs):
+            parsed.append(args)
+            return parse_mpd_formats(*args, **kwargs)
+        self.ie._parse_mpd_formats = _parse_mpd_formats
+
+        try:
+            for path in ('/manifest.mpd', '/manifest-no-etag.mpd'):
+                url = 'http://127.0.0.1:%d%s' % (port, path)
+                formats = self.ie._extract_mpd_formats(url, None)
+                self.assertTrue(formats)
+                # Requested again, but parsed once
+                formats[0]['url'] = 'changed'
+                cached_formats = self.ie._extract_mpd_formats(url, None)
+                self.assertNotEqual(cached_formats[0]['url'], 'changed')
+                self.assertEqual(cached_formats[1:], formats[1:])
+                self.assertEqual(len(parsed), 1)
+                del parsed[:]
+            self.assertEqual(len(httpd.manifest_requests), 4)
+
+            # Only the last manifests are kept
+            self.ie._downloader._MPD_CACHE_SIZE = 2
+            for n in (1, 2, 1, 3, 1, 2):
+                self.ie._extract_mpd_formats(
+                    'http://127.0.0.1:%d/manifest-no-etag.mpd?video=%d' % (port, n), None)
+            self.assertEqual(len(parsed), 4)
+            self.assertEqual(len(self.ie._downloader._mpd_cache), 2)
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+
+    def test_login_session(self):
+        class SessionIE(InfoExtractor):
+            _NETRC_MACHINE = 'session'
+            _LOGIN_SESSION_DOMAINS = ('example.com', )
+
+        cachedir = tempfile.mkdtemp()
+        try:
+            ie = SessionIE(FakeYDL({'cachedir': cachedir}))
+            self.assertEqual(ie._load_login_session('user'), None)
+            ie._set_cookie('.example.com', 'sid', 'secret')
+            ie._set_cookie('.example.org', 'other', 'value')
+            ie._store_login_session('user', token='abc')
+
+            ie = SessionIE(FakeYDL({'cachedir': cachedir}))
+            session = ie._load_login_session('user')
+            self.assertEqual(session['token'], 'abc')
+            self.assertEqual(
+                [(c.domain, c.name, c.value) for c in ie._downloader.cookiejar],
+                [('.example.com', 'sid', 'secret')])
+            self.assertEqual(ie._load_login_session('another_user'), None)
+
+            # A session whose cookies have all expired is not used
+            expired = SessionIE(FakeYDL({'cachedir': cachedir}))
+            for username, cookies in (('expired_user', [{
+                    'name': 'sid', 'value': 'old', 'domain': '.example.com', 'expires': time.time() - 10,
+            }]), ('no_cookies_user', [])):
+                expired._downloader.cache.store_expiring(
+                    'login-sessions', expired._get_login_session_key(username), {'cookies': cookies}, 60)
+                self.assertEqual(expired._load_login_session(username), None)
+                self.assertEqual(expired._downloader.cache.load_expiring(
+                    'login-sessions', expired._get_login_session_key(username)), None)
+            self.assertEqual(list(expired._downloader.cookiejar), [])
+            self.assertEqual(expired._login_session_key, None)
+
+            httpd = compat_http_server.HTTPServer(
+                ('127.0.0.1', 0), InfoExtractorTestRequestHandler)
+            port = http_server_port(httpd)
+            server_thread = threading.Thread(target=httpd.serve_forever)
+            server_thread.daemon = True
+            server_thread.start()
+            ie._request_webpage(
+                'http://127.0.0.1:%d/forbidden' % port, None, fatal=False)
+            self.assertEqual(ie._load_login_session('user'), None)
+        finally:
+            shutil.rmtree(cachedir)
+
 
 if __name__ == '__main__':
     unittest.main()
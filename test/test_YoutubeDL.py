@@ -10,18 +10,41 @@ import unittest
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import copy
+import re
+import shutil
+import tempfile
+import threading
+import time
 
-from test.helper import FakeYDL, assertRegexpMatches
+from test.helper import FakeYDL, assertRegexpMatches, http_server_port
 from picta_dl import YoutubeDL
-from picta_dl.compat import compat_str, compat_urllib_error
+from picta_dl.compat import compat_http_server, compat_str, compat_urllib_error
 from picta_dl.extractor import YoutubeIE
 from picta_dl.extractor.common import InfoExtractor
 from picta_dl.postprocessor.common import PostProcessor
-from picta_dl.utils import ExtractorError, match_filter_func
+from picta_dl.utils import (
+    DownloadError,
+    ExtractorError,
+    match_filter_func,
+    MaxDownloadsReached,
+    smuggle_url,
+    VideoNotFoundError,
+)
 
 TEST_URL = 'http://localhost/sample.mp4'
 
 
+class FakeLogger(object):
+    def debug(self, msg):
+        pass
+
+    def warning(self, msg):
+        pass
+
+    def error(self, msg):
+        pass
+
+
 class YDL(FakeYDL):
     def __init__(self, *args, **kwargs):
         super(YDL, self).__init__(*args, **kwargs)
@@ -549,6 +572,21 @@ class TestFormatSelection(unittest.TestCase):
         self.assertEqual(ydl._default_format_spec({}, download=False), 'bestvideo+bestaudio/best')
         self.assertEqual(ydl._default_format_spec({'is_live': True}), 'best/bestvideo+bestaudio')
 
+    def test_format_selector_cache(self):
+        format_spec = 'bestvideo[height<=720][tbr<2000]+bestaudio/best'
+        ydl = YDL({'format': format_spec})
+        for i in range(3):
+            ydl.process_ie_result(_make_result([
+                {'format_id': 'v1080', 'ext': 'mp4', 'height': 1080, 'tbr': 3000, 'acodec': 'none', 'url': TEST_URL},
+                {'format_id': 'v720', 'ext': 'mp4', 'height': 720, 'tbr': 1500 + i, 'acodec': 'none', 'url': TEST_URL},
+                {'format_id': 'a', 'ext': 'm4a', 'vcodec': 'none', 'abr': 128, 'url': TEST_URL},
+            ]))
+        self.assertEqual(
+            [info['format_id'] for info in ydl.downloaded_info_dicts], ['v720+a'] * 3)
+        self.assertEqual(list(ydl._format_selectors), [format_spec])
+        self.assertEqual(sorted(ydl._format_filters), ['height<=720', 'tbr<2000'])
+        self.assertTrue(ydl.build_format_selector(format_spec) is ydl._format_selectors[format_spec])
+
 
 class TestYoutubeDL(unittest.TestCase):
     def test_subtitles(self):
@@ -657,6 +695,24 @@ class TestYoutubeDL(unittest.TestCase):
         self.assertEqual(fname('Hello %(title1)s'), 'Hello $PATH')
         self.assertEqual(fname('Hello %(title2)s'), 'Hello %PATH%')
 
+    def test_prepare_filename_compiled(self):
+        ydl = YoutubeDL({'outtmpl': '%(playlist_index)s-%(title)s-%(width)d.%(ext)s'})
+        info = {'id': '1', 'title': 'a/b', 'ext': 'mp4', 'playlist_index': 3, 'n_entries': 120}
+        self.assertEqual(ydl.prepare_filename(info), '003-a_b-NA.mp4')
+        info.update({'width': 640, 'n_entries': 5})
+        self.assertEqual(ydl.prepare_filename(info), '3-a_b-640.mp4')
+        # Padded to the size of 'NA' when n_entries is missing
+        del info['n_entries']
+        self.assertEqual(ydl.prepare_filename(info), '03-a_b-640.mp4')
+        # Not padded when the number of entries is unknown
+        info['n_entries'] = None
+        self.assertEqual(ydl.prepare_filename(info), '3-a_b-640.mp4')
+        # The template is compiled once
+        self.assertEqual(len(ydl._outtmpl_cache), 1)
+        ydl.params['outtmpl'] = '%(autonumber)s.%(ext)s'
+        self.assertEqual(ydl.prepare_filename(info), '00000.mp4')
+        self.assertEqual(len(ydl._outtmpl_cache), 2)
+
     def test_format_note(self):
         ydl = YoutubeDL()
         self.assertEqual(ydl._format_note({}), '')
@@ -801,6 +857,76 @@ class TestYoutubeDL(unittest.TestCase):
         res = get_videos(f)
         self.assertEqual(res, [])
 
+    def test_match_filter_incomplete_playlist_entries(self):
+        entries = [{
+            '_type': 'url',
+            'url': 'foo:%d' % i,
+            'ie_key': 'Foo',
+            'id': compat_str(i),
+            'title': 'title %d' % i,
+        } for i in range(1, 4)]
+        playlist = {
+            '_type': 'playlist',
+            'id': 'test',
+            'entries': entries,
+            'extractor': 'test:playlist',
+            'extractor_key': 'test:playlist',
+            'webpage_url': 'http://example.com',
+        }
+
+        def get_extracted_urls(params):
+            ydl = YDL(params)
+            extracted = []
+
+            def extract_info(url, *args, **kwargs):
+                extracted.append(url)
+            ydl.extract_info = extract_info
+            ydl.process_ie_result(copy.deepcopy(playlist))
+            return extracted
+
+        self.assertEqual(
+            get_extracted_urls({'match_filter': match_filter_func('title = "title 2"')}),
+            ['foo:2'])
+        # Fields missing from the playlist entries can't reject them early
+        self.assertEqual(
+            get_extracted_urls({'match_filter': match_filter_func('duration > 30')}),
+            ['foo:1', 'foo:2', 'foo:3'])
+        # Custom filters without incomplete support are only used later
+        self.assertEqual(
+            get_extracted_urls({'match_filter': lambda info_dict: 'rejected'}),
+            ['foo:1', 'foo:2', 'foo:3'])
+        self.assertEqual(
+            get_extracted_urls({'match_filter': lambda info_dict, **kwargs: (
+                None if info_dict['id'] == '3' else 'rejected')}),
+            ['foo:3'])
+
+        # The errors of the filters are not hidden
+        def broken_filter(info_dict, incomplete=False):
+            raise TypeError('broken filter')
+        self.assertRaises(
+            TypeError, get_extracted_urls, {'match_filter': broken_filter})
+
+    def test_extract_flat_smuggled_urls(self):
+        playlist = {
+            '_type': 'playlist',
+            'id': 'test',
+            'entries': [{
+                '_type': 'url',
+                'url': smuggle_url('http://example.com/%d' % i, {'in_playlist': True}),
+                'ie_key': 'Foo',
+                'id': compat_str(i),
+                'title': 'title %d' % i,
+            } for i in range(1, 3)],
+            'extractor': 'test:playlist',
+            'extractor_key': 'test:playlist',
+            'webpage_url': 'http://example.com',
+        }
+        ydl = YDL({'extract_flat': 'in_playlist'})
+        res = ydl.process_ie_result(copy.deepcopy(playlist), download=False)
+        self.assertEqual(
+            [entry['url'] for entry in res['entries']],
+            ['http://example.com/1', 'http://example.com/2'])
+
     def test_playlist_items_selection(self):
         entries = [{
             'id': compat_str(i),
@@ -872,6 +998,155 @@ class TestYoutubeDL(unittest.TestCase):
         self.assertEqual(result[1]['playlist_index'], 2)
         # @}
 
+    def test_stream_playlists(self):
+        events = []
+
+        def entries():
+            for i in range(1, 5):
+                events.append(('extracted', i))
+                yield {
+                    'id': compat_str(i),
+                    'title': compat_str(i),
+                    'url': TEST_URL,
+                }
+
+        def playlist_hook(d):
+            events.append((d['status'], d.get('playlist_index')))
+
+        ydl = YDL({
+            'stream_playlists': True,
+            'playliststart': 2,
+            'playlist_hooks': [playlist_hook],
+            'outtmpl': '%(playlist_index)s-%(id)s.%(ext)s',
+        })
+        res = ydl.process_ie_result({
+            '_type': 'playlist',
+            'id': 'test',
+            'entries': entries(),
+            'extractor': 'test:playlist',
+            'extractor_key': 'test:playlist',
+            'webpage_url': 'http://example.com',
+        })
+        # Each entry is processed before the next one is extracted, and
+        # isn't kept
+        self.assertEqual(events, [
+            ('started', None), ('extracted', 1), ('extracted', 2), ('entry', 2),
+            ('extracted', 3), ('entry', 3), ('extracted', 4), ('entry', 4),
+            ('finished', None)])
+        self.assertEqual(res['entries'], [])
+        self.assertEqual(
+            [ydl.prepare_filename(info) for info in ydl.downloaded_info_dicts],
+            ['2-2.mp4', '3-3.mp4', '4-4.mp4'])
+
+    def test_extraction_cache(self):
+        extracted = []
+
+        class CachedIE(InfoExtractor):
+            _VALID_URL = r'cached:(?P<id>\w+)'
+
+            def _real_extract(self, url):
+                video_id = self._match_id(url)
+                extracted.append(video_id)
+                if video_id == 'playlist':
+                    return self.playlist_result([self.url_result('cached:1')], video_id)
+                return {
+                    'id': video_id,
+                    'title': video_id,
+                    'url': TEST_URL,
+                    'ext': 'mp4',
+                    'fragments': [{'path': 'seg-1.m4s'}],
+                }
+
+        cachedir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cachedir, True)
+        ydl = YDL({'cachedir': cachedir, 'extraction_cache_ttl': 60})
+        ydl.add_info_extractor(CachedIE(ydl))
+        first = ydl.extract_info('cached:1')
+        self.assertEqual(ydl.extract_info('cached:1'), first)
+        self.assertEqual(extracted, ['1'])
+
+        # Playlists are extracted again, their videos come from the cache
+        ydl.extract_info('cached:playlist')
+        ydl.extract_info('cached:playlist')
+        self.assertEqual(extracted, ['1', 'playlist', 'playlist'])
+
+        ydl._uncache_extraction('cached:1')
+        ydl.extract_info('cached:1')
+        self.assertEqual(extracted, ['1', 'playlist', 'playlist', '1'])
+        self.assertEqual(ydl._extraction_cache_stats, {'hits': 3, 'misses': 4, 'stored': 2})
+
+        # Disabled by default
+        ydl = YDL({'cachedir': cachedir})
+        ydl.add_info_extractor(CachedIE(ydl))
+        ydl.extract_info('cached:1')
+        self.assertEqual(extracted, ['1', 'playlist', 'playlist', '1', '1'])
+
+        # The results depend on the smuggled data and on noplaylist
+        del extracted[:]
+        for params in ({}, {'noplaylist': True}):
+            ydl = YDL(dict({'cachedir': cachedir, 'extraction_cache_ttl': 60}, **params))
+            ydl.add_info_extractor(CachedIE(ydl))
+            ydl.extract_info(smuggle_url('cached:1', {'in_playlist': True}))
+            ydl.extract_info('cached:1')
+            ydl.extract_info(smuggle_url('cached:1', {'in_playlist': True}))
+        # 'cached:1' without noplaylist is cached since the start
+        self.assertEqual(extracted, ['1', '1', '1'])
+        ydl._uncache_extraction(smuggle_url('cached:1', {'in_playlist': True}))
+        ydl.extract_info('cached:1')
+        ydl.extract_info(smuggle_url('cached:1', {'in_playlist': True}))
+        self.assertEqual(extracted, ['1', '1', '1', '1'])
+
+    def test_failure_cache(self):
+        extracted = []
+
+        class FailingIE(InfoExtractor):
+            _VALID_URL = r'failing:(?P<id>\w+)'
+
+            def _real_extract(self, url):
+                video_id = self._match_id(url)
+                extracted.append(video_id)
+                if video_id == 'deleted':
+                    raise VideoNotFoundError('Cannot find video!', video_id)
+                if video_id == 'private':
+                    self.raise_login_required()
+                if video_id == 'missing':
+                    raise ExtractorError('HTTP Error 404', cause=compat_urllib_error.HTTPError(
+                        url, 404, 'Not Found', {}, None), expected=True)
+                raise ExtractorError('Unable to download JSON metadata', expected=True)
+
+        cachedir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cachedir, True)
+
+        def extract(video_id, **params):
+            ydl = YDL(dict({'cachedir': cachedir, 'failure_cache_ttl': 60}, **params))
+            ydl.add_info_extractor(FailingIE(ydl))
+            try:
+                ydl.extract_info('failing:%s' % video_id)
+            except Exception as err:
+                return compat_str(err)
+
+        for video_id in ('deleted', 'private', 'missing', 'flaky'):
+            self.assertFalse('remembered' in extract(video_id))
+        self.assertEqual(extracted, ['deleted', 'private', 'missing', 'flaky'])
+
+        # The permanent failures are skipped
+        del extracted[:]
+        self.assertTrue('deleted: Cannot find video! (remembered' in extract('deleted'))
+        for video_id in ('private', 'missing', 'flaky'):
+            extract(video_id)
+        self.assertEqual(extracted, ['flaky'])
+
+        # Unless the credentials are given
+        del extracted[:]
+        extract('private', username='user')
+        extract('missing', recheck_failed=True)
+        self.assertEqual(extracted, ['private', 'missing'])
+
+        # Disabled by default
+        del extracted[:]
+        extract('deleted', failure_cache_ttl=None)
+        self.assertEqual(extracted, ['deleted'])
+
     def test_urlopen_no_file_protocol(self):
         # see https://github.com/ytdl-org/youtube-dl/issues/8227
         ydl = YDL()
@@ -919,6 +1194,134 @@ class TestYoutubeDL(unittest.TestCase):
         self.assertEqual(downloaded['extractor'], 'testex')
         self.assertEqual(downloaded['extractor_key'], 'TestEx')
 
+    def test_concurrent_downloads(self):
+        class ThreadIE(InfoExtractor):
+            _VALID_URL = r'(?P<kind>good|bad):(?P<id>\d+)'
+
+            def _real_extract(self, url):
+                mobj = re.match(self._VALID_URL, url)
+                if mobj.group('kind') == 'bad':
+                    raise ExtractorError('bad video', expected=True)
+                # Give other threads the chance to run
+                time.sleep(0.01)
+                return _make_result([{'url': TEST_URL}], id=mobj.group('id'))
+
+        ydl = YoutubeDL({
+            'simulate': True,
+            'quiet': True,
+            'no_warnings': True,
+            'ignoreerrors': True,
+            'max_downloads': 5,
+            'logger': FakeLogger(),
+        })
+        ydl.add_info_extractor(ThreadIE(ydl))
+
+        retcodes = {}
+        reached = []
+
+        def download(url):
+            try:
+                retcodes[url] = ydl.download([url])
+            except MaxDownloadsReached:
+                reached.append(url)
+
+        urls = ['good:%d' % i for i in range(8)] + ['bad:1']
+        threads = [threading.Thread(target=download, args=(url, )) for url in urls]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(ydl._num_downloads, 5)
+        self.assertEqual(len(reached), 3)
+        # The return code of a download only reflects its own errors
+        self.assertEqual(retcodes.pop('bad:1'), 1)
+        self.assertEqual(set(retcodes.values()), set([0]))
+
+
+class ReplayRequestHandler(compat_http_server.BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        status = {'/expired.mp4': 403, '/gone.mp4': 410, '/missing.mp4': 404}.get(self.path, 200)
+        self.send_response(status)
+        content = b'#' * 1024 if status == 200 else b''
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class TestDownloadWithInfo(unittest.TestCase):
+    def setUp(self):
+        self.httpd = compat_http_server.HTTPServer(('127.0.0.1', 0), ReplayRequestHandler)
+        self.base_url = 'http://127.0.0.1:%d/' % http_server_port(self.httpd)
+        thread = threading.Thread(target=self.httpd.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _replay(self, path):
+        extracted = []
+        base_url = self.base_url
+
+        class ReplayIE(InfoExtractor):
+            _VALID_URL = r'replay:(?P<id>\w+)'
+
+            def _real_extract(self, url):
+                video_id = self._match_id(url)
+                extracted.append(video_id)
+                return {
+                    'id': video_id,
+                    'title': video_id,
+                    'url': base_url + 'fresh.mp4',
+                    'ext': 'mp4',
+                }
+
+        ydl = YoutubeDL({
+            'quiet': True,
+            'no_warnings': True,
+            'outtmpl': os.path.join(self.tmpdir, '%(id)s.%(ext)s'),
+        })
+        ydl.add_info_extractor(ReplayIE(ydl))
+        retcode = ydl.download_with_info({
+            'id': path[:-len('.mp4')],
+            'title': 'replayed',
+            'url': self.base_url + path,
+            'ext': 'mp4',
+            'webpage_url': 'replay:%s' % path[:-len('.mp4')],
+            'extractor': 'Replay',
+            'extractor_key': 'Replay',
+            'requested_formats': None,
+        })
+        return retcode, extracted
+
+    def test_download_with_info(self):
+        # Downloaded without extraction
+        self.assertEqual(self._replay('valid.mp4'), (0, []))
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir, 'valid.mp4')))
+
+        # The media URLs have expired
+        self.assertEqual(self._replay('expired.mp4'), (0, ['expired']))
+        self.assertEqual(self._replay('gone.mp4'), (0, ['gone']))
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir, 'expired.mp4')))
+
+        # Other errors are not retried
+        self.assertRaises(DownloadError, self._replay, 'missing.mp4')
+
+    def test_expired_url_only_for_media(self):
+        ydl = YoutubeDL({'quiet': True})
+        with ydl._download_job() as job:
+            # Not a request of a downloader (an API call of an extractor)
+            self.assertRaises(compat_urllib_error.HTTPError, ydl.urlopen, self.base_url + 'expired.mp4')
+            self.assertFalse(job.get('expired_url'))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# coding: utf-8
+from __future__ import unicode_literals
+
+# Allow direct execution
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shutil
+import tempfile
+import threading
+import time
+
+from test.helper import http_server_port
+from picta_dl import YoutubeDL
+from picta_dl.compat import compat_http_server
+from picta_dl.extractor.common import InfoExtractor
+from picta_dl.utils import DownloadCancelled
+
+try:
+    import asyncio
+    from picta_dl.aio import AsyncJob
+except ImportError:
+    asyncio = None
+
+
+BLOCK_COUNT = 50
+
+
+class SlowHTTPRequestHandler(compat_http_server.BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(BLOCK_COUNT * 1024))
+        self.end_headers()
+        try:
+            for _ in range(BLOCK_COUNT):
+                self.wfile.write(b'#' * 1024)
+                self.wfile.flush()
+                time.sleep(0.02)
+        except (IOError, OSError):
+            pass
+
+
+class FakeLogger(object):
+    def debug(self, msg):
+        pass
+
+    def warning(self, msg):
+        pass
+
+    def error(self, msg):
+        pass
+
+
+class SlowIE(InfoExtractor):
+    _VALID_URL = r'slow:(?P<id>\w+)'
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        return {
+            'id': video_id,
+            'title': video_id,
+            'url': self._downloader.params['test_server'] + '/' + video_id,
+            'ext': 'mp4',
+        }
+
+
+def collect(job):
+    """Future of the list of the items of an async iterable (this file has
+    to be valid Python 2, so it can't use async for)"""
+    result = asyncio.get_event_loop().create_future()
+    items = []
+    iterator = job.__aiter__()
+
+    def on_next(future):
+        if isinstance(future.exception(), StopAsyncIteration):
+            result.set_result(items)
+            return
+        items.append(future.result())
+        asyncio.ensure_future(iterator.__anext__()).add_done_callback(on_next)
+
+    asyncio.ensure_future(iterator.__anext__()).add_done_callback(on_next)
+    return result
+
+
+@unittest.skipIf(asyncio is None, 'asyncio is not available')
+class TestAsyncJob(unittest.TestCase):
+    def setUp(self):
+        self.httpd = compat_http_server.HTTPServer(
+            ('127.0.0.1', 0), SlowHTTPRequestHandler)
+        self.httpd_thread = threading.Thread(target=self.httpd.serve_forever)
+        self.httpd_thread.daemon = True
+        self.httpd_thread.start()
+        self.test_dir = tempfile.mkdtemp()
+        self.ydl = YoutubeDL({
+            'logger': FakeLogger(),
+            'outtmpl': os.path.join(self.test_dir, '%(id)s.%(ext)s'),
+            'test_server': 'http://127.0.0.1:%d' % http_server_port(self.httpd),
+            'buffersize': 1024,
+            'noresizebuffer': True,
+        })
+        self.ydl.add_info_extractor(SlowIE(self.ydl))
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _run(self, func):
+        """Run the loop until the future returned by func, called while the
+        loop runs, is done"""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        result = loop.create_future()
+
+        def on_done(future):
+            if future.exception() is not None:
+                result.set_exception(future.exception())
+            else:
+                result.set_result(future.result())
+
+        loop.call_soon(lambda: asyncio.ensure_future(func()).add_done_callback(on_done))
+        try:
+            return loop.run_until_complete(result)
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
+    def test_extract_info_async(self):
+        info = self._run(lambda: asyncio.ensure_future(
+            self.ydl.extract_info_async('slow:abc', download=False)))
+        self.assertEqual(info['id'], 'abc')
+        self.assertTrue(info['url'].endswith('/abc'))
+
+    def test_download_async(self):
+        def main():
+            job = self.ydl.download_async(['slow:full'])
+            return asyncio.gather(job, collect(job))
+
+        retcode, statuses = self._run(main)
+        self.assertEqual(retcode, 0)
+        self.assertTrue(len(statuses) > 2)
+        self.assertEqual(statuses[0]['status'], 'downloading')
+        self.assertEqual(statuses[-1]['status'], 'finished')
+        self.assertEqual(statuses[-1]['total_bytes'], BLOCK_COUNT * 1024)
+        self.assertEqual(
+            os.path.getsize(os.path.join(self.test_dir, 'full.mp4')), BLOCK_COUNT * 1024)
+
+    def test_cancel(self):
+        errors = []
+        finished = threading.Event()
+
+        def download():
+            try:
+                return self.ydl.download(['slow:cancelled'])
+            except DownloadCancelled as err:
+                errors.append(err)
+                raise
+            finally:
+                finished.set()
+
+        tasks = []
+
+        def main():
+            task = asyncio.ensure_future(AsyncJob(self.ydl, download))
+            asyncio.get_event_loop().call_later(0.2, task.cancel)
+            tasks.append(task)
+            return asyncio.wait([task])
+
+        start = time.time()
+        self._run(main)
+        self.assertTrue(tasks[0].cancelled())
+        # The worker thread stops before the next data block
+        self.assertTrue(finished.wait(5))
+        self.assertTrue(time.time() - start < BLOCK_COUNT * 0.02)
+        self.assertEqual(len(errors), 1)
+        part_size = os.path.getsize(os.path.join(self.test_dir, 'cancelled.mp4.part'))
+        self.assertTrue(0 < part_size < BLOCK_COUNT * 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,6 +16,10 @@ from picta_dl.extractor import (
     gen_extractors,
     YoutubeIE,
 )
+from picta_dl.extractor.dispatch import (
+    ExtractorIndex,
+    extractor_keys,
+)
 
 
 class TestAllURLsMatching(unittest.TestCase):
@@ -131,6 +135,55 @@ class TestAllURLsMatching(unittest.TestCase):
                 len(ie_list), 1,
                 'Multiple extractors with the same IE_NAME "%s" (%s)' % (ie_name, ', '.join(ie_list)))
 
+    def test_extractor_keys(self):
+        self.assertEqual(
+            extractor_keys(r'https?://(?:www\.)?picta\.cu/medias/(?P<id>[^/]+)'),
+            (set(['picta.cu']), set()))
+        self.assertEqual(
+            extractor_keys(r'''(?x)https?://  # scheme
+                (?:\w+\.)? youtube(?:-nocookie)?\.com/'''),
+            (set(['youtube.com', 'youtube-nocookie.com']), set()))
+        self.assertEqual(
+            extractor_keys(r'https?://(?:youtu\.be|(?:www\.)?invidio\.us)/'),
+            (set(['youtu.be', 'invidio.us']), set()))
+        self.assertEqual(
+            extractor_keys(r'https?://(?:www\.)?picta\.cu/|:pictafav'),
+            (set(['picta.cu']), set([':pictafav'])))
+        self.assertEqual(
+            extractor_keys(r'ytsearch(?P<prefix>|[1-9][0-9]*|all):(?P<query>[\s\S]+)'),
+            (set(), set(['ytsearch'])))
+        # The host may not be complete, or followed by anything
+        self.assertEqual(extractor_keys(r'https?://\w+tube\.com/'), None)
+        self.assertEqual(extractor_keys(r'https?://(?:[^/]+\.)?picta\.cu/'), None)
+        self.assertEqual(extractor_keys(r'https?://picta\.cu'), None)
+        self.assertEqual(extractor_keys(r'(?:https?://)?\w+'), None)
+
+    def test_extractor_index(self):
+        index = ExtractorIndex(self.ies)
+        urls = [
+            'https://www.picta.cu/medias/orishas-everyday-2020-07-15-143312',
+            'https://www.picta.cu/embed/?v=1234',
+            'https://WWW.YOUTUBE.COM/watch?v=BaW_jenozKc',
+            'https://www.youtube-nocookie.com/embed/BaW_jenozKc',
+            'https://www.youtube.com/channel/UCMDQxm7cUx3yXkfeHa5zJIQ',
+            'https://www.youtube.com/user/Vsauce',
+            'https://invidio.us/channel/UCMDQxm7cUx3yXkfeHa5zJIQ',
+            'https://www.youtube.com/playlist?list=PLwP_SiAcdui0KVebT0mU9Apz359a4ubsC',
+            'ytsearch5:picta',
+            ':ytfav',
+            'BaW_jenozKc',
+            'https://example.com/video.mp4',
+            'https://user@www.picta.cu:443/medias/orishas-everyday-2020-07-15-143312',
+            'https://www.youtubekids.com/watch?v=BaW_jenozKc',
+        ]
+        for url in urls:
+            candidates = index.candidates(url)
+            self.assertEqual(
+                [ie for ie in self.ies if ie in candidates], candidates)
+            self.assertEqual(
+                [ie.IE_NAME for ie in candidates if ie.suitable(url)],
+                self.matching_ies(url), url)
+
 
 if __name__ == '__main__':
     unittest.main()
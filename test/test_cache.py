@@ -54,6 +54,33 @@ class TestCache(unittest.TestCase):
         self.assertFalse(os.path.exists(self.test_dir))
         self.assertEqual(c.load('test_cache', 'k.'), None)
 
+    def test_cache_expiring(self):
+        ydl = FakeYDL({
+            'cachedir': self.test_dir,
+        })
+        c = Cache(ydl)
+        c.store_expiring('test_cache', 'fresh', {'x': 1}, 60)
+        c.store_expiring('test_cache', 'stale', {'x': 2}, -1)
+        self.assertEqual(c.load_expiring('test_cache', 'fresh'), {'x': 1})
+        self.assertEqual(c.load_expiring('test_cache', 'stale'), None)
+        self.assertEqual(c.load_expiring('test_cache', 'missing', default=3), 3)
+        c.store('test_cache', 'plain', [1])
+        self.assertEqual(c.load_expiring('test_cache', 'plain'), None)
+        c.remove_entry('test_cache', 'fresh')
+        c.remove_entry('test_cache', 'missing')
+        self.assertEqual(c.load_expiring('test_cache', 'fresh'), None)
+
+    @unittest.skipIf(sys.platform == 'win32', 'POSIX file modes')
+    def test_cache_private(self):
+        ydl = FakeYDL({
+            'cachedir': self.test_dir,
+        })
+        c = Cache(ydl)
+        c.store_expiring('test_cache', 'secret', {'x': 1}, 60, private=True)
+        self.assertEqual(c.load_expiring('test_cache', 'secret'), {'x': 1})
+        fn = c._get_cache_fn('test_cache', 'secret', 'json')
+        self.assertEqual(os.stat(fn).st_mode & 0o777, 0o600)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+from __future__ import unicode_literals
+
+# Allow direct execution
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import threading
+import time
+
+from picta_dl.compat import compat_urllib_request
+from picta_dl.daemon import (
+    create_daemon_server,
+    parse_daemon_address,
+)
+from picta_dl.utils import DownloadError
+
+
+class FakeYDL(object):
+    def __init__(self):
+        self.params = {'outtmpl': '%(id)s.%(ext)s'}
+        self.progress_hooks = []
+        self.downloaded = []
+        self._num_downloads = 0
+
+    def add_progress_hook(self, ph):
+        self.progress_hooks.append(ph)
+
+    def to_screen(self, message):
+        pass
+
+    def download(self, url_list):
+        url = url_list[0]
+        self.downloaded.append((url, dict(self.params)))
+        self.params['outtmpl'] = '%(title)s.%(ext)s'
+        if url == 'fail':
+            raise DownloadError('ERROR: no such video')
+        self.params['logger'].debug('[picta] %s: Downloading JSON metadata' % url)
+        self.params['logger'].debug('\r[download]  50.0% of 2.00KiB')
+        for ph in self.progress_hooks:
+            ph({'status': 'finished', 'filename': self.params['outtmpl'], 'total_bytes': 2048, 'info_dict': {}})
+        return 0
+
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.ydl = FakeYDL()
+        self.server = create_daemon_server(self.ydl, '127.0.0.1:0')
+        self.base_url = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _request(self, path, data=None, headers={}):
+        if data is not None:
+            data = json.dumps(data).encode('utf-8')
+        request = compat_urllib_request.Request(self.base_url + path, data, dict({
+            'Authorization': 'Bearer %s' % self.server.token,
+            'Content-Type': 'application/json',
+        }, **headers))
+        response = compat_urllib_request.urlopen(request)
+        return response.read().decode('utf-8')
+
+    def _assertRequestFails(self, code, path, data=None, headers={}):
+        try:
+            self._request(path, data, headers)
+        except Exception as err:
+            self.assertEqual(getattr(err, 'code', None), code)
+        else:
+            self.fail('%s did not fail' % path)
+
+    def test_parse_daemon_address(self):
+        self.assertEqual(parse_daemon_address('localhost:8080'), ('tcp', ('localhost', 8080)))
+        self.assertEqual(parse_daemon_address(':8080'), ('tcp', ('127.0.0.1', 8080)))
+        self.assertEqual(parse_daemon_address('/tmp/picta-dl.sock'), ('unix', '/tmp/picta-dl.sock'))
+        self.assertRaises(ValueError, parse_daemon_address, '0.0.0.0:8080')
+        self.assertRaises(ValueError, parse_daemon_address, 'example.com:8080')
+
+    def test_jobs(self):
+        job = json.loads(self._request('/jobs', {'url': 'abc', 'params': {'format': 'worst'}}))
+        self.assertEqual(job['id'], 1)
+        self.assertEqual(job['status'], 'queued')
+        failed = json.loads(self._request('/jobs', {'url': 'fail'}))
+        self.assertEqual(failed['id'], 2)
+
+        self.server.daemon.stop()
+        self.server.daemon.run()
+
+        events = [json.loads(line) for line in self._request('/jobs/1/events').splitlines()]
+        self.assertEqual(
+            [e['type'] for e in events], ['status', 'log', 'progress', 'status'])
+        self.assertEqual(events[1]['message'], '[picta] abc: Downloading JSON metadata')
+        self.assertEqual(events[2]['filename'], '%(title)s.%(ext)s')
+        self.assertEqual(events[2]['total_bytes'], 2048)
+        self.assertFalse('info_dict' in events[2])
+        self.assertEqual(events[-1]['status'], 'finished')
+
+        job = json.loads(self._request('/jobs/1'))
+        self.assertEqual((job['status'], job['retcode']), ('finished', 0))
+        job = json.loads(self._request('/jobs/2'))
+        self.assertEqual((job['status'], job['retcode']), ('failed', 1))
+        self.assertEqual(job['error'], 'ERROR: no such video')
+        self.assertEqual(len(json.loads(self._request('/jobs'))), 2)
+
+        # The overrides only apply to their job
+        self.assertEqual(self.ydl.downloaded[0][1]['format'], 'worst')
+        self.assertFalse('format' in self.ydl.downloaded[1][1])
+        self.assertEqual(self.ydl.params, {'outtmpl': '%(id)s.%(ext)s'})
+
+    def test_bad_requests(self):
+        self._assertRequestFails(400, '/jobs', {'params': {}})
+        self._assertRequestFails(400, '/jobs', ['abc'])
+        self._assertRequestFails(404, '/jobs/5')
+        # Only some parameters can be set by the jobs
+        self._assertRequestFails(400, '/jobs', {'url': 'abc', 'params': {'exec_cmd': 'rm -rf ~'}})
+        self._assertRequestFails(400, '/jobs', {'url': 'abc', 'params': {'outtmpl': '/etc/%(id)s'}})
+        self.assertEqual(self.server.daemon.jobs(), [])
+
+    def test_forbidden_requests(self):
+        self._assertRequestFails(401, '/jobs', headers={'Authorization': 'Bearer wrong'})
+        self._assertRequestFails(401, '/jobs', {'url': 'abc'}, headers={'Authorization': ''})
+        # What a web page can send without a preflight request
+        self._assertRequestFails(415, '/jobs', {'url': 'abc'}, headers={'Content-Type': 'text/plain'})
+        # DNS rebinding
+        self._assertRequestFails(403, '/jobs', headers={'Host': 'attacker.example.com:8080'})
+        self.assertEqual(self.server.daemon.jobs(), [])
+        self._request('/jobs', headers={'Host': 'localhost:8080'})
+
+    def test_prune(self):
+        daemon = self.server.daemon
+        daemon.max_done = 2
+        for url in ('a', 'b', 'c'):
+            daemon.submit(url)
+        daemon.stop()
+        daemon.run()
+        self.assertEqual([job.url for job in daemon.jobs()], ['b', 'c'])
+        daemon.retention = 0
+        time.sleep(0.01)
+        daemon.submit('d')
+        daemon.stop()
+        daemon.run()
+        self.assertEqual([job.url for job in daemon.jobs()], [])
+        self.assertEqual(daemon.submit('e').id, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
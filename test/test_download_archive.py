@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+from __future__ import unicode_literals
+
+# Allow direct execution
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io
+import shutil
+import tempfile
+
+from picta_dl.archive import (
+    get_download_archive,
+    SQLiteDownloadArchive,
+    TextDownloadArchive,
+)
+
+
+class TestDownloadArchive(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _path(self, name):
+        return os.path.join(self.test_dir, name)
+
+    def test_backend_guess(self):
+        self.assertTrue(isinstance(get_download_archive(self._path('a.txt')), TextDownloadArchive))
+        archive = get_download_archive(self._path('a.sqlite'))
+        self.assertTrue(isinstance(archive, SQLiteDownloadArchive))
+        archive.close()
+        self.assertTrue(isinstance(
+            get_download_archive(self._path('a.db'), 'text'), TextDownloadArchive))
+        self.assertRaises(ValueError, get_download_archive, self._path('a.txt'), 'csv')
+
+    def test_text_archive(self):
+        fn = self._path('archive.txt')
+        archive = TextDownloadArchive(fn)
+        self.assertFalse('picta 1' in archive)
+        archive.add('picta 1')
+        self.assertTrue('picta 1' in archive)
+        with io.open(fn, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'picta 1\n')
+
+        # Lines appended by another process are picked up
+        with io.open(fn, 'a', encoding='utf-8') as f:
+            f.write('picta 2\npicta ñ\n')
+        self.assertTrue('picta 2' in archive)
+        self.assertTrue('picta ñ' in archive)
+        self.assertEqual(list(archive), ['picta 1', 'picta 2', 'picta ñ'])
+
+        # The file is read again when it shrinks
+        with io.open(fn, 'w', encoding='utf-8') as f:
+            f.write('picta 3\n')
+        self.assertFalse('picta 1' in archive)
+        self.assertTrue('picta 3' in archive)
+        self.assertEqual(list(archive), ['picta 3'])
+        os.remove(fn)
+        self.assertFalse('picta 3' in archive)
+
+    def test_sqlite_archive(self):
+        fn = self._path('archive.db')
+        archive = SQLiteDownloadArchive(fn)
+        self.assertFalse('picta 1' in archive)
+        archive.add('picta 1', {'filesize': 1024, 'format_id': 'dash-720p'})
+        self.assertTrue('picta 1' in archive)
+
+        other = SQLiteDownloadArchive(fn)
+        self.assertTrue('picta 1' in other)
+        other.add('picta 2')
+        other.close()
+        self.assertTrue('picta 2' in archive)
+        self.assertEqual(list(archive), ['picta 1', 'picta 2'])
+        archive.close()
+
+    def test_import_export(self):
+        text_fn = self._path('archive.txt')
+        with io.open(text_fn, 'w', encoding='utf-8') as f:
+            f.write('picta 1\n\npicta 2\npicta 1\n')
+
+        for backend in ('text', 'sqlite'):
+            archive = get_download_archive(self._path('archive-%s' % backend), backend)
+            self.assertEqual(archive.import_text(text_fn), 2)
+            self.assertEqual(archive.import_text(text_fn), 0)
+            out_fn = self._path('export-%s.txt' % backend)
+            self.assertEqual(archive.export_text(out_fn), 2)
+            with io.open(out_fn, 'r', encoding='utf-8') as f:
+                self.assertEqual(f.read(), 'picta 1\npicta 2\n')
+            archive.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -77,6 +77,17 @@ class FakeLogger(object):
         pass
 
 
+class OldYDL(object):
+    """A YoutubeDL-like object without check_cancelled"""
+    def __init__(self, ydl):
+        self._ydl = ydl
+
+    def __getattr__(self, name):
+        if name == 'check_cancelled':
+            raise AttributeError(name)
+        return getattr(self._ydl, name)
+
+
 class TestHttpFD(unittest.TestCase):
     def setUp(self):
         self.httpd = compat_http_server.HTTPServer(
@@ -86,9 +97,11 @@ class TestHttpFD(unittest.TestCase):
         self.server_thread.daemon = True
         self.server_thread.start()
 
-    def download(self, params, ep):
+    def download(self, params, ep, ydl_class=YoutubeDL):
         params['logger'] = FakeLogger()
         ydl = YoutubeDL(params)
+        if ydl_class is not YoutubeDL:
+            ydl = ydl_class(ydl)
         downloader = HttpFD(ydl, params)
         filename = 'testfile.mp4'
         try_rm(encodeFilename(filename))
@@ -110,6 +123,9 @@ class TestHttpFD(unittest.TestCase):
             'http_chunk_size': 1000,
         })
 
+    def test_without_check_cancelled(self):
+        self.download({}, 'regular', ydl_class=OldYDL)
+
 
 if __name__ == '__main__':
     unittest.main()
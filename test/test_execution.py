@@ -8,6 +8,7 @@ import unittest
 import sys
 import os
 import subprocess
+import threading
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from picta_dl.utils import encodeArgument
@@ -39,6 +40,20 @@ class TestExecution(unittest.TestCase):
         _, stderr = p.communicate()
         self.assertFalse(stderr)
 
+    def test_daemon_with_urls(self):
+        p = subprocess.Popen(
+            [sys.executable, 'picta_dl/__main__.py', '--daemon', '127.0.0.1:0', 'http://picta.cu/'],
+            cwd=rootDir, stdout=_DEV_NULL, stderr=subprocess.PIPE)
+        # Don't hang if it serves
+        timer = threading.Timer(30, p.kill)
+        timer.start()
+        try:
+            _, stderr = p.communicate()
+        finally:
+            timer.cancel()
+        self.assertEqual(p.returncode, 2)
+        self.assertTrue(b'--daemon can not be used with URLs' in stderr)
+
 
 if __name__ == '__main__':
     unittest.main()
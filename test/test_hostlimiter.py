@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# coding: utf-8
+from __future__ import unicode_literals
+
+# Allow direct execution
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import email.utils
+import threading
+import time
+
+from test.helper import FakeYDL, http_server_port
+from picta_dl.compat import compat_http_server, compat_HTTPError
+from picta_dl.hostlimiter import (
+    HostRateLimiter,
+    parse_retry_after,
+)
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class ThrottlingRequestHandler(compat_http_server.BaseHTTPRequestHandler):
+    requests = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        if self.path == '/always-429' or (
+                self.path == '/429' and self.requests.count(self.path) == 1):
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+        elif self.path == '/503':
+            self.send_response(503)
+        else:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+
+class TestHostRateLimiter(unittest.TestCase):
+    def _limiter(self, *args, **kwargs):
+        clock = FakeClock()
+        return clock, HostRateLimiter(*args, clock=clock.time, sleep=clock.sleep, **kwargs)
+
+    def test_unlimited(self):
+        _, limiter = self._limiter()
+        for _ in range(10):
+            self.assertEqual(limiter.acquire('a'), 0)
+
+    def test_rate(self):
+        clock, limiter = self._limiter(2, burst=3)
+        waits = [limiter.acquire('a') for _ in range(5)]
+        self.assertEqual(waits, [0, 0, 0, 0.5, 0.5])
+        # Hosts are limited separately
+        self.assertEqual(limiter.acquire('b'), 0)
+        clock.now += 10
+        self.assertEqual([limiter.acquire('a') for _ in range(4)], [0, 0, 0, 0.5])
+
+    def test_throttled(self):
+        clock, limiter = self._limiter()
+        self.assertEqual(limiter.throttled('a', 30), 30)
+        self.assertEqual(limiter.acquire('b'), 0)
+        self.assertEqual(limiter.acquire('a'), 30)
+        # Exponential back-off without Retry-After
+        self.assertEqual(limiter.throttled('a'), 2)
+        self.assertEqual(limiter.throttled('a'), 4)
+        limiter.succeeded('a')
+        self.assertEqual(limiter.throttled('a'), 1)
+        self.assertEqual(limiter.stats(), {
+            'a': {'requests': 1, 'throttled': 4, 'waited': 30},
+            'b': {'requests': 1, 'throttled': 0, 'waited': 0},
+        })
+
+        # Retry-After is capped
+        self.assertEqual(limiter.throttled('c', 86400), HostRateLimiter.RETRY_AFTER_MAX)
+        self.assertEqual(limiter.acquire('c'), HostRateLimiter.RETRY_AFTER_MAX)
+        _, limiter = self._limiter(max_retry_after=10)
+        self.assertEqual(limiter.throttled('a', 30), 10)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('120'), 120)
+        self.assertEqual(parse_retry_after(None), None)
+        self.assertEqual(parse_retry_after('soon'), None)
+        date = email.utils.formatdate(time.time() + 60, usegmt=True)
+        self.assertTrue(55 < parse_retry_after(date) <= 60)
+        self.assertEqual(parse_retry_after('Thu, 01 Jan 1970 00:00:00 GMT'), 0)
+
+
+class TestThrottledRequests(unittest.TestCase):
+    def setUp(self):
+        ThrottlingRequestHandler.requests = []
+        self.httpd = compat_http_server.HTTPServer(
+            ('127.0.0.1', 0), ThrottlingRequestHandler)
+        self.url = 'http://127.0.0.1:%d' % http_server_port(self.httpd)
+        thread = threading.Thread(target=self.httpd.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def test_retry(self):
+        ydl = FakeYDL()
+        self.assertEqual(ydl.urlopen(self.url + '/429').read(), b'ok')
+        self.assertEqual(ThrottlingRequestHandler.requests, ['/429', '/429'])
+        host = self.url.partition('//')[2]
+        self.assertEqual(ydl.host_limiter.stats()[host]['throttled'], 1)
+
+    def test_give_up(self):
+        ydl = FakeYDL({'throttle_retries': 2})
+        with self.assertRaises(compat_HTTPError) as cm:
+            ydl.urlopen(self.url + '/always-429')
+        self.assertEqual(cm.exception.code, 429)
+        self.assertEqual(len(ThrottlingRequestHandler.requests), 3)
+
+    def test_server_error(self):
+        ydl = FakeYDL()
+        self.assertRaises(compat_HTTPError, ydl.urlopen, self.url + '/503')
+        self.assertEqual(len(ThrottlingRequestHandler.requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# coding: utf-8
+from __future__ import unicode_literals
+
+# Allow direct execution
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+
+from test.helper import http_server_port
+
+from picta_dl import YoutubeDL
+from picta_dl.compat import compat_http_server
+from picta_dl.extractor.common import InfoExtractor
+from picta_dl.jobqueue import (
+    download_from_queue,
+    JobQueue,
+)
+from picta_dl.utils import (
+    DownloadError,
+    ExtractorError,
+)
+from picta_dl.workers import (
+    _fork_context,
+    download_with_workers,
+)
+
+
+class QueueIE(InfoExtractor):
+    _VALID_URL = r'queue:(?P<id>\w+)'
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        if video_id.startswith('fail'):
+            raise ExtractorError('no such video', expected=True)
+        return {
+            'id': video_id,
+            'title': 'video %s' % video_id,
+            'url': 'http://localhost/%s.mp4' % video_id,
+            'ext': 'mp4',
+        }
+
+
+class FlakyRequestHandler(compat_http_server.BaseHTTPRequestHandler):
+    requests = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        # The first request of each video fails
+        if self.requests.count(self.path) == 1:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', '5')
+        self.end_headers()
+        self.wfile.write(b'video')
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.test_dir, 'queue.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _states(self, queue):
+        return dict(queue._conn.execute('SELECT url, state FROM jobs'))
+
+    def test_add_and_claim(self):
+        queue = JobQueue(self.filename)
+        self.assertEqual(queue.add(iter(['a', 'b', 'a'])), 2)
+        self.assertEqual(queue.add(['b', 'c']), 1)
+        job = queue.claim()
+        self.assertEqual((job.url, job.attempts), ('a', 1))
+        # Claimed jobs are not handed out again, even to another process
+        other = JobQueue(self.filename)
+        self.assertEqual(other.claim().url, 'b')
+        queue.finish(job)
+        self.assertEqual(queue.claim().url, 'c')
+        self.assertEqual(queue.claim(), None)
+        self.assertEqual(queue.counts(), {'done': 1, 'extracting': 2})
+        other.close()
+        queue.close()
+
+    def test_retries(self):
+        queue = JobQueue(self.filename, retries=1)
+        queue.add(['a'])
+        job = queue.claim()
+        self.assertEqual(queue.finish(job, 'error'), JobQueue.PENDING)
+        job = queue.claim()
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(queue.finish(job, 'error'), JobQueue.FAILED)
+        self.assertEqual(queue.claim(), None)
+        queue.close()
+
+    def test_release(self):
+        queue = JobQueue(self.filename)
+        queue.add(['a'])
+        queue.release(queue.claim())
+        self.assertEqual(queue.claim().attempts, 1)
+        queue.close()
+
+    def test_recover(self):
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        queue = JobQueue(self.filename)
+        queue.add(['dead', 'alive', 'remote'])
+        jobs = [queue.claim() for _ in range(3)]
+        queue.set_state(jobs[0], JobQueue.DOWNLOADING)
+        owners = [
+            '%s:%d' % (socket.gethostname(), process.pid), JobQueue._owner(),
+            'some.other.host:%d' % process.pid]
+        for job, owner in zip(jobs, owners):
+            queue._conn.execute('UPDATE jobs SET owner = ? WHERE id = ?', (owner, job.id))
+        self.assertEqual(JobQueue(self.filename).recover(), 1)
+        self.assertEqual(self._states(queue), {
+            'dead': 'pending', 'alive': 'extracting', 'remote': 'extracting'})
+        queue.close()
+
+
+class TestDownloadFromQueue(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.test_dir, 'queue.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _ydl(self, **params):
+        ydl = YoutubeDL(dict({
+            'simulate': True,
+            'quiet': True,
+            'forceid': True,
+            'outtmpl': '%(id)s.%(ext)s',
+        }, **params))
+        ydl.add_info_extractor(QueueIE(ydl))
+        ydl._screen_file = io.StringIO()
+        ydl._err_file = io.StringIO()
+        return ydl
+
+    def test_download(self):
+        queue = JobQueue(self.filename)
+        queue.add(['queue:1', 'queue:fail', 'queue:2'])
+        ydl = self._ydl(ignoreerrors=True)
+        self.assertEqual(download_from_queue(ydl, queue), 1)
+        self.assertEqual(ydl._screen_file.getvalue().splitlines(), ['1', '2'])
+        self.assertEqual(queue.counts(), {'done': 2, 'failed': 1})
+        queue.close()
+
+    def test_resume(self):
+        queue = JobQueue(self.filename)
+        queue.add(['queue:1', 'queue:fail', 'queue:2'])
+        ydl = self._ydl()
+        self.assertRaises(DownloadError, download_from_queue, ydl, queue)
+        error = queue._conn.execute(
+            'SELECT error FROM jobs WHERE state = ?', (JobQueue.FAILED, )).fetchone()[0]
+        self.assertTrue('no such video' in error)
+        # Running again only downloads what is left
+        ydl = self._ydl()
+        self.assertEqual(download_from_queue(ydl, queue), 0)
+        self.assertEqual(ydl._screen_file.getvalue().splitlines(), ['2'])
+        queue.close()
+
+    @unittest.skipIf(_fork_context() is None, 'fork is not available')
+    def test_workers(self):
+        queue = JobQueue(self.filename)
+        queue.add(['queue:%d' % i for i in range(6)])
+        ydl = self._ydl()
+        self.assertEqual(download_with_workers(ydl, None, 3, job_queue=queue), 0)
+        self.assertEqual(
+            sorted(ydl._screen_file.getvalue().splitlines()),
+            ['0', '1', '2', '3', '4', '5'])
+        queue = JobQueue(self.filename)
+        self.assertEqual(queue.counts(), {'done': 6})
+        queue.close()
+
+    @unittest.skipIf(_fork_context() is None, 'fork is not available')
+    def test_workers_retry(self):
+        FlakyRequestHandler.requests = []
+        httpd = compat_http_server.HTTPServer(('127.0.0.1', 0), FlakyRequestHandler)
+        base_url = 'http://127.0.0.1:%d/' % http_server_port(httpd)
+        thread = threading.Thread(target=httpd.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        class FlakyIE(InfoExtractor):
+            _VALID_URL = r'flaky:(?P<id>\w+)'
+
+            def _real_extract(self, url):
+                video_id = self._match_id(url)
+                return {
+                    'id': video_id,
+                    'title': video_id,
+                    'url': base_url + video_id + '.mp4',
+                    'ext': 'mp4',
+                }
+
+        try:
+            queue = JobQueue(self.filename, retries=2)
+            queue.add(['flaky:a', 'flaky:b'])
+            ydl = YoutubeDL({
+                'quiet': True,
+                'ignoreerrors': True,
+                'outtmpl': os.path.join(self.test_dir, '%(id)s.%(ext)s'),
+            })
+            ydl.add_info_extractor(FlakyIE(ydl))
+            ydl._screen_file = io.StringIO()
+            ydl._err_file = io.StringIO()
+            download_with_workers(ydl, None, 2, job_queue=queue)
+            # The failed jobs are downloaded when they are retried
+            queue = JobQueue(self.filename)
+            self.assertEqual(queue.counts(), {'done': 2})
+            queue.close()
+            for video_id in 'ab':
+                self.assertTrue(os.path.exists(os.path.join(self.test_dir, video_id + '.mp4')))
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# coding: utf-8
+from __future__ import unicode_literals
+
+# Allow direct execution
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import copy
+import io
+import json
+import shutil
+import tempfile
+
+from test.helper import FakeYDL
+from picta_dl.jsonstream import (
+    compact_info,
+    JSONStreamWriter,
+    read_info_json,
+)
+
+
+def _video(video_id):
+    return {
+        'id': video_id,
+        'title': 'Video %s' % video_id,
+        'formats': [{
+            'format_id': 'dash',
+            'url': 'http://example.com/%s.mpd' % video_id,
+            'ext': 'mp4',
+            'protocol': 'http_dash_segments',
+            'fragments': [{'path': 'seg-1.m4s'}, {'path': 'seg-2.m4s'}],
+        }],
+    }
+
+
+def _playlist(playlist_id, entries):
+    return {
+        '_type': 'playlist',
+        'id': playlist_id,
+        'title': 'Playlist %s' % playlist_id,
+        'entries': entries,
+        'extractor': 'test:playlist',
+        'extractor_key': 'test:playlist',
+        'webpage_url': 'http://example.com/%s' % playlist_id,
+    }
+
+
+PLAYLIST = _playlist('outer', [
+    _video('1'),
+    _playlist('inner', [_video('2'), _video('3')]),
+    _video('4'),
+])
+
+
+class TestJSONStreamWriter(unittest.TestCase):
+    def _run(self, ie_result, **kwargs):
+        """Return the result and what the writer wrote while it was processed"""
+        written = []
+        ydl = FakeYDL({'simulate': True})
+        writer = JSONStreamWriter(written.append, **kwargs)
+
+        def playlist_hook(d):
+            writer.playlist_hook(d)
+            # Nothing is written before the end of the document if buffered
+            if kwargs.get('buffered') and d['status'] == 'entry':
+                self.assertEqual(written, [])
+        ydl.add_playlist_hook(playlist_hook)
+        res = ydl.process_ie_result(copy.deepcopy(ie_result), download=False)
+        writer.result(res)
+        writer.close()
+        return res, written
+
+    def test_document(self):
+        res, written = self._run(PLAYLIST)
+        self.assertTrue(len(written) > 1)
+        output = ''.join(written)
+        self.assertTrue(output.endswith('}\n'))
+        self.assertEqual(output.count('\n'), 1)
+        self.assertEqual(json.loads(output), json.loads(json.dumps(res)))
+
+        res, written = self._run(_video('5'))
+        self.assertEqual(written, [json.dumps(res) + '\n'])
+
+    def test_buffered(self):
+        res, written = self._run(PLAYLIST, buffered=True)
+        self.assertEqual(len(written), 1)
+        self.assertEqual(json.loads(written[0]), json.loads(json.dumps(res)))
+
+    def test_lines(self):
+        res, written = self._run(PLAYLIST, lines=True)
+        lines = [json.loads(line) for line in ''.join(written).splitlines()]
+        self.assertEqual(
+            [(line.get('_type'), line['id']) for line in lines],
+            [('playlist', 'outer'), (None, '1'), ('playlist', 'inner'), (None, '2'),
+             (None, '3'), (None, '4')])
+        self.assertTrue('entries' not in lines[0])
+        self.assertEqual(lines[1], json.loads(json.dumps(res['entries'][0])))
+
+    def test_compact(self):
+        res, written = self._run(PLAYLIST, compact=True)
+        output = json.loads(''.join(written))
+        self.assertTrue('fragments' not in output['entries'][1]['entries'][0]['formats'][0])
+        self.assertTrue('fragments' in res['entries'][1]['entries'][0]['formats'][0])
+        self.assertEqual(
+            output['entries'][0],
+            json.loads(json.dumps(compact_info(res['entries'][0]))))
+
+    def test_close(self):
+        written = []
+        writer = JSONStreamWriter(written.append)
+        playlist = _playlist('outer', [])
+        writer.playlist_hook({'status': 'started', 'playlist': playlist})
+        writer.playlist_hook({'status': 'entry', 'playlist': playlist, 'info_dict': _video('1')})
+        # An error stops the playlist
+        writer.close()
+        output = json.loads(''.join(written))
+        self.assertEqual([entry['id'] for entry in output['entries']], ['1'])
+
+    def test_failed_entries(self):
+        # With ignoreerrors, the entries that failed are None
+        playlist = _playlist('outer', [])
+        for lines, expected in ((False, ['1', None, '3']), (True, ['outer', '1', '3'])):
+            written = []
+            writer = JSONStreamWriter(written.append, lines=lines)
+            writer.playlist_hook({'status': 'started', 'playlist': playlist})
+            for info_dict in (_video('1'), None, _video('3')):
+                writer.playlist_hook({'status': 'entry', 'playlist': playlist, 'info_dict': info_dict})
+            writer.playlist_hook({'status': 'finished', 'playlist': playlist})
+            writer.result(playlist)
+            if lines:
+                ids = [json.loads(line)['id'] for line in ''.join(written).splitlines()]
+            else:
+                ids = [entry and entry['id'] for entry in json.loads(''.join(written))['entries']]
+            self.assertEqual(ids, expected)
+
+        written = []
+        writer = JSONStreamWriter(written.append)
+        writer.result(None)
+        self.assertEqual(written, ['null\n'])
+
+
+class TestReadInfoJSON(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _write(self, filename, content):
+        path = os.path.join(self.tmpdir, filename)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def _ids(self, path):
+        return [info['id'] for info in read_info_json(path)]
+
+    def test_file(self):
+        self.assertEqual(self._ids(self._write(
+            'indented.info.json', json.dumps(_video('1'), indent=4))), ['1'])
+        self.assertEqual(self._ids(self._write(
+            'video.info.json', json.dumps(_video('ü')))), ['ü'])
+
+    def test_lines(self):
+        self.assertEqual(self._ids(self._write('videos.jsonl', '\n'.join(
+            json.dumps(_video(video_id)) for video_id in '123') + '\n\n')), ['1', '2', '3'])
+        self.assertEqual(self._ids(self._write('empty.jsonl', '\n')), [])
+
+        # Printed by --json-lines: the playlists are followed by their entries
+        written = []
+        writer = JSONStreamWriter(written.append, lines=True)
+        ydl = FakeYDL({'simulate': True})
+        ydl.add_playlist_hook(writer.playlist_hook)
+        writer.result(ydl.process_ie_result(copy.deepcopy(PLAYLIST), download=False))
+        self.assertEqual(
+            self._ids(self._write('playlist.jsonl', ''.join(written))),
+            ['1', '2', '3', '4'])
+
+        path = self._write('invalid.jsonl', '{"id": "1"}\n{"id": \n')
+        with self.assertRaises(ValueError) as cm:
+            self._ids(path)
+        self.assertTrue('invalid.jsonl, line 2' in str(cm.exception))
+
+    def test_directory(self):
+        self._write('b/2.info.json', json.dumps(_video('2')))
+        self._write('a/1.info.json', json.dumps(_video('1')))
+        self._write('3.info.json', json.dumps(_video('3')))
+        self._write('a/1.description', 'Not an info JSON')
+        self.assertEqual(self._ids(self.tmpdir), ['3', '1', '2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# coding: utf-8
+from __future__ import unicode_literals
+
+# Allow direct execution
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import errno
+import shutil
+import socket
+import tempfile
+import threading
+
+from test.helper import FakeYDL, http_server_port
+from picta_dl.compat import (
+    compat_http_server,
+    compat_urllib_error,
+)
+from picta_dl.extractor.common import InfoExtractor
+from picta_dl.retry import (
+    classify_error,
+    FRAGMENT_RETRY_ON,
+    RetryPolicy,
+)
+from picta_dl.utils import (
+    CircuitOpenError,
+    ContentTooShortError,
+    ExtractorError,
+)
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def http_error(code):
+    return compat_urllib_error.HTTPError('http://example.com/', code, 'error', {}, None)
+
+
+class FlakyRequestHandler(compat_http_server.BaseHTTPRequestHandler):
+    # Number of failures of each path before it succeeds
+    failures = {}
+    requests = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        if self.requests.count(self.path) <= self.failures.get(self.path, 0):
+            self.send_response(503)
+            if self.path == '/throttled':
+                self.send_header('Retry-After', '0')
+            self.end_headers()
+            return
+        content = b'x' * 1024
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        # The connection of /short closes before the end of the content
+        self.send_header('Content-Length', str(len(content) * (2 if self.path == '/short' else 1)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class TestClassifyError(unittest.TestCase):
+    def test_classify_error(self):
+        self.assertEqual(classify_error(http_error(503)), 'server')
+        self.assertEqual(classify_error(http_error(404)), 'not_found')
+        self.assertEqual(classify_error(http_error(429)), 'throttled')
+        throttled = http_error(503)
+        throttled.throttled = True
+        self.assertEqual(classify_error(throttled), 'throttled')
+        self.assertEqual(classify_error(http_error(403)), 'http')
+        self.assertEqual(classify_error(socket.timeout()), 'timeout')
+        self.assertEqual(classify_error(compat_urllib_error.URLError(socket.timeout())), 'timeout')
+        self.assertEqual(classify_error(socket.error(errno.ECONNRESET, 'reset')), 'reset')
+        self.assertEqual(classify_error(ContentTooShortError(1, 2)), 'incomplete')
+        self.assertEqual(classify_error(socket.error(errno.EACCES, 'denied')), None)
+        self.assertEqual(classify_error(ValueError()), None)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.policy = RetryPolicy(
+            backoff=1, max_backoff=8, failure_threshold=3, cooldown=30,
+            clock=self.clock.time, sleep=self.clock.sleep)
+
+    def test_delay(self):
+        for count, maximum in ((1, 1), (2, 2), (3, 4), (4, 8), (10, 8)):
+            for _ in range(20):
+                delay = self.policy.delay(count)
+                self.assertTrue(maximum / 2.0 <= delay <= maximum)
+
+    def test_retries(self):
+        retrier = self.policy.retrier('http://a/video', 2, 'http')
+        retrier.attempt()
+        self.clock.now += 5
+        self.assertTrue(retrier.failed(http_error(500)))
+        retrier.sleep()
+        retrier.attempt()
+        # 404 is final, except for fragments
+        self.assertFalse(retrier.failed(http_error(404)))
+        fragment_retrier = self.policy.retrier('http://a/frag', 2, 'fragment', FRAGMENT_RETRY_ON)
+        fragment_retrier.attempt()
+        self.assertTrue(fragment_retrier.failed(http_error(404)))
+        self.assertTrue(fragment_retrier.failed(http_error(404)))
+        self.assertFalse(fragment_retrier.failed(http_error(404)))
+        stats = self.policy.stats()
+        self.assertEqual(stats['http']['retries'], 1)
+        self.assertTrue(5.5 <= stats['http']['time_lost'] <= 6)
+        self.assertEqual(stats['fragment']['retries'], 2)
+
+    def test_circuit(self):
+        retrier = self.policy.retrier('http://a/video', 10, 'http')
+        for _ in range(3):
+            retrier.attempt()
+            self.assertTrue(retrier.failed(socket.timeout()))
+        # Open for every request to the host
+        self.assertRaises(CircuitOpenError, self.policy.retrier('http://a/other', 1, 'http').attempt)
+        self.policy.retrier('http://b/video', 1, 'http').attempt()
+        self.assertEqual(self.policy.stats()['http']['circuits_opened'], 1)
+        # Half-open after the cooldown: one more failure opens it again
+        self.clock.now += 30
+        retrier.attempt()
+        retrier.failed(socket.timeout())
+        self.assertRaises(CircuitOpenError, retrier.attempt)
+        self.clock.now += 30
+        retrier.attempt()
+        retrier.succeeded()
+        for _ in range(2):
+            retrier.attempt()
+            retrier.failed(socket.timeout())
+        retrier.attempt()
+
+    def test_no_circuit(self):
+        policy = RetryPolicy(clock=self.clock.time, sleep=self.clock.sleep)
+        retrier = policy.retrier('http://a/video', float('inf'), 'http')
+        for _ in range(100):
+            retrier.attempt()
+            self.assertTrue(retrier.failed(http_error(503)))
+        self.assertEqual(policy.stats()['http']['circuits_opened'], 0)
+
+
+class FlakyIE(InfoExtractor):
+    def _real_extract(self, url):
+        pass
+
+
+class TestRetries(unittest.TestCase):
+    def setUp(self):
+        FlakyRequestHandler.failures = {'/twice': 2, '/always': 100, '/throttled': 100}
+        FlakyRequestHandler.requests = []
+        self.httpd = compat_http_server.HTTPServer(('127.0.0.1', 0), FlakyRequestHandler)
+        self.url = 'http://127.0.0.1:%d' % http_server_port(self.httpd)
+        thread = threading.Thread(target=self.httpd.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _ydl(self, **params):
+        return FakeYDL(dict({
+            'retry_backoff': 0.01,
+            'outtmpl': os.path.join(self.test_dir, '%(id)s.%(ext)s'),
+        }, **params))
+
+    def test_http_download(self):
+        ydl = self._ydl(retries=2)
+        ydl.process_info({
+            'id': 'twice',
+            'title': 'twice',
+            'ext': 'mp4',
+            'url': self.url + '/twice',
+        })
+        self.assertEqual(os.path.getsize(os.path.join(self.test_dir, 'twice.mp4')), 1024)
+        self.assertEqual(ydl.retry_policy.stats()['http']['retries'], 2)
+
+    def test_content_too_short(self):
+        ydl = self._ydl(retries=1)
+        with self.assertRaises(Exception) as cm:
+            ydl.process_info({
+                'id': 'short',
+                'title': 'short',
+                'ext': 'mp4',
+                'url': self.url + '/short',
+            })
+        self.assertTrue('content too short' in str(cm.exception))
+        self.assertEqual(FlakyRequestHandler.requests, ['/short', '/short'])
+
+    def test_webpage(self):
+        ydl = self._ydl()
+        ie = FlakyIE(ydl)
+        self.assertEqual(ie._download_webpage(self.url + '/twice', None), 'x' * 1024)
+        self.assertEqual(ydl.retry_policy.stats()['webpage']['retries'], 2)
+
+    def test_webpage_not_fatal(self):
+        ie = FlakyIE(self._ydl())
+        self.assertFalse(ie._download_webpage(self.url + '/always', None, fatal=False))
+        self.assertEqual(len(FlakyRequestHandler.requests), 1)
+        ie = FlakyIE(self._ydl(extractor_retries=1))
+        self.assertFalse(ie._download_webpage(self.url + '/always', None, fatal=False))
+        self.assertEqual(len(FlakyRequestHandler.requests), 3)
+
+    def test_webpage_throttled(self):
+        # Only retried by YoutubeDL.urlopen
+        ie = FlakyIE(self._ydl(throttle_retries=1, no_warnings=True))
+        self.assertRaises(ExtractorError, ie._download_webpage, self.url + '/throttled', None)
+        self.assertEqual(FlakyRequestHandler.requests, ['/throttled', '/throttled'])
+
+    def test_webpage_circuit(self):
+        ie = FlakyIE(self._ydl(extractor_retries=1, circuit_breaker_threshold=5))
+        self.assertRaises(ExtractorError, ie._download_webpage, self.url + '/twice', None)
+        self.assertRaises(ExtractorError, ie._download_webpage, self.url + '/always', None)
+        # The fifth server error opens the circuit of the host
+        with self.assertRaises(ExtractorError) as cm:
+            ie._download_webpage(self.url + '/always', None)
+        self.assertTrue('keeps failing' in str(cm.exception))
+        self.assertEqual(len(FlakyRequestHandler.requests), 5)
+        self.assertRaises(ExtractorError, ie._download_webpage, self.url + '/', None)
+        self.assertEqual(len(FlakyRequestHandler.requests), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
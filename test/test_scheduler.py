@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# coding: utf-8
+from __future__ import unicode_literals
+
+# Allow direct execution
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io
+
+from picta_dl import YoutubeDL
+from picta_dl.extractor.common import InfoExtractor
+from picta_dl.scheduler import (
+    download_scheduled,
+    estimate_filesize,
+)
+
+
+class SizedIE(InfoExtractor):
+    _VALID_URL = r'sized:(?P<id>\w+)'
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        if video_id == 'playlist':
+            return self.playlist_result([
+                self.url_result('sized:%s' % entry_id, 'Sized')
+                for entry_id in ('p1_300', 'p2_3000')], 'playlist')
+        size = video_id.split('_')[1]
+        return {
+            'id': video_id,
+            'title': 'video %s' % video_id,
+            'formats': [{
+                'format_id': 'mp4',
+                'url': 'http://localhost/%s.mp4' % video_id,
+                'ext': 'mp4',
+                'filesize': int(size) if size != 'unknown' else None,
+            }],
+        }
+
+
+class TestEstimateFilesize(unittest.TestCase):
+    def test_estimate_filesize(self):
+        self.assertEqual(estimate_filesize({'filesize': 1000}), 1000)
+        self.assertEqual(estimate_filesize({'filesize_approx': 1000}), 1000)
+        self.assertEqual(estimate_filesize({'tbr': 80, 'duration': 10}), 100000)
+        self.assertEqual(estimate_filesize({'vbr': 64, 'abr': 16, 'duration': 10}), 100000)
+        self.assertEqual(estimate_filesize({'tbr': 80}), None)
+        self.assertEqual(estimate_filesize({
+            'duration': 10,
+            'requested_formats': [{'filesize': 1000}, {'abr': 8}],
+        }), 11000)
+        self.assertEqual(estimate_filesize({
+            'requested_formats': [{'filesize': 1000}, {'abr': 8}],
+        }), None)
+
+
+class TestDownloadScheduled(unittest.TestCase):
+    def _download(self, urls, order='shortest-first', time_budget=None, **params):
+        ydl = YoutubeDL(dict({
+            'simulate': True,
+            'quiet': True,
+            'forceid': True,
+            'outtmpl': '%(id)s.%(ext)s',
+        }, **params))
+        ydl.add_info_extractor(SizedIE(ydl))
+        ydl._screen_file = io.StringIO()
+        retcode = download_scheduled(ydl, urls, order, time_budget)
+        return retcode, ydl._screen_file.getvalue().splitlines()
+
+    URLS = ['sized:a_5000', 'sized:b_unknown', 'sized:playlist', 'sized:c_500']
+
+    def test_shortest_first(self):
+        retcode, ids = self._download(self.URLS)
+        self.assertEqual(retcode, 0)
+        self.assertEqual(ids, ['p1_300', 'c_500', 'p2_3000', 'a_5000', 'b_unknown'])
+
+    def test_largest_first(self):
+        _, ids = self._download(self.URLS, 'largest-first')
+        self.assertEqual(ids, ['a_5000', 'p2_3000', 'c_500', 'p1_300', 'b_unknown'])
+
+    def test_time_budget(self):
+        # 4 seconds at 1000 bytes/s
+        _, ids = self._download(self.URLS, time_budget=4, ratelimit=1000)
+        self.assertEqual(ids, ['p1_300', 'c_500', 'p2_3000', 'b_unknown'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,6 +11,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
 # Various small unit tests
+import copy
 import io
 import json
 import xml.etree.ElementTree
@@ -21,6 +22,7 @@ from picta_dl.utils import (
     encode_base_n,
     caesar,
     clean_html,
+    compile_match_filter,
     date_from_str,
     DateRange,
     detect_exe_version,
@@ -35,6 +37,7 @@ from picta_dl.utils import (
     find_xpath_attr,
     fix_xml_ampersands,
     float_or_none,
+    FragmentList,
     get_element_by_class,
     get_element_by_attribute,
     get_elements_by_class,
@@ -44,6 +47,7 @@ from picta_dl.utils import (
     intlist_to_bytes,
     is_html,
     js_to_json,
+    json_default,
     limit_length,
     merge_dicts,
     mimetype2ext,
@@ -71,6 +75,7 @@ from picta_dl.utils import (
     remove_end,
     remove_quotes,
     rot47,
+    run_concurrently,
     shell_quote,
     smuggle_url,
     str_to_int,
@@ -104,6 +109,8 @@ from picta_dl.utils import (
     cli_valueless_option,
     cli_bool_option,
     parse_codecs,
+    _MATCH_FILTERS,
+    _MATCH_FILTERS_SIZE,
 )
 from picta_dl.compat import (
     compat_chr,
@@ -642,6 +649,38 @@ class TestUtil(unittest.TestCase):
         testPL(5, 2, (2, 99), [2, 3, 4])
         testPL(5, 2, (20, 99), [])
 
+    def test_fragment_list(self):
+        fragments = FragmentList(
+            'seg-$%(Number)05d-%(Bandwidth)d.m4s', start_number=5, bandwidth=1000,
+            count=3, duration=4.0, initialization='http://a/init.mp4')
+        expected = [
+            {'url': 'http://a/init.mp4'},
+            {'path': 'seg-$00005-1000.m4s', 'duration': 4.0},
+            {'path': 'seg-$00006-1000.m4s', 'duration': 4.0},
+            {'path': 'seg-$00007-1000.m4s', 'duration': 4.0},
+        ]
+        self.assertEqual(len(fragments), 4)
+        self.assertEqual(fragments, expected)
+        self.assertEqual(fragments[-1], expected[-1])
+        self.assertEqual(fragments[:1], expected[:1])
+        self.assertRaises(IndexError, lambda: fragments[4])
+        self.assertTrue(copy.deepcopy(fragments) is fragments)
+        self.assertEqual(json.loads(json.dumps({'fragments': fragments}, default=json_default)), {'fragments': expected})
+
+        fragments = FragmentList(
+            'http://a/%(Time)d.m4s', timescale=10,
+            timeline=[(100, 20, 2), (None, 10, 0), (500, 5, -1), (None, 5, 1)])
+        self.assertEqual(
+            [(f['url'], f['duration']) for f in fragments],
+            [('http://a/100.m4s', 2.0), ('http://a/120.m4s', 2.0), ('http://a/140.m4s', 2.0),
+             ('http://a/160.m4s', 1.0), ('http://a/500.m4s', 0.5), ('http://a/505.m4s', 0.5),
+             ('http://a/510.m4s', 0.5)])
+
+        fragments = FragmentList(['s1.m4s', 'http://a/s2.m4s'])
+        self.assertEqual(fragments, [{'path': 's1.m4s'}, {'url': 'http://a/s2.m4s'}])
+        fragments = FragmentList(['s1.m4s', 's2.m4s', 's3.m4s'], timeline=[(None, 2, 0), (None, 1, 5)])
+        self.assertEqual(fragments[1:], [{'path': 's2.m4s', 'duration': 1}, {'path': 's3.m4s', 'duration': 1}])
+
     def test_read_batch_urls(self):
         f = io.StringIO('''\xef\xbb\xbf foo
             bar\r
@@ -651,6 +690,17 @@ class TestUtil(unittest.TestCase):
             bam''')
         self.assertEqual(read_batch_urls(f), ['foo', 'bar', 'baz', 'bam'])
 
+    def test_run_concurrently(self):
+        self.assertEqual(run_concurrently([]), [])
+        self.assertEqual(
+            run_concurrently([lambda i=i: i * 2 for i in range(10)], max_workers=3),
+            list(range(0, 20, 2)))
+        self.assertEqual(run_concurrently([lambda: 'a'], max_workers=1), ['a'])
+
+        def fail():
+            raise ValueError('failed')
+        self.assertRaises(ValueError, run_concurrently, [lambda: 1, fail])
+
     def test_urlencode_postdata(self):
         data = urlencode_postdata({'username': 'foo@bar.com', 'password': '1234'})
         self.assertTrue(isinstance(data, bytes))
@@ -1186,6 +1236,37 @@ ffmpeg version 2.4.4 Copyright (c) 2000-2014 the FFmpeg ...'''), '2.4.4')
         self.assertFalse(match_str('!title', {'title': 'abc'}))
         self.assertFalse(match_str('!title', {'title': ''}))
 
+        self.assertTrue(match_str('x>0', {}, incomplete=True))
+        self.assertTrue(match_str('x', {}, incomplete=True))
+        self.assertTrue(match_str('!x', {}, incomplete=True))
+        self.assertFalse(match_str('x>0', {'x': 0}, incomplete=True))
+        self.assertFalse(match_str(
+            'title = foo & duration > 30', {'title': 'bar'}, incomplete=True))
+
+    def test_compile_match_filter(self):
+        match = compile_match_filter('like_count > 100 & title != "b" & !is_live')
+        self.assertTrue(match({'like_count': 190, 'title': 'a'}))
+        self.assertFalse(match({'like_count': 190, 'title': 'a', 'is_live': True}))
+        self.assertFalse(match({'title': 'a'}))
+        self.assertTrue(match({'title': 'a'}, incomplete=True))
+        # Invalid parts are reported at once, even after a failing part
+        self.assertRaises(ValueError, compile_match_filter, 'x > 1 & y < abc')
+        self.assertRaises(ValueError, compile_match_filter, 'x ~ 1')
+        self.assertRaises(ValueError, compile_match_filter, 'x > 1.2.3')
+        self.assertTrue(compile_match_filter('version = 1.2.3')({'version': '1.2.3'}))
+        # Numbers are compared as strings to string fields
+        match = compile_match_filter('id = 12')
+        self.assertTrue(match({'id': '12'}))
+        self.assertTrue(match({'id': 12}))
+        self.assertFalse(match({'id': '012'}))
+
+    def test_compile_match_filter_cache(self):
+        for i in range(100):
+            compile_match_filter('x > %d' % i)
+        self.assertEqual(len(_MATCH_FILTERS), _MATCH_FILTERS_SIZE)
+        self.assertTrue('x > 99' in _MATCH_FILTERS)
+        self.assertFalse('x > 0' in _MATCH_FILTERS)
+
     def test_parse_dfxp_time_expr(self):
         self.assertEqual(parse_dfxp_time_expr(None), None)
         self.assertEqual(parse_dfxp_time_expr(''), None)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# coding: utf-8
+from __future__ import unicode_literals
+
+# Allow direct execution
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io
+import shutil
+import tempfile
+import threading
+import time
+
+from test.helper import http_server_port
+from picta_dl import YoutubeDL
+from picta_dl.compat import compat_http_server
+from picta_dl.extractor.common import InfoExtractor
+from picta_dl.utils import (
+    ExtractorError,
+    SameFileError,
+)
+from picta_dl.workers import (
+    _fork_context,
+    _ProgressSender,
+    download_with_workers,
+    DownloadClaims,
+)
+
+
+class BatchIE(InfoExtractor):
+    _VALID_URL = r'batch:(?P<id>\w+)'
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        if video_id == 'fail':
+            raise ExtractorError('no such video', expected=True)
+        # Let the other workers run
+        time.sleep(0.05)
+        return {
+            'id': video_id.split('_')[0],
+            'title': 'video %s' % video_id,
+            'url': 'http://localhost/%s.mp4' % video_id,
+            'ext': 'mp4',
+        }
+
+
+class ExpiringRequestHandler(compat_http_server.BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == '/expired.mp4':
+            self.send_response(403)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', '5')
+        self.end_headers()
+        self.wfile.write(b'video')
+
+
+class TestDownloadClaims(unittest.TestCase):
+    def setUp(self):
+        self.claims_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.claims_dir, ignore_errors=True)
+
+    def test_claim(self):
+        claims = DownloadClaims(self.claims_dir)
+        self.assertTrue(claims.claim('batch 1'))
+        self.assertFalse(claims.claim('batch 1'))
+        self.assertFalse(DownloadClaims(self.claims_dir).claim('batch 1'))
+        self.assertTrue(claims.claim('batch 2'))
+        claims.release('batch 1')
+        claims.release('batch 3')
+        self.assertTrue(claims.claim('batch 1'))
+
+    def test_lock_output(self):
+        claims = DownloadClaims(self.claims_dir)
+        order = []
+
+        def second():
+            with claims.lock_output('video.mp4'):
+                order.append('second')
+
+        with claims.lock_output('video.mp4'):
+            thread = threading.Thread(target=second)
+            thread.start()
+            time.sleep(0.1)
+            # Other files are not locked
+            with claims.lock_output('other.mp4'):
+                pass
+            order.append('first')
+        thread.join()
+        self.assertEqual(order, ['first', 'second'])
+
+
+class TestProgressSender(unittest.TestCase):
+    def test_throttle(self):
+        sent = []
+        now = [100.0]
+
+        class Events(object):
+            def put(self, event):
+                sent.append(event[2]['downloaded_bytes'])
+        sender = _ProgressSender(Events(), 0, clock=lambda: now[0])
+        for downloaded in range(10):
+            sender({'status': 'downloading', 'filename': 'a.mp4', 'downloaded_bytes': downloaded})
+            now[0] += 0.125
+        self.assertEqual(sent, [0, 4, 8])
+        # A change of status or of file is always sent
+        sender({'status': 'finished', 'filename': 'a.mp4', 'downloaded_bytes': 10})
+        sender({'status': 'downloading', 'filename': 'b.mp4', 'downloaded_bytes': 0})
+        sender({'status': 'downloading', 'filename': 'b.mp4', 'downloaded_bytes': 1})
+        self.assertEqual(sent, [0, 4, 8, 10, 0])
+
+
+@unittest.skipIf(_fork_context() is None, 'fork is not available')
+class TestWorkers(unittest.TestCase):
+    def _download(self, urls, **params):
+        ydl = YoutubeDL(dict({
+            'simulate': True,
+            'quiet': True,
+            'forceid': True,
+            'outtmpl': '%(id)s.%(ext)s',
+        }, **params))
+        ydl.add_info_extractor(BatchIE(ydl))
+        ydl._screen_file = io.StringIO()
+        ydl._err_file = io.StringIO()
+        retcode = download_with_workers(ydl, urls, 3)
+        return retcode, ydl._screen_file.getvalue(), ydl._err_file.getvalue()
+
+    def test_workers(self):
+        # batch:1 and batch:1_again are the same video
+        retcode, stdout, _ = self._download(
+            ['batch:1', 'batch:2', 'batch:1_again', 'batch:3', 'batch:4'])
+        self.assertEqual(retcode, 0)
+        self.assertEqual(sorted(stdout.splitlines()), ['1', '2', '3', '4'])
+
+    def test_info_dicts(self):
+        infos = [{
+            'id': video_id,
+            'title': 'video %s' % video_id,
+            'url': 'http://localhost/%s.mp4' % video_id,
+            'ext': 'mp4',
+            'webpage_url': 'batch:%s' % video_id,
+        } for video_id in ('1', '2', '3')]
+        retcode, stdout, _ = self._download(infos + ['batch:4'])
+        self.assertEqual(retcode, 0)
+        self.assertEqual(sorted(stdout.splitlines()), ['1', '2', '3', '4'])
+
+    def test_generator(self):
+        consumed = []
+
+        def urls():
+            for video_id in '123456':
+                consumed.append(video_id)
+                yield 'batch:%s' % video_id
+        retcode, stdout, _ = self._download(urls())
+        self.assertEqual(retcode, 0)
+        self.assertEqual(sorted(stdout.splitlines()), list('123456'))
+        self.assertEqual(consumed, list('123456'))
+
+        # The number of URLs is unknown
+        self.assertRaises(
+            SameFileError, self._download, urls(), outtmpl='video.mp4')
+
+    def test_expired_info_dicts(self):
+        httpd = compat_http_server.HTTPServer(('127.0.0.1', 0), ExpiringRequestHandler)
+        base_url = 'http://127.0.0.1:%d/' % http_server_port(httpd)
+        thread = threading.Thread(target=httpd.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        class ExpiringIE(InfoExtractor):
+            _VALID_URL = r'expiring:(?P<id>\w+)'
+
+            def _real_extract(self, url):
+                video_id = self._match_id(url)
+                return {
+                    'id': video_id,
+                    'title': video_id,
+                    'url': base_url + 'fresh.mp4',
+                    'ext': 'mp4',
+                }
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            ydl = YoutubeDL({
+                'quiet': True,
+                'no_warnings': True,
+                'outtmpl': os.path.join(tmpdir, '%(id)s.%(ext)s'),
+            })
+            ydl.add_info_extractor(ExpiringIE(ydl))
+            ydl._screen_file = io.StringIO()
+            ydl._err_file = io.StringIO()
+            infos = [{
+                'id': video_id,
+                'title': video_id,
+                'url': base_url + 'expired.mp4',
+                'ext': 'mp4',
+                'webpage_url': 'expiring:%s' % video_id,
+                'extractor': 'Expiring',
+                'extractor_key': 'Expiring',
+            } for video_id in ('1', '2')]
+            self.assertEqual(download_with_workers(ydl, infos, 2), 0)
+            # Extracted again by the worker holding their claim
+            self.assertEqual(sorted(os.listdir(tmpdir)), ['1.mp4', '2.mp4'])
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    def test_errors(self):
+        retcode, stdout, stderr = self._download(
+            ['batch:1', 'batch:fail', 'batch:2'], ignoreerrors=True)
+        self.assertEqual(retcode, 1)
+        self.assertEqual(sorted(stdout.splitlines()), ['1', '2'])
+        self.assertTrue('no such video' in stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()